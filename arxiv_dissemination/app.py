@@ -1,9 +1,10 @@
 """Dissemination flask application"""
 import os
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from flask import Flask
+from flask import Flask, request
 
 from .routes import blueprint
 from .trace import setup_trace
@@ -19,7 +20,17 @@ from arxiv.legacy.papers.deleted import is_deleted
 
 from arxiv_dissemination.services.object_store_gs import GsObjectStore
 from arxiv_dissemination.services.object_store_local import LocalObjectStore
+from arxiv_dissemination.services.object_store_tiered import TieredObjectStore, DiskCacheObjectStore
+from arxiv_dissemination.services.object_store_accounting import AccountingObjectStore, start_request, StorageStats
+from arxiv_dissemination.cache_policy import policies_from_json
+from arxiv_dissemination.compression import EncodedCache
+from arxiv_dissemination.services import next_published
+from arxiv_dissemination.services.announcement_calendar import AnnouncementCalendar
+from arxiv_dissemination.metrics import request_storage_calls, request_storage_bytes
 from arxiv_dissemination.services.article_store import ArticleStore
+from arxiv_dissemination.services.head_tail_cache import HeadTailCache
+from arxiv_dissemination.services.resolution_cache import ResolutionCache
+from arxiv_dissemination.services.warmer import Warmer
 
 import arxiv_dissemination
 
@@ -41,9 +52,76 @@ def factory():
     On by default, set to 0 to deactivate.
     """
 
+    mirror_prefix = os.environ.get('MIRROR_PREFIX', '')
+    """Local directory of a mirror of the storage to try before `storage_prefix`.
+
+    Ex. `/data/` for an NFS mirror. Must end with a /. Off if not set.
+    """
+
+    disk_cache_dir = os.environ.get('DISK_CACHE_DIR', '')
+    """Directory for a read-through cache on local disk of the objects
+    from `storage_prefix`. Off if not set."""
+
+    disk_cache_max_bytes = int(os.environ.get('DISK_CACHE_MAX_BYTES', str(10 * 1024**3)))
+    """Max size of the disk cache, least recently used files are removed past this."""
+
+    disk_cache_async = bool(os.environ.get('DISK_CACHE_ASYNC', '1') == '1')
+    """To copy objects to the disk cache in the background.
+
+    If 0, a miss is copied to disk before it is served.
+    """
+
+    storage_call_budget = int(os.environ.get('STORAGE_CALL_BUDGET', '12'))
+    """Number of object store calls a request may make before a warning is logged."""
+
+    storage_debug_headers = bool(os.environ.get('STORAGE_DEBUG_HEADERS', '0') == '1')
+    """To add X-Storage-* headers with the storage calls of each request.
+
+    These are always added when flask is in debug mode.
+    """
+
+    cache_policies = os.environ.get('CACHE_POLICIES', '')
+    """JSON of changes to the Cache-Control policies in `cache_policy.DEFAULT_POLICIES`.
+
+    Ex. `{"pdf_versioned": {"max_age": 86400}}`
+    """
+
+    announcement_schedule = os.environ.get('ANNOUNCEMENT_SCHEDULE', '')
+    """Path to a JSON schedule of announcements with holidays.
+
+    Defaults to `services/announcement_schedule.json`.
+    """
+
+    resolution_cache_size = int(os.environ.get('RESOLUTION_CACHE_SIZE', '20000'))
+    """Number of id resolutions to cache until the next announcement, 0 to turn off."""
+
+    warm_token = os.environ.get('WARM_TOKEN', '')
+    """Bearer token for POST /pdf/warm and /pdf/resolve, the endpoints are off if not set."""
+
+    warm_threads = int(os.environ.get('WARM_THREADS', '4'))
+    """Threads to resolve the ids from POST /pdf/warm."""
+
+    resolve_threads = int(os.environ.get('RESOLVE_THREADS', '8'))
+    """Threads to resolve the ids of all the requests to POST /pdf/resolve."""
+
+    head_tail_cache_bytes = int(os.environ.get('HEAD_TAIL_CACHE_BYTES', str(64 * 1024**2)))
+    """Max size of the in-process cache of the heads and tails of large PDFs, 0 to turn off."""
+
+    head_tail_span = int(os.environ.get('HEAD_TAIL_SPAN', str(256 * 1024)))
+    """Bytes cached at each of the start and end of a PDF."""
+
+    head_tail_min_size = int(os.environ.get('HEAD_TAIL_MIN_SIZE', str(2 * 1024**2)))
+    """PDFs smaller than this do not have their heads and tails cached."""
+
+    encoded_cache_bytes = int(os.environ.get('ENCODED_CACHE_BYTES', str(64 * 1024**2)))
+    """Max size of the in-process cache of gzip and brotli text such as abs files, 0 to not compress."""
+
     #################### App ####################
     app = Flask(__name__)
-    app.config.update(storage_prefix=storage_prefix)
+    app.config.update(storage_prefix=storage_prefix,
+                      storage_call_budget=storage_call_budget,
+                      storage_debug_headers=storage_debug_headers,
+                      warm_token=warm_token)
     Base(app)
     app.register_blueprint(blueprint)
 
@@ -53,8 +131,19 @@ def factory():
 
     app.logger.info(f"trace is {trace}")
     app.logger.info(f"storage_prefix is {storage_prefix}")
+    app.logger.info(f"mirror_prefix is {mirror_prefix}")
+    app.logger.info(f"disk_cache_dir is {disk_cache_dir}")
 
     problems = []
+    try:
+        setattr(app, 'cache_policies', policies_from_json(cache_policies))
+    except ValueError as ex:
+        problems.append(f"CACHE_POLICIES is invalid: {ex}")
+    if announcement_schedule:
+        try:
+            next_published.calendar = AnnouncementCalendar.from_file(announcement_schedule)
+        except Exception as ex:
+            problems.append(f"ANNOUNCEMENT_SCHEDULE {announcement_schedule} is invalid: {ex}")
     if not storage_prefix.startswith("gs://"):
         app.logger.warning(f"Using local files as object store at {storage_prefix}, Use this in testing only.")
         if not Path(storage_prefix).exists():
@@ -73,7 +162,32 @@ def factory():
         setattr(app, 'object_store', GsObjectStore(bucket))
 
 
-    setattr(app, 'article_store', ArticleStore(app.object_store, reasons, is_deleted))
+    if disk_cache_dir:
+        setattr(app, 'object_store', DiskCacheObjectStore(app.object_store, disk_cache_dir,
+                                                          disk_cache_max_bytes,
+                                                          populate_async=disk_cache_async))
+    if mirror_prefix:
+        if not Path(mirror_prefix).exists():
+            problems.append(f"Mirror directory {mirror_prefix} does not exist.")
+        if not mirror_prefix.endswith('/'):
+            problems.append(f'MIRROR_PREFIX must end with a slash, was {mirror_prefix}')
+        else:
+            setattr(app, 'object_store', TieredObjectStore([LocalObjectStore(mirror_prefix),
+                                                            app.object_store]))
+
+    setattr(app, 'object_store', AccountingObjectStore(app.object_store))
+    setup_storage_accounting(app)
+
+    resolution_cache = ResolutionCache(resolution_cache_size) if resolution_cache_size else None
+    setattr(app, 'article_store', ArticleStore(app.object_store, reasons, is_deleted,
+                                               resolution_cache=resolution_cache))
+    setattr(app, 'head_tail_cache',
+            HeadTailCache(head_tail_cache_bytes, head_tail_span, head_tail_min_size)
+            if head_tail_cache_bytes else None)
+    setattr(app, 'encoded_cache', EncodedCache(encoded_cache_bytes) if encoded_cache_bytes else None)
+    setattr(app, 'warmer', Warmer(app.article_store, threads=warm_threads))
+    setattr(app, 'resolve_pool', ThreadPoolExecutor(max_workers=resolve_threads,
+                                                    thread_name_prefix='resolve'))
     stat, msg = app.article_store.status()
     if stat != 'GOOD':
         problems.append(f"article_store status {stat} due to {msg}")
@@ -83,3 +197,35 @@ def factory():
         exit(1)
 
     return app
+
+
+def setup_storage_accounting(app):
+    """Records the object store calls of each request.
+
+    The counts are recorded and checked against the budget when the
+    response is closed, so the bytes of a streamed body are included."""
+    @app.before_request
+    def start_storage_stats():
+        request.storage_stats = start_request()
+
+    @app.after_request
+    def storage_stats_headers(resp):
+        stats: StorageStats = getattr(request, 'storage_stats', None)
+        if stats is None:
+            return resp
+        if app.debug or app.config['storage_debug_headers']:
+            resp.headers['X-Storage-Calls'] = str(stats.total_calls)
+            resp.headers['X-Storage-Ms'] = f"{stats.ms:.1f}"
+
+        endpoint, path = request.endpoint or '', request.path
+
+        def finish():
+            attrs = {"endpoint": endpoint}
+            request_storage_calls.record(stats.total_calls, attrs)
+            request_storage_bytes.record(stats.bytes, attrs)
+            if stats.total_calls > app.config['storage_call_budget']:
+                app.logger.warning("%s made storage %s, over budget of %d calls",
+                                   path, stats, app.config['storage_call_budget'])
+
+        resp.call_on_close(finish)
+        return resp
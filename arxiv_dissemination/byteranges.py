@@ -0,0 +1,94 @@
+"""Responses to Range requests made with one ranged storage read per range.
+
+PDF viewers like PDF.js send many small Range requests, and sometimes
+requests with several ranges, while rendering a large PDF.
+`flask_rangerequest.RangeRequest` serves a range by opening the object
+and seeking, which for a GS `Blob` downloads a whole chunk, and it does
+a 416 for more than one range.
+
+`ranged_response()` serves these with `FileObj.download_as_bytes()`,
+as `multipart/byteranges` when there is more than one range. Large
+single ranges and requests without a Range are left to `RangeRequest`
+which streams them. Ranges within the head or tail of a large object
+are read from a `HeadTailCache` when one is passed.
+"""
+
+import secrets
+from typing import Iterator, List, Optional, Tuple
+
+from flask import Response, abort, request
+from flask_rangerequest._utils import parse_range_header
+from werkzeug.http import http_date
+
+from .services.head_tail_cache import HeadTailCache
+from .services.object_store import FileObj
+
+MAX_RANGES = 50
+"""Max ranges in one request, more is a 416"""
+
+MAX_RANGE_BYTES = 4 * 1024 * 1024
+"""Max bytes in one read of storage, larger single ranges are streamed by `RangeRequest`"""
+
+
+def ranged_response(item: FileObj, content_type: str,
+                    head_tail: Optional[HeadTailCache] = None) -> Optional[Response]:
+    """Gets a 206 response for the ranges of the request.
+
+    Returns None if the request should be served by `RangeRequest`: it
+    is not a GET, has no Range, has an If-Range that does not match the
+    etag, or is for one range larger than `MAX_RANGE_BYTES`.
+
+    Overlapping and adjacent ranges are merged, as `RangeRequest`
+    does, so each part is one read of storage."""
+    range_header = request.headers.get('Range')
+    if request.method != 'GET' or not range_header:
+        return None
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range != item.etag:
+        return None
+
+    size = item.size
+    ranges = parse_range_header(range_header, size)
+    if not ranges or any(start < 0 or start > end for start, end in ranges) or len(ranges) > MAX_RANGES:
+        abort(416)
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        if end - start + 1 > MAX_RANGE_BYTES or (start == 0 and end == size - 1):
+            return None
+        resp = Response(_read(item, start, end, head_tail), 206, content_type=content_type)
+        resp.headers['Content-Range'] = f"bytes {start}-{end}/{size}"
+    else:
+        boundary = secrets.token_hex(16)
+        parts = [(start, end, _part_head(boundary, content_type, start, end, size, first=(n == 0)))
+                 for n, (start, end) in enumerate(ranges)]
+        tail = f"\r\n--{boundary}--\r\n".encode('ascii')
+        length = sum(len(head) + end - start + 1 for start, end, head in parts) + len(tail)
+        resp = Response(_multipart_body(item, parts, tail, head_tail), 206,
+                        content_type=f"multipart/byteranges; boundary={boundary}")
+        resp.headers['Content-Length'] = str(length)
+
+    resp.headers['Accept-Ranges'] = 'bytes'
+    resp.headers['ETag'] = item.etag
+    resp.headers['Last-Modified'] = http_date(item.updated)
+    return resp
+
+
+def _part_head(boundary: str, content_type: str, start: int, end: int, size: int, first: bool) -> bytes:
+    return (('' if first else '\r\n') + f"--{boundary}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n").encode('ascii')
+
+
+def _read(item: FileObj, start: int, end: int, head_tail: Optional[HeadTailCache]) -> bytes:
+    data = head_tail.read(item, start, end) if head_tail is not None else None
+    return data if data is not None else item.download_as_bytes(start=start, end=end)
+
+
+def _multipart_body(item: FileObj, parts: List[Tuple[int, int, bytes]], tail: bytes,
+                    head_tail: Optional[HeadTailCache]) -> Iterator[bytes]:
+    """Reads each part as it is sent, parts over `MAX_RANGE_BYTES` in several reads."""
+    for start, end, head in parts:
+        yield head
+        for chunk_start in range(start, end + 1, MAX_RANGE_BYTES):
+            yield _read(item, chunk_start, min(chunk_start + MAX_RANGE_BYTES - 1, end), head_tail)
+    yield tail
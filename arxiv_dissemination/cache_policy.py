@@ -0,0 +1,115 @@
+"""Cache-Control policies for the responses of the dissemination service.
+
+Each kind of response has a named `CachePolicy`. The defaults in
+`DEFAULT_POLICIES` can be changed with the `CACHE_POLICIES` env var,
+see `policies_from_json`.
+"""
+
+import json
+from dataclasses import dataclass, fields, replace
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Dict, Optional
+
+from arxiv_dissemination.services.next_published import next_publish
+
+YEAR = 31536000
+"""One year, max allowed by RFC 2616"""
+DAY = 86400
+WEEK = 7 * DAY
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Cache directives for one kind of response.
+
+    `max_age` is for browsers and `s_maxage` is for shared caches like
+    the CDN. `None` leaves a directive out.
+
+    If `until_next_publish` is set, `max_age` and `s_maxage` are
+    limited to the time until the next announcement and an `Expires`
+    header is added, since the response may change then.
+    """
+    max_age: Optional[int] = None
+    s_maxage: Optional[int] = None
+    stale_while_revalidate: Optional[int] = None
+    stale_if_error: Optional[int] = None
+    immutable: bool = False
+    no_store: bool = False
+    until_next_publish: bool = False
+
+    def headers(self, now: Optional[datetime] = None) -> Dict[str, str]:
+        """Gets the headers for this policy.
+
+        `now` should be timezone aware, it defaults to the current time."""
+        if self.no_store:
+            return {'Cache-Control': 'no-store'}
+
+        max_age, s_maxage = self.max_age, self.s_maxage
+        headers = {}
+        if self.until_next_publish:
+            now = now or datetime.now(timezone.utc)
+            expires = next_publish(now)
+            until = max(0, int((expires - now).total_seconds()))
+            max_age = until if max_age is None else min(max_age, until)
+            s_maxage = until if s_maxage is None else min(s_maxage, until)
+            headers['Expires'] = format_datetime(expires.astimezone(timezone.utc), usegmt=True)
+
+        directives = ['public']
+        if max_age is not None:
+            directives.append(f"max-age={max_age}")
+        if s_maxage is not None:
+            directives.append(f"s-maxage={s_maxage}")
+        if self.stale_while_revalidate is not None:
+            directives.append(f"stale-while-revalidate={self.stale_while_revalidate}")
+        if self.stale_if_error is not None:
+            directives.append(f"stale-if-error={self.stale_if_error}")
+        if self.immutable:
+            directives.append('immutable')
+        headers['Cache-Control'] = ', '.join(directives)
+        return headers
+
+
+DEFAULT_POLICIES: Dict[str, CachePolicy] = {
+    # A version of a PDF does not change, it may be rebuilt but that is not a new version
+    'pdf_versioned': CachePolicy(max_age=WEEK, s_maxage=YEAR,
+                                 stale_while_revalidate=DAY, stale_if_error=WEEK,
+                                 immutable=True),
+    # Could be a new version after the next announcement
+    'pdf_current': CachePolicy(until_next_publish=True,
+                               stale_while_revalidate=600, stale_if_error=DAY),
+    # Could be announced at the next announcement
+    'not_found': CachePolicy(until_next_publish=True, stale_if_error=DAY),
+    # A withdrawn version stays withdrawn
+    'withdrawn': CachePolicy(max_age=YEAR, s_maxage=YEAR, stale_if_error=WEEK),
+    # Could be a new version that is not withdrawn after the next announcement
+    'withdrawn_current': CachePolicy(until_next_publish=True, stale_if_error=DAY),
+    # The PDF may get built soon
+    'unavailable': CachePolicy(max_age=60, s_maxage=60),
+    'not_pdf': CachePolicy(until_next_publish=True, stale_if_error=DAY),
+    'bad_id': CachePolicy(max_age=DAY, s_maxage=DAY, stale_if_error=WEEK),
+    # The reason may be fixed by an admin
+    'cannot_build_pdf': CachePolicy(max_age=3600, s_maxage=3600, stale_if_error=DAY),
+}
+
+
+def policies_from_json(value: str) -> Dict[str, CachePolicy]:
+    """Gets the policies with the changes from a JSON object.
+
+    Ex. `{"pdf_versioned": {"max_age": 86400}, "unavailable": {"no_store": true}}`
+
+    The fields given replace those of the default policy of that name.
+    Raises `ValueError` for an unknown policy or field.
+    """
+    policies = dict(DEFAULT_POLICIES)
+    if not value:
+        return policies
+    names = {field.name for field in fields(CachePolicy)}
+    for name, changes in json.loads(value).items():
+        if name not in policies:
+            raise ValueError(f"Unknown cache policy {name}")
+        unknown = set(changes) - names
+        if unknown:
+            raise ValueError(f"Unknown fields {unknown} for cache policy {name}")
+        policies[name] = replace(policies[name], **changes)
+    return policies
@@ -0,0 +1,121 @@
+"""Compressed responses for text formats such as the abs.
+
+The encoding is negotiated with Accept-Encoding, brotli is preferred
+over gzip. Each object is
+compressed once per encoding and kept in an `EncodedCache` keyed on
+the full key and generation of the object, see `content_key()`, so a
+request never compresses what another has.
+"""
+
+import gzip
+from collections import OrderedDict
+from threading import Event, Lock
+from typing import Dict, Hashable, List, Optional
+
+from flask import Response, request
+from werkzeug.http import http_date
+
+from .services.object_store import FileObj, content_key
+
+try:
+    import brotli
+except ImportError:  # a dependency, but only gzip is offered without it
+    brotli = None
+
+MIN_SIZE = 256
+"""Objects smaller than this are not worth compressing"""
+
+
+def encodings() -> List[str]:
+    """Encodings that can be served, most preferred first."""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def is_compressible(content_type: str) -> bool:
+    return content_type.startswith('text/')
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=11, mode=brotli.MODE_TEXT)
+    elif encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    raise ValueError(f"Unsupported encoding {encoding}")
+
+
+class EncodedCache():
+    """LRU cache of up to `max_bytes` of compressed objects.
+
+    Objects are compressed at most once per content key and encoding;
+    requests for one being compressed wait for it. Objects bigger than
+    `max_object_bytes` are not compressed.
+
+    Safe to use from multiple threads."""
+
+    def __init__(self, max_bytes: int, max_object_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_object_bytes = max_object_bytes or max_bytes // 8
+        self._lock = Lock()
+        self._entries: OrderedDict[Hashable, bytes] = OrderedDict()
+        self._pending: Dict[Hashable, Event] = {}
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, item: FileObj, encoding: str) -> bytes:
+        """Gets `item` compressed with `encoding`."""
+        key = (*content_key(item), encoding)
+        while True:
+            with self._lock:
+                data = self._entries.get(key)
+                if data is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return data
+                pending = self._pending.get(key)
+                if pending is None:
+                    self._pending[key] = Event()
+                    self.misses += 1
+            if pending is None:
+                break
+            pending.wait()  # and then get it from _entries or compress it if that failed
+
+        try:
+            with item.open('rb') as fh:
+                data = compress(fh.read(), encoding)
+            self._put(key, data)
+            return data
+        finally:
+            with self._lock:
+                self._pending.pop(key).set()
+
+    def _put(self, key: Hashable, data: bytes):
+        with self._lock:
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, old = self._entries.popitem(last=False)
+                self._size -= len(old)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def encoded_response(item: FileObj, content_type: str, cache: EncodedCache) -> Optional[Response]:
+    """Gets a compressed 200 response for `item` if the request accepts an encoding.
+
+    Returns None to serve `item` as is: it is not text, is too small or
+    too big, the request has a Range, or accepts none of `encodings()`."""
+    if not is_compressible(content_type) or request.headers.get('Range') \
+       or not MIN_SIZE <= item.size <= cache.max_object_bytes:
+        return None
+    encoding = request.accept_encodings.best_match(encodings())
+    if not encoding:
+        return None
+
+    resp = Response(cache.get(item, encoding), 200, content_type=content_type)
+    resp.headers['Content-Encoding'] = encoding
+    resp.headers['ETag'] = f"{item.etag}-{encoding}"
+    resp.headers['Last-Modified'] = http_date(item.updated)
+    resp.vary.add('Accept-Encoding')
+    return resp
@@ -0,0 +1,98 @@
+"""Trace spans and histogram metrics for the stages of serving a request.
+
+The instruments are created from the global `MeterProvider`, so they
+are no-ops until `setup_trace` configures one.
+"""
+
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Iterator, Optional
+
+from opentelemetry import metrics, trace
+from opentelemetry.trace import Span
+
+tracer = trace.get_tracer(__name__)
+meter = metrics.get_meter(__name__)
+
+stage_duration = meter.create_histogram(
+    "dissemination.stage.duration", unit="ms",
+    description="Time of a stage of resolving a request, by stage")
+
+resolve_duration = meter.create_histogram(
+    "dissemination.resolve.duration", unit="ms",
+    description="Time to resolve an id to a file or condition, by branch")
+
+storage_calls = meter.create_histogram(
+    "dissemination.resolve.storage_calls", unit="{call}",
+    description="Number of storage calls made to resolve an id, by branch")
+
+bytes_sent = meter.create_histogram(
+    "dissemination.response.bytes", unit="By",
+    description="Bytes of the body sent, by route")
+
+storage_call_duration = meter.create_histogram(
+    "dissemination.storage.call.duration", unit="ms",
+    description="Time of each call to the object store, by op")
+
+request_storage_calls = meter.create_histogram(
+    "dissemination.request.storage_calls", unit="{call}",
+    description="Number of object store calls made by a request, by endpoint")
+
+request_storage_bytes = meter.create_histogram(
+    "dissemination.request.storage_bytes", unit="By",
+    description="Bytes read from the object store by a request, by endpoint")
+
+time_to_first_byte = meter.create_histogram(
+    "dissemination.response.ttfb", unit="ms",
+    description="Time from the start of the view to the first body chunk, by route")
+
+
+@contextmanager
+def stage(name: str, attributes: Optional[dict] = None) -> Iterator[Span]:
+    """Runs the block in a child span named `name` and records its
+    duration in the `dissemination.stage.duration` histogram."""
+    start = perf_counter()
+    with tracer.start_as_current_span(name, attributes=attributes) as span:
+        try:
+            yield span
+        finally:
+            stage_duration.record((perf_counter() - start) * 1000, {"stage": name})
+
+
+class TimedBody():
+    """Wraps a response body to record bytes sent and time to first byte.
+
+    The body is streamed after the view returns, so this is recorded in
+    its own `stream_body` span that ends when the WSGI server closes
+    the body. A class is used rather than a generator so `close()` is
+    called even if the body is never iterated, as for HEAD."""
+
+    def __init__(self, body, start: float, route: str):
+        self.body = body
+        self.start = start
+        self.route = route
+        self.sent = 0
+        self.ttfb: Optional[float] = None
+        self.closed = False
+        self.span = tracer.start_span("stream_body", attributes={"route": route})
+
+    def __iter__(self):
+        for chunk in self.body:
+            if self.ttfb is None:
+                self.ttfb = (perf_counter() - self.start) * 1000
+            self.sent += len(chunk)
+            yield chunk
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if hasattr(self.body, 'close'):
+            self.body.close()
+        attrs = {"route": self.route}
+        bytes_sent.record(self.sent, attrs)
+        self.span.set_attribute("response.bytes", self.sent)
+        if self.ttfb is not None:
+            time_to_first_byte.record(self.ttfb, attrs)
+            self.span.set_attribute("response.ttfb_ms", self.ttfb)
+        self.span.end()
@@ -1,17 +1,23 @@
 from datetime import datetime, timezone, timedelta
 
-from email.utils import format_datetime
+from contextvars import copy_context
+import hmac
 import logging
-from arxiv_dissemination.services.article_store import CannotBuildPdf, Deleted
+from time import perf_counter
+from typing import Optional, get_args
+from arxiv_dissemination.services.article_store import CannotBuildPdf, Deleted, VALID_SOURCE_EXTENSIONS
+from arxiv_dissemination.services.key_patterns import Formats
 
 from opentelemetry import trace
-from flask import abort, Blueprint, current_app, render_template, redirect, url_for
+from flask import abort, Blueprint, current_app, render_template, redirect, request, url_for
 
 from flask_rangerequest import RangeRequest
 
 from arxiv.identifier import IdentifierException, Identifier
 
-from arxiv_dissemination.services.next_published import next_publish
+from arxiv_dissemination.byteranges import ranged_response
+from arxiv_dissemination.compression import encoded_response, is_compressible
+from arxiv_dissemination.metrics import TimedBody
 
 logger = logging.getLogger(__file__)
 logger.setLevel(logging.INFO)
@@ -26,6 +32,132 @@ def status():
     return {"status": "good"}
 
 
+MAX_WARM_IDS = 10000
+"""Max ids in one request to `warm`"""
+
+
+@blueprint.route("/pdf/warm", methods=['POST'])
+def warm():
+    """Resolves a list of ids in the background to warm the caches.
+
+    Meant to be called by the sync at announcement time with the ids
+    that were published. Needs the header `Authorization: Bearer
+    {WARM_TOKEN}`, this is a 404 if WARM_TOKEN is not configured.
+
+    The body is JSON like `{"ids": ["2201.00001v2", "2201.00001"]}`.
+    Responds with a 202 and the number of ids accepted and any that
+    were invalid.
+    """
+    _check_token()
+    data = request.get_json(silent=True)
+    ids = data.get('ids') if isinstance(data, dict) else None
+    if not isinstance(ids, list):
+        abort(400, description='body must be JSON like {"ids": ["2201.00001v1"]}')
+    if len(ids) > MAX_WARM_IDS:
+        abort(400, description=f"max of {MAX_WARM_IDS} ids")
+
+    valid, invalid = [], []
+    for id in ids:
+        try:
+            valid.append(Identifier(str(id)))
+        except IdentifierException:
+            invalid.append(id)
+    accepted = current_app.warmer.warm(valid)
+    return {"accepted": accepted, "invalid": invalid}, 202
+
+
+def _check_token():
+    """Aborts unless the request has the header `Authorization: Bearer {WARM_TOKEN}`.
+
+    This is a 404 if WARM_TOKEN is not configured."""
+    token = current_app.config.get('warm_token')
+    if not token:
+        abort(404)
+    auth = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(auth.encode('utf-8'), f"Bearer {token}".encode('utf-8')):
+        abort(401)
+
+
+MAX_RESOLVE_IDS = 1000
+"""Max ids in one request to `resolve`"""
+
+FORMATS = get_args(Formats)
+
+CONDITION_STATUS = {
+    "ARTICLE_NOT_FOUND": 404,
+    "VERSION_NOT_FOUND": 404,
+    "WITHDRAWN": 200,
+    "NO_SOURCE": 200,
+    "UNAVAIABLE": 500,
+    "NOT_PDF": 404,
+}
+"""HTTP status that `serve_pdf` responds with for each condition"""
+
+
+@blueprint.route("/pdf/resolve", methods=['POST'])
+def resolve():
+    """Gets what `/pdf/<id>` would serve for many ids without the bodies.
+
+    The body is JSON like `{"ids": ["2201.00001v2", "cs/0011004"]}`, it
+    may have a `format` of `ps`, `e-print` or `abs` instead of `pdf`.
+    Responds with JSON like:
+
+        {"results": {"2201.00001v2": {"status": 200, "key": "ps_cache/arxiv/pdf/2201/2201.00001v2.pdf",
+                                      "size": 12345, "etag": "abc", "updated": "2022-01-03T01:02:03+00:00"},
+                     "cs/0011004": {"status": 200, "condition": "WITHDRAWN"}}}
+
+    `status` is the status `/{format}/<id>` would respond with. Duplicate
+    ids are resolved once and the ids are resolved concurrently on the
+    app's `resolve_pool` using the resolution cache.
+
+    This is for internal consumers, it needs the same `Authorization`
+    header as `warm` and is a 404 if WARM_TOKEN is not configured.
+    """
+    _check_token()
+    data = request.get_json(silent=True)
+    ids = data.get('ids') if isinstance(data, dict) else None
+    if not isinstance(ids, list):
+        abort(400, description='body must be JSON like {"ids": ["2201.00001v1"]}')
+    format = data.get('format', 'pdf')
+    if format not in FORMATS:
+        abort(400, description=f"format must be one of {', '.join(FORMATS)}")
+    ids = list(dict.fromkeys(map(str, ids)))
+    if len(ids) > MAX_RESOLVE_IDS:
+        abort(400, description=f"max of {MAX_RESOLVE_IDS} ids")
+
+    results, futures = {}, {}
+    for id in ids:
+        try:
+            arxiv_id = Identifier(id)
+        except IdentifierException as ex:
+            results[id] = {"status": 404, "condition": "BAD_ID", "message": str(ex)}
+            continue
+        # each task gets its own copy so the storage stats and trace are of this request
+        futures[id] = current_app.resolve_pool.submit(
+            copy_context().run, current_app.article_store.dissemination_for_id, format, arxiv_id)
+
+    for id, future in futures.items():
+        try:
+            results[id] = _outcome(future.result())
+        except Exception as ex:
+            logger.exception("resolve of %s failed", id)
+            results[id] = {"status": 500, "condition": "ERROR"}
+    return {"results": results}
+
+
+def _outcome(item) -> dict:
+    """JSON safe outcome of a `dissemination_for_id` result."""
+    if isinstance(item, str):
+        return {"status": CONDITION_STATUS.get(item, 500), "condition": item}
+    elif isinstance(item, Deleted):
+        return {"status": 404, "condition": "DELETED", "message": item.msg}
+    elif isinstance(item, CannotBuildPdf):
+        return {"status": 404, "condition": "CANNOT_BUILD_PDF", "message": item.msg}
+    else:
+        return {"status": 200, "key": item.name, "size": item.size,
+                "etag": item.etag, "updated": item.updated.isoformat()}
+
+
 @blueprint.route("/pdf/<string:category>/<string:arxiv_id>", methods=['GET', 'HEAD'])
 def redirect_legacy_id_pdf(category: str, arxiv_id: str):
     """Redirect urls that don't end with .pdf so they download to a filename recognized as a PDF."""
@@ -67,6 +199,51 @@ def serve_pdf(arxiv_id: str):
 
     Does a 404 if the key for the ID does not exist on the bucket.
     """
+    return _serve('pdf', arxiv_id)
+
+
+@blueprint.route("/ps/<string:arxiv_id>", methods=['GET', 'HEAD'])
+@blueprint.route("/ps/<string:category>/<string:arxiv_id>", methods=['GET', 'HEAD'])
+def serve_ps(arxiv_id: str, category: Optional[str] = None):
+    """Serve the gzipped PostScript from the ps_cache, for example /ps/2201.00001v1"""
+    return _serve('ps', f"{category}/{arxiv_id}" if category else arxiv_id)
+
+
+@blueprint.route("/e-print/<string:arxiv_id>", methods=['GET', 'HEAD'])
+@blueprint.route("/e-print/<string:category>/<string:arxiv_id>", methods=['GET', 'HEAD'])
+def serve_source(arxiv_id: str, category: Optional[str] = None):
+    """Serve the source as it was submitted, for example /e-print/cs/0011004v1"""
+    return _serve('e-print', f"{category}/{arxiv_id}" if category else arxiv_id)
+
+
+@blueprint.route("/abs/<string:arxiv_id>", methods=['GET', 'HEAD'])
+@blueprint.route("/abs/<string:category>/<string:arxiv_id>", methods=['GET', 'HEAD'])
+def serve_abs(arxiv_id: str, category: Optional[str] = None):
+    """Serve the abs file as text, for example /abs/2201.00001v2"""
+    return _serve('abs', f"{category}/{arxiv_id}" if category else arxiv_id)
+
+
+CONTENT_TYPES = [
+    ('.pdf', 'application/pdf'),
+    ('.abs', 'text/plain; charset=utf-8'),
+    ('.gz', 'application/gzip'),
+]
+"""Content-Type of the objects served by the end of their key"""
+
+
+def _content_type(key: str) -> str:
+    return next((ctype for end, ctype in CONTENT_TYPES if key.endswith(end)), 'application/octet-stream')
+
+
+def _download_name(id: Identifier, key: str) -> str:
+    """Name to save a ps or source as, such as 0011004v1.tar.gz"""
+    ext = next((ext for ext in ['.ps.gz'] + VALID_SOURCE_EXTENSIONS if key.endswith(ext)), '')
+    return id.filename + (f"v{id.version}" if id.has_version else '') + ext
+
+
+def _serve(format: Formats, arxiv_id: str):
+    """Serves the object for `format` with range requests and the cache headers."""
+    start = perf_counter()
     try:
         if len(arxiv_id) > 40:
             abort(400)
@@ -76,12 +253,12 @@ def serve_pdf(arxiv_id: str):
     except IdentifierException as ex:
         return bad_id(arxiv_id, str(ex))
 
-    item = current_app.article_store.dissemination_for_id('pdf', id)
+    item = current_app.article_store.dissemination_for_id(format, id)
     logger. debug(f"dissemination_for_id({id.idv}) was {item}")
     if not item or item=="VERSION_NOT_FOUND" or item == "ARTICLE_NOT_FOUND":
         return not_found(arxiv_id)
     elif item in ["WITHDRAWN", "NO_SOURCE"] :
-        return withdrawn(arxiv_id)
+        return withdrawn(arxiv_id, id.has_version)
     elif item == "UNAVAIABLE":
         return unavailable(arxiv_id)
     elif item == "NOT_PDF":
@@ -93,47 +270,61 @@ def serve_pdf(arxiv_id: str):
     elif not item or not item.exists():
         return not_found(arxiv_id)
 
-    resp = RangeRequest(item.open('rb'),
-                        etag=item.etag,
-                        last_modified = item.updated,
-                        size=item.size).make_response()
+    content_type = 'application/pdf' if format == 'pdf' else _content_type(item.name)
+    resp = None
+    if current_app.encoded_cache is not None:
+        resp = encoded_response(item, content_type, current_app.encoded_cache)
+    if resp is None:
+        # Small and multiple ranges from PDF viewers are each one ranged read of storage
+        resp = ranged_response(item, content_type, current_app.head_tail_cache)
+    if resp is None:
+        resp = RangeRequest(item.open('rb'),
+                            etag=item.etag,
+                            last_modified = item.updated,
+                            size=item.size).make_response()
+        resp.headers['Content-Type'] = content_type
+    if format in ('ps', 'e-print'):
+        resp.headers['Content-Disposition'] = f'attachment; filename="{_download_name(id, item.name)}"'
+
+    if resp.response:
+        resp.response = TimedBody(resp.response, start, f"serve_{format}")
+    trace.get_current_span().set_attribute("response.size", item.size)
 
     resp.headers['Access-Control-Allow-Origin']='*'
-    resp.headers['Content-Type'] = 'application/pdf'
+    if is_compressible(content_type):
+        resp.vary.add('Accept-Encoding')
 
     if resp.status_code == 200:
         # To do Large PDFs on Cloud Run both chunked and no content-length are needed
         resp.headers['Transfer-Encoding'] = 'chunked'
         resp.headers.pop('Content-Length')
 
-    if id.has_version:
-        resp.headers['Cache-Control'] = _cc_versioned()
-    else:
-        resp.headers['Expires'] = format_datetime(next_publish())
+    # Versioned pdfs should not change, non versioned could change during the next publish.
+    # The current abs gets the dates of a new version so it could change for any id.
+    versioned = id.has_version and format != 'abs'
+    resp.headers.update(_cache_headers('pdf_versioned' if versioned else 'pdf_current'))
     return resp
 
 
-def _cc_versioned():
-    """Versioned pdfs should not change so let's put a time a bit in the future.
-    Non versioned could change during the next publish."""
-    return 'max-age=604800' # 7 days
+def _cache_headers(policy: str) -> dict:
+    """Gets the headers for the named policy in `arxiv_dissemination.cache_policy`."""
+    return current_app.cache_policies[policy].headers()
 
-def withdrawn(arxiv_id: str):
-    headers = {'Cache-Cache': 'max-age=31536000'} # one year, max allowed by RFC 2616
-    return render_template("pdf/withdrawn.html", arxiv_id=arxiv_id), 200, headers
+def withdrawn(arxiv_id: str, versioned: bool):
+    return render_template("pdf/withdrawn.html", arxiv_id=arxiv_id), 200, \
+        _cache_headers('withdrawn' if versioned else 'withdrawn_current')
 
 def unavailable(arxiv_id: str):
-    return render_template("pdf/unavaiable.html", arxiv_id=arxiv_id), 500, {}
+    return render_template("pdf/unavaiable.html", arxiv_id=arxiv_id), 500, _cache_headers('unavailable')
 
 def not_pdf(arxiv_id: str):
-    return render_template("pdf/unavaiable.html", arxiv_id=arxiv_id), 404, {}
+    return render_template("pdf/unavaiable.html", arxiv_id=arxiv_id), 404, _cache_headers('not_pdf')
 
 def not_found(arxiv_id: str):
-    headers = {'Expires': format_datetime(next_publish())}
-    return render_template("pdf/not_found.html", arxiv_id=arxiv_id), 404, headers
+    return render_template("pdf/not_found.html", arxiv_id=arxiv_id), 404, _cache_headers('not_found')
 
 def bad_id( arxiv_id: str, err_msg: str):
-    return render_template("pdf/bad_id.html", err_msg=err_msg, arxiv_id=arxiv_id), 404, {}
+    return render_template("pdf/bad_id.html", err_msg=err_msg, arxiv_id=arxiv_id), 404, _cache_headers('bad_id')
 
 def cannot_build_pdf(arxiv_id: str, msg: str):
-    return render_template("pdf/cannot_build_pdf.html", err_msg=msg,  arxiv_id=arxiv_id), 404, {}
+    return render_template("pdf/cannot_build_pdf.html", err_msg=msg,  arxiv_id=arxiv_id), 404, _cache_headers('cannot_build_pdf')
@@ -0,0 +1,107 @@
+"""Calendar of arXiv announcements.
+
+The schedule is loaded from a JSON file like `announcement_schedule.json`:
+
+    {"timezone": "America/New_York",
+     "time": "20:00",
+     "weekdays": ["Sun", "Mon", "Tue", "Wed", "Thu"],
+     "settle_minutes": 60,
+     "holidays": ["2023-12-25"]}
+
+`holidays` are the dates, in `timezone`, of days that would have an
+announcement by `weekdays` but do not.
+"""
+
+import json
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+DEFAULT_SCHEDULE = Path(__file__).parent / 'announcement_schedule.json'
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+SETTLE_EXPIRES = timedelta(minutes=5)
+"""Expires to use while an announcement is settling."""
+
+
+class AnnouncementCalendar():
+    """When announcements happen.
+
+    `next_publish()` caches the boundaries around the last time asked
+    about and only recomputes them once that time is outside of them."""
+
+    def __init__(self, tz: str = 'America/New_York', at: time = time(20, 0),
+                 weekdays: Iterable[int] = (6, 0, 1, 2, 3),
+                 holidays: Iterable[date] = (), settle_minutes: int = 60):
+        self.tz = ZoneInfo(tz)
+        self.at = at
+        self.weekdays = frozenset(weekdays)
+        if not self.weekdays:
+            raise ValueError("Must have at least one weekday with announcements")
+        self.holidays = frozenset(holidays)
+        self.settle = timedelta(minutes=settle_minutes)
+        self._cached: Optional[Tuple[datetime, datetime]] = None
+
+    @classmethod
+    def from_file(cls, path: Path = DEFAULT_SCHEDULE) -> 'AnnouncementCalendar':
+        """Loads the calendar from a JSON schedule file."""
+        schedule = json.loads(Path(path).read_text())
+        hour, minute = map(int, schedule.get('time', '20:00').split(':'))
+        return cls(tz=schedule.get('timezone', 'America/New_York'),
+                   at=time(hour, minute),
+                   weekdays=[WEEKDAYS.index(day) for day in schedule['weekdays']],
+                   holidays=[date.fromisoformat(day) for day in schedule.get('holidays', [])],
+                   settle_minutes=schedule.get('settle_minutes', 60))
+
+    def is_announcement_day(self, day: date) -> bool:
+        return day.weekday() in self.weekdays and day not in self.holidays
+
+    def _at(self, day: date) -> datetime:
+        return datetime.combine(day, self.at, tzinfo=self.tz)
+
+    def _local(self, now: Optional[datetime]) -> datetime:
+        """`now` in the calendar's timezone, naive datetimes are taken to be in it."""
+        if now is None:
+            return datetime.now(self.tz)
+        if now.tzinfo is None:
+            return now.replace(tzinfo=self.tz)
+        return now.astimezone(self.tz)
+
+    def next_announcement(self, now: Optional[datetime] = None) -> datetime:
+        """The first announcement after `now`."""
+        now = self._local(now)
+        day = now.date()
+        for _ in range(366):
+            if self.is_announcement_day(day) and self._at(day) > now:
+                return self._at(day)
+            day += timedelta(days=1)
+        raise ValueError("No announcement in the next year, check the holidays")
+
+    def previous_announcement(self, now: Optional[datetime] = None) -> datetime:
+        """The last announcement at or before `now`."""
+        now = self._local(now)
+        day = now.date()
+        for _ in range(366):
+            if self.is_announcement_day(day) and self._at(day) <= now:
+                return self._at(day)
+            day -= timedelta(days=1)
+        raise ValueError("No announcement in the last year, check the holidays")
+
+    def next_publish(self, now: Optional[datetime] = None) -> datetime:
+        """When a response that may change at an announcement should expire.
+
+        This is the next announcement, except for `settle_minutes` after
+        an announcement when files may still be changing, then it is
+        shortly in the future."""
+        now = self._local(now)
+        cached = self._cached
+        if cached is None or not (cached[0] <= now < cached[1]):
+            cached = (self.previous_announcement(now), self.next_announcement(now))
+            self._cached = cached
+        prev, nxt = cached
+        settled = prev + self.settle
+        if now < settled:
+            return min(now + SETTLE_EXPIRES, settled)
+        return nxt
@@ -3,7 +3,9 @@
 These are focused on using the GS bucket abs and source files."""
 
 from collections.abc import Callable
+from contextvars import ContextVar
 import re
+from time import perf_counter
 from typing import Union, Literal, Optional, Tuple, List
 
 from dateutil import parser
@@ -11,9 +13,12 @@ from dateutil import parser
 from arxiv.identifier import Identifier
 from arxiv.legacy.papers.dissemination.reasons import FORMATS
 
-from arxiv_dissemination.services.object_store import FileObj, ObjectStore
+from arxiv_dissemination.metrics import tracer, stage, resolve_duration, storage_calls
+from arxiv_dissemination.services.object_store import FileObj, ObjectStore, FileDoesNotExist
+from arxiv_dissemination.services.resolution_cache import ResolutionCache
+from arxiv_dissemination.services.announcement_calendar import SETTLE_EXPIRES
 
-from .key_patterns import abs_path_current_parent, abs_path_orig_parent, ps_cache_pdf_path, current_pdf_path, previous_pdf_path, abs_path_orig, abs_path_current, Formats
+from .key_patterns import paper_keys, Formats
 
 
 import logging
@@ -33,7 +38,7 @@ Conditions = Union[Literal["WITHDRAWN", # Where the version is a WDR
                            "VERSION_NOT_FOUND", # Where the article exists but the version does not
                            "NO_SOURCE", # Article and version exists but no source exists
                            "UNAVAIABLE", # Where the PDF unexpectedly does not exist
-                           "NOT_PDF", # format that doens't serve a pdf
+                           "NOT_PDF", # format that doens't serve a pdf or ps
                            ],
                    Deleted,
                    CannotBuildPdf]
@@ -53,6 +58,12 @@ VALID_SOURCE_EXTENSIONS = [
     '.html.gz',
 ]
 
+SHORT_RESOLUTION_TTL = SETTLE_EXPIRES.total_seconds()
+"""Seconds to cache conditions and resolutions of ids without a version.
+
+A PDF may be built, or a new version arrive, between announcements so
+these are not cached until the next one."""
+
 src_regex = re.compile(r'.*(\.tar\.gz|\.pdf|\.ps\.gz|\.gz|\.div\.gz|\.html\.gz)')
 
 cannot_gen_pdf_regex = re.compile('H|O|X', re.IGNORECASE)
@@ -65,6 +76,30 @@ RE_DATE_COMPONENTS = re.compile(
 
 v_regex = re.compile(r'.*v(\d+)')
 
+class Resolution():
+    """Storage calls made while resolving one id.
+
+    `branch` is the label of the last probe that found an object."""
+    def __init__(self):
+        self.storage_calls = 0
+        self.branch = ''
+
+
+_resolution: ContextVar[Optional[Resolution]] = ContextVar('resolution', default=None)
+
+
+def _branch(item: Union[Conditions, FileObj], res: Resolution) -> str:
+    """Name of the branch that `dissemination_for_id` resolved to."""
+    if isinstance(item, str):
+        return item
+    elif isinstance(item, Deleted):
+        return "DELETED"
+    elif isinstance(item, CannotBuildPdf):
+        return "CANNOT_BUILD_PDF"
+    else:
+        return res.branch
+
+
 def _path_to_version(path: FileObj):
     mtch = v_regex.search(path.name)
     if mtch:
@@ -76,11 +111,13 @@ class ArticleStore():
     def __init__(self,
                  objstore: ObjectStore,
                  reasons: Callable[[str, FORMATS], Optional[str]],
-                 is_deleted: Callable[[str], Optional[str]]
+                 is_deleted: Callable[[str], Optional[str]],
+                 resolution_cache: Optional[ResolutionCache] = None
                  ):
         self.objstore: ObjectStore = objstore
         self.reasons = reasons
         self.is_deleted = is_deleted
+        self.resolution_cache = resolution_cache
 
 
     def status(self) -> Tuple[Literal["GOOD","BAD"], str]:
@@ -123,63 +160,123 @@ class ArticleStore():
         """Gets the version number of the latest version of `arxiv_id`
 
         Returns None if there is no article witht this ID."""
-        orgprefix =f"{abs_path_orig_parent(arxiv_id)}/{arxiv_id.filename}"
-        abs_versions = list(self.objstore.list(orgprefix))
+        keys = paper_keys(arxiv_id)
+        orgprefix = keys.orig_listing_prefix
+        abs_versions = self._list(orgprefix)
         if abs_versions:
             return max(map(_path_to_version, abs_versions)) + 1
 
-        currprefix=abs_path_current(arxiv_id)
-        if self.objstore.to_obj(currprefix).exists():
+        currprefix = keys.abs_current
+        if self._probe(currprefix, 'abs_current').exists():
             return 1
         else:
             logger.debug(f"No current_version, since no objects found in {self.objstore} at {orgprefix} and {currprefix}")
             return None  # article does not exist
 
     def abs_for_id(self, arxiv_id: Identifier, version=0, current=0, any=False) -> Union[FileObj, AbsConditions]:
-        first_version = (version != 0 and version == 1) or arxiv_id.version == 1
-        if current or not arxiv_id.has_version or first_version:
-            abs = self.objstore.to_obj(abs_path_current(arxiv_id))
+        """Gets the abs for the version, the current abs if there is no version.
+
+        The abs of a version that is not current is in orig and has
+        only the dates up to that version."""
+        keys = paper_keys(arxiv_id)
+        version = version or arxiv_id.version
+        if current or not version:
+            abs = self._probe(keys.abs_current, 'abs_current')
             if abs.exists():
                 return abs
             else:
                 return "ARTICLE_NOT_FOUND" # should always be a current abs file
 
-        version = version or arxiv_id.version
-        abs = self.objstore.to_obj(abs_path_orig(arxiv_id, version=version))
+        abs = self._probe(keys.abs_orig(version), 'abs_orig')
         if abs.exists():
             return abs
 
         # All that is left is if a version is desired and that version is the one in ftp.
         # The version in ftp is one higher than the highest version in orig.
-        abs = self.objstore.to_obj(abs_path_orig(arxiv_id, version=arxiv_id.version-1))
+        if version == 1:
+            abs = self._probe(keys.abs_current, 'abs_current')
+            return abs if abs.exists() else "ARTICLE_NOT_FOUND"
+        abs = self._probe(keys.abs_orig(version-1), 'abs_orig')
         if abs.exists():
-            return abs
+            return self._probe(keys.abs_current, 'abs_current')
         else:
             return "VERSION_NOT_FOUND" # ambitious? what if the article doens't exist?
 
 
-    def dissemination_for_id(self, format: Formats, arxiv_id: Identifier) -> Union[Conditions, FileObj]:
-        """Gets FileObj for an `Identifier` with or without a version."""
-        if format != "pdf":
-            raise Exception("Only PDF is currently supported")
+    def dissemination_for_id(self, format: Formats, arxiv_id: Identifier,
+                             refresh: bool = False) -> Union[Conditions, FileObj]:
+        """Gets FileObj for an `Identifier` with or without a version.
+
+        `format` is one of `pdf`, `ps`, `e-print` for the source or
+        `abs` for the abs file.
+
+        This is done in a `dissemination_for_id` span with the resolved
+        branch and the number of storage calls as attributes.
+
+        If there is a `resolution_cache` the result is saved in it,
+        except for UNAVAIABLE since the PDF may be built soon.
+        Conditions and ids without a version are saved for
+        `SHORT_RESOLUTION_TTL`. With `refresh` the cache is not read,
+        the id is resolved from storage and its entry replaced."""
+        res = Resolution()
+        token = _resolution.set(res)
+        start = perf_counter()
+        branch, cached = 'ERROR', False
+        key = (format, arxiv_id.id, arxiv_id.version)
+        try:
+            with tracer.start_as_current_span("dissemination_for_id",
+                                              attributes={"arxiv_id": arxiv_id.idv}) as span:
+                hit = self.resolution_cache.get(key) \
+                    if self.resolution_cache is not None and not refresh else None
+                if hit is not None:
+                    item, branch = hit
+                    cached = True
+                else:
+                    item = self._dissemination_for_id(format, arxiv_id)
+                    branch = _branch(item, res)
+                    if self.resolution_cache is not None and branch != "UNAVAIABLE":
+                        short = not isinstance(item, FileObj) or not arxiv_id.has_version
+                        self.resolution_cache.put(key, (item, branch),
+                                                  SHORT_RESOLUTION_TTL if short else None)
+                span.set_attributes({"dissemination.branch": branch,
+                                     "dissemination.cached": cached,
+                                     "dissemination.storage_calls": res.storage_calls})
+                return item
+        finally:
+            _resolution.reset(token)
+            attrs = {"branch": branch, "cached": cached}
+            resolve_duration.record((perf_counter() - start) * 1000, attrs)
+            storage_calls.record(res.storage_calls, attrs)
+
+    def _dissemination_for_id(self, format: Formats, arxiv_id: Identifier) -> Union[Conditions, FileObj]:
+        if format == "ps":
+            return self._ps_for_id(arxiv_id)
+        elif format == "e-print":
+            return self._source_for_id(arxiv_id)
+        elif format == "abs":
+            deleted = self._is_deleted(arxiv_id)
+            return Deleted(deleted) if deleted else self.abs_for_id(arxiv_id)
+        elif format != "pdf":
+            raise ValueError(f"Format {format} is not supported")
 
         if not arxiv_id.has_version:
             return self.dissemination_for_id_current(format, arxiv_id)
         
-        deleted = self.is_deleted(arxiv_id.id)
+        deleted = self._is_deleted(arxiv_id)
         if deleted:
             return Deleted(deleted)
-        res = self.reasons(arxiv_id.idv, format)
+        res = self._reasons(arxiv_id, format)
         if res:
             return CannotBuildPdf(res)
 
+        keys = paper_keys(arxiv_id)
         # try from the ps_cache with the version number
-        ps_cache_pdf = self.objstore.to_obj(ps_cache_pdf_path(format, arxiv_id))
+        ps_cache_pdf = self._probe(keys.ps_cache_pdf(format), 'ps_cache')
         if ps_cache_pdf.exists():
             return ps_cache_pdf
 
         # try from the /orig with version number for a pdf only paper
-        non_current_pdf=self.objstore.to_obj(previous_pdf_path(arxiv_id))
+        non_current_pdf = self._probe(keys.previous_pdf, 'orig_pdf')
         if non_current_pdf.exists():
             return non_current_pdf
 
@@ -191,7 +288,7 @@ class ArticleStore():
         if arxiv_id.version > cur_version:
             return "VERSION_NOT_FOUND"
 
-        current_pdf = self.objstore.to_obj(current_pdf_path(arxiv_id))
+        current_pdf = self._probe(keys.current_pdf, 'ftp_pdf')
         if current_pdf.exists():
             return current_pdf
         
@@ -209,10 +306,10 @@ class ArticleStore():
 
     def dissemination_for_id_current(self, format: Formats, arxiv_id: Identifier) -> Union[Conditions, FileObj]:
         """Gets PDF FileObj for most current version for `Identifier`."""
-        res =  self.reasons(arxiv_id.idv, format)
+        res = self._reasons(arxiv_id, format)
         if res:
             return CannotBuildPdf(res)        
-        deleted = self.is_deleted(arxiv_id.id)
+        deleted = self._is_deleted(arxiv_id)
         if deleted:
             return Deleted(deleted)
 
@@ -220,11 +317,12 @@ class ArticleStore():
         if not version:
             return "ARTICLE_NOT_FOUND"
         
-        ps_cache_pdf = self.objstore.to_obj(ps_cache_pdf_path(format, arxiv_id, version))
+        keys = paper_keys(arxiv_id)
+        ps_cache_pdf = self._probe(keys.ps_cache_pdf(format, version), 'ps_cache')
         if ps_cache_pdf.exists():
             return ps_cache_pdf
 
-        current_pdf = self.objstore.to_obj(current_pdf_path(arxiv_id))
+        current_pdf = self._probe(keys.current_pdf, 'ftp_pdf')
         if current_pdf.exists():
             return current_pdf
 
@@ -245,6 +343,103 @@ class ArticleStore():
         return "UNAVAIABLE"
 
 
+    def _ps_for_id(self, arxiv_id: Identifier) -> Union[Conditions, FileObj]:
+        """Gets the gzipped PostScript FileObj from the ps_cache.
+
+        PostScript is only in the ps_cache, so if it is not there this
+        is the same conditions as for a PDF that is not built."""
+        deleted = self._is_deleted(arxiv_id)
+        if deleted:
+            return Deleted(deleted)
+        res = self._reasons(arxiv_id, "ps")
+        if res:
+            return CannotBuildPdf(res)
+
+        cur_version = None
+        if not arxiv_id.has_version:
+            cur_version = self.current_version(arxiv_id)
+            if not cur_version:
+                return "ARTICLE_NOT_FOUND"
+        keys = paper_keys(arxiv_id)
+        ps = self._probe(keys.ps_cache_ps(arxiv_id.version or cur_version), 'ps_cache_ps')
+        if ps.exists():
+            return ps
+
+        cur_version = cur_version or self.current_version(arxiv_id)
+        if not cur_version:
+            return "ARTICLE_NOT_FOUND"
+        if arxiv_id.version > cur_version:
+            return "VERSION_NOT_FOUND"
+        src_type = self._source_type(arxiv_id)
+        if re.search('I', src_type, re.IGNORECASE):
+            return "WITHDRAWN"
+        if not self._source_exists(arxiv_id):
+            return "NO_SOURCE"
+        if re.search(cannot_gen_pdf_regex, src_type):
+            return "NOT_PDF"
+        return "UNAVAIABLE"
+
+    def _source_for_id(self, arxiv_id: Identifier) -> Union[Conditions, FileObj]:
+        """Gets the FileObj of the source, any of `VALID_SOURCE_EXTENSIONS`."""
+        deleted = self._is_deleted(arxiv_id)
+        if deleted:
+            return Deleted(deleted)
+        cur_version = self.current_version(arxiv_id)
+        if not cur_version:
+            return "ARTICLE_NOT_FOUND"
+        version = arxiv_id.version or cur_version
+        if version > cur_version:
+            return "VERSION_NOT_FOUND"
+
+        current = version == cur_version
+        stem = paper_keys(arxiv_id).source_stem(version, current)
+        names = [stem.split('/')[-1] + ext for ext in VALID_SOURCE_EXTENSIONS]
+        for item in self._list(stem):
+            if item.name.split('/')[-1] in names:
+                res = _resolution.get()
+                if res is not None:
+                    res.branch = 'ftp_src' if current else 'orig_src'
+                return item
+
+        if re.search('I', self._source_type(arxiv_id), re.IGNORECASE):
+            return "WITHDRAWN"
+        return "NO_SOURCE"
+
+    def _probe(self, key: str, branch: str) -> FileObj:
+        """Gets the `FileObj` for `key` in a `storage.to_obj` span.
+
+        `branch` labels the probe for the trace and for the resolved
+        branch if the object exists."""
+        with stage("storage.to_obj", {"storage.key": key, "dissemination.branch": branch}) as span:
+            obj = self.objstore.to_obj(key)
+            # not obj.exists() since that is another request for a GS Blob
+            found = not isinstance(obj, FileDoesNotExist)
+            span.set_attribute("storage.found", found)
+        res = _resolution.get()
+        if res is not None:
+            res.storage_calls += 1
+            if found:
+                res.branch = branch
+        return obj
+
+    def _list(self, prefix: str) -> List[FileObj]:
+        """Lists the objects with `prefix` in a `storage.list` span."""
+        with stage("storage.list", {"storage.prefix": prefix}) as span:
+            items = list(self.objstore.list(prefix))
+            span.set_attribute("storage.count", len(items))
+        res = _resolution.get()
+        if res is not None:
+            res.storage_calls += 1
+        return items
+
+    def _is_deleted(self, arxiv_id: Identifier) -> Optional[str]:
+        with stage("is_deleted"):
+            return self.is_deleted(arxiv_id.id)
+
+    def _reasons(self, arxiv_id: Identifier, format: Formats) -> Optional[str]:
+        with stage("reasons"):
+            return self.reasons(arxiv_id.idv, format)
+
     def is_withdrawn(self, arxiv_id: Identifier) -> bool:
         """Is a version is withdrawn?
 
@@ -262,9 +457,10 @@ class ArticleStore():
         values from the abs we should have a metatdata object like in
         arxiv-browse.
         """
-        abs_key = abs_path_current(arxiv_id)
+        abs_key = paper_keys(arxiv_id).abs_current
         datelines = []
-        with self.objstore.to_obj(abs_key).open('r') as fh:
+        with stage("abs_parse", {"storage.key": abs_key}), \
+             self._probe(abs_key, 'abs_current').open('r') as fh:
             in_data = False
             for line in fh.readlines():
                 line = line.strip()
@@ -327,10 +523,10 @@ class ArticleStore():
             return False # does source exist or not for a non found paper?
         vnum, is_current = res
 
-        parent = abs_path_current_parent(arxiv_id) if is_current else abs_path_orig_parent(arxiv_id)
-        pattern = parent + '/' + arxiv_id.filename
+        keys = paper_keys(arxiv_id)
+        pattern = keys.current_listing_prefix if is_current else keys.orig_listing_prefix
 
-        items = list(self.objstore.list(pattern))
+        items = self._list(pattern)
         if len(items) > 1000:
             logger.warning("list of matches to is_withdrawn was %d, unexpectedly large", len(items))
             return True # strange but don't get into handling a huge list
@@ -0,0 +1,83 @@
+"""In-process cache of the first and last bytes of large objects.
+
+A PDF viewer's first Range requests for a large PDF are for the start
+of the file, with the header and any linearization dictionary, and for
+its end, with the xref and trailer. Caching a head and a tail of each
+hot object lets those be answered without a round trip to storage.
+
+Entries are keyed on the full key and generation of the object, see
+`content_key()`, so a new generation is never served from an old one.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Hashable, Optional
+
+from .object_store import FileObj, content_key
+
+
+class HeadTailCache():
+    """LRU cache of up to `max_bytes` of the first and last `span` bytes
+    of objects of at least `min_size` bytes.
+
+    Safe to use from multiple threads."""
+
+    def __init__(self, max_bytes: int, span: int = 256 * 1024, min_size: int = 2 * 1024 * 1024):
+        if span <= 0:
+            raise ValueError("span must be positive")
+        self.max_bytes = max_bytes
+        self.span = span
+        self.min_size = min_size
+        self._lock = Lock()
+        self._entries: OrderedDict[Hashable, bytes] = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def read(self, item: FileObj, start: int, end: int) -> Optional[bytes]:
+        """Gets bytes `start` to `end`, inclusive, of `item` from its head or tail.
+
+        On a miss the whole head or tail is read with one
+        `download_as_bytes()` and cached. Returns None if `item` is
+        smaller than `min_size` or the range is not within its head or
+        tail, the caller should read it from storage."""
+        size = item.size
+        if size < self.min_size or size <= self.span:
+            return None
+        if end < self.span:
+            part, offset = 'head', 0
+        elif start >= size - self.span:
+            part, offset = 'tail', size - self.span
+        else:
+            return None
+
+        key = (*content_key(item), part)
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if data is None:
+            data = item.download_as_bytes(start=offset, end=offset + self.span - 1)
+            self._put(key, data)
+        return data[start - offset:end - offset + 1]
+
+    def _put(self, key: Hashable, data: bytes):
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes and self._entries:
+                _, old = self._entries.popitem(last=False)
+                self._size -= len(old)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
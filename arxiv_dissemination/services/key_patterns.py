@@ -1,16 +1,97 @@
 """Key to PDF, abs and src for a given ID"""
 
 import re
+import sys
+from functools import lru_cache
 from typing import Union, Literal, Optional
 
 from arxiv.identifier import Identifier
 
-Formats = Literal["pdf", "ps"]
+Formats = Literal["pdf", "ps", "e-print", "abs"]
 
 
-def _ps_cache_part(format: Formats, arxiv_id: Identifier) -> str:
+class PaperKeys():
+    """All the storage keys for one arXiv id, computed once.
+
+    Use `paper_keys()` to get one of these, it is memoized by `idv`.
+
+    The directory prefixes are interned since they are shared by every
+    paper from the same archive and month.
+
+    The keys are all returned if the object exists or not."""
+
+    __slots__ = ('filename', 'version',
+                 'orig_parent', 'current_parent', 'ps_cache_parents',
+                 'orig_listing_prefix', 'current_listing_prefix',
+                 'abs_current', 'current_pdf', 'previous_pdf',
+                 'abs_orig_versioned', 'ps_cache_pdf_versioned')
+
+    def __init__(self, archive: str, yymm: str, filename: str, version: int):
+        self.filename = filename
+        self.version = version
+
+        self.orig_parent = sys.intern(f"orig/{archive}/papers/{yymm}")
+        """Directory of the non-current versions of the abs and source."""
+        self.current_parent = sys.intern(f"ftp/{archive}/papers/{yymm}")
+        """Directory of the current version of the abs and source."""
+        self.ps_cache_parents = {
+            fmt: sys.intern(f"ps_cache/{archive}/{fmt}/{yymm}") for fmt in ("pdf", "ps")}
+        """Directory of the ps_cache, all versions are in the same directory."""
+
+        self.orig_listing_prefix = f"{self.orig_parent}/{filename}"
+        """Prefix to list all the non-current versions in orig."""
+        self.current_listing_prefix = f"{self.current_parent}/{filename}"
+        """Prefix to list all the current files in ftp."""
+
+        self.abs_current = f"{self.current_listing_prefix}.abs"
+        self.current_pdf = f"{self.current_listing_prefix}.pdf"
+        self.previous_pdf = f"{self.orig_listing_prefix}v{version}.pdf"
+        self.abs_orig_versioned = f"{self.orig_listing_prefix}v{version}.abs"
+        self.ps_cache_pdf_versioned = f"{self.ps_cache_parents['pdf']}/{filename}v{version}.pdf"
+
+    def abs_orig(self, version=0) -> str:
+        """Key for the abstract in orig for `version` or the version of the id."""
+        if not version or version == self.version:
+            return self.abs_orig_versioned
+        return f"{self.orig_listing_prefix}v{version}.abs"
+
+    def ps_cache_pdf(self, format: Formats = "pdf", version=0) -> str:
+        """Key for the PDF in ps_cache for `version` or the version of the id."""
+        if format == "pdf" and (not version or version == self.version):
+            return self.ps_cache_pdf_versioned
+        return f"{self.ps_cache_parents[format]}/{self.filename}v{version or self.version}.pdf"
+
+    def ps_cache_ps(self, version=0) -> str:
+        """Key for the gzipped PostScript in ps_cache for `version` or the version of the id."""
+        return f"{self.ps_cache_parents['ps']}/{self.filename}v{version or self.version}.ps.gz"
+
+    def source_stem(self, version: int, current: bool) -> str:
+        """Key of the source for `version` without its extension.
+
+        The source is `{stem}.tar.gz`, `{stem}.pdf` etc. and is in ftp
+        for the current version and in orig for the others."""
+        if current:
+            return self.current_listing_prefix
+        return f"{self.orig_listing_prefix}v{version}"
+
+    def ps_cache_listing_prefix(self, format: Formats = "pdf") -> str:
+        """Prefix to list all the versions in the ps_cache."""
+        return f"{self.ps_cache_parents[format]}/{self.filename}"
+
+
+@lru_cache(maxsize=16384)
+def _paper_keys(archive: str, yymm: str, filename: str, version: int) -> PaperKeys:
+    return PaperKeys(archive, yymm, filename, version)
+
+
+def paper_keys(arxiv_id: Identifier) -> PaperKeys:
+    """Gets the `PaperKeys` for `arxiv_id`, memoized by `idv`."""
     archive = arxiv_id.archive if arxiv_id.is_old_id else 'arxiv'
-    return f"ps_cache/{archive}/{format}/{arxiv_id.yymm}"
+    return _paper_keys(archive, arxiv_id.yymm, arxiv_id.filename, arxiv_id.version)
+
+
+def _ps_cache_part(format: Formats, arxiv_id: Identifier) -> str:
+    return paper_keys(arxiv_id).ps_cache_parents[format]
 
 def ps_cache_pdf_path(format:Formats, arxiv_id: Identifier, version=0)  -> str:
     """Returns the path for a PDF from the ps_cache for a version.
@@ -23,46 +104,36 @@ def ps_cache_pdf_path(format:Formats, arxiv_id: Identifier, version=0)  -> str:
     This will return the proper path if it exists or not.
 
     if version is passed, that will be used instead of the version on arxiv_id."""
-    dir = _ps_cache_part(format, arxiv_id)
-    if not version:
-        version = arxiv_id.version
-    return f"{dir}/{arxiv_id.filename}v{version}.pdf"
+    return paper_keys(arxiv_id).ps_cache_pdf(format, version)
 
 
 def current_pdf_path(arxiv_id: Identifier) -> str:
     """Returns the path for a PDF only submission for a current version.
 
     This will return the proper path if it exists or not."""
-    archive = arxiv_id.archive if arxiv_id.is_old_id else 'arxiv'
-    return f"ftp/{archive}/papers/{arxiv_id.yymm}/{arxiv_id.filename}.pdf"
+    return paper_keys(arxiv_id).current_pdf
 
 
 def previous_pdf_path(arxiv_id: Identifier) -> str:
     """Returns the path for a PDF only submission for a non current version.
 
     This will return the proper path if it exists or not."""
-    archive = arxiv_id.archive if arxiv_id.is_old_id else 'arxiv'
-    return f"orig/{archive}/papers/{arxiv_id.yymm}/{arxiv_id.filename}v{arxiv_id.version}.pdf"
+    return paper_keys(arxiv_id).previous_pdf
 
 def abs_path_orig_parent(arxiv_id: Identifier) -> str:
     """Returns the path to the directory of the abstract in orig"""
-    archive = arxiv_id.archive if arxiv_id.is_old_id else 'arxiv'
-    return f"orig/{archive}/papers/{arxiv_id.yymm}"
+    return paper_keys(arxiv_id).orig_parent
 
 def abs_path_orig(arxiv_id: Identifier, version=0) -> str:
     """Returns the path to the abstract in orig.
 
     If version is passed, that will be used instead of the version on arxiv_id."""
-    if not version:
-        version = arxiv_id.version
-    return f"{abs_path_orig_parent(arxiv_id)}/{arxiv_id.filename}v{version}.abs"
+    return paper_keys(arxiv_id).abs_orig(version)
 
 def abs_path_current_parent(arxiv_id: Identifier) -> str:
     """Returns the path to the parent dirctory of the abstract in the current version location"""
-    archive = arxiv_id.archive if arxiv_id.is_old_id else 'arxiv'
-    return f"ftp/{archive}/papers/{arxiv_id.yymm}"
+    return paper_keys(arxiv_id).current_parent
 
 def abs_path_current(arxiv_id: Identifier) -> str:
     """Returns the path to the abstract in the current version location"""
-    archive = arxiv_id.archive if arxiv_id.is_old_id else 'arxiv'
-    return f"{abs_path_current_parent(arxiv_id)}/{arxiv_id.filename}.abs"
+    return paper_keys(arxiv_id).abs_current
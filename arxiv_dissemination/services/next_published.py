@@ -1,26 +1,20 @@
-from datetime import datetime, timezone, timedelta
+from datetime import datetime
+from typing import Optional
 
-def next_publish(now=None):
-    """Guesses the next publish but knows nothing about holidays.
+from .announcement_calendar import AnnouncementCalendar
+
+calendar = AnnouncementCalendar.from_file()
+"""Calendar used by `next_publish`, the app factory may replace this."""
 
-    This is a conservative approch. If this is used for Expires
-    headers should never cache when the contents were updated due to publish. It will
-    cache less then optimal when there is a holiday and nothing could
-    have been updated.
-    """
-    if now == None:
-        now = datetime.now()
 
-    if now.weekday() in [0,1,2,3,6]:
-        if now.hour > 20 and now.hour < 21:
-            #It's around publish time, PDF might change, really short
-            return now.replace(minute=now.minute + 5)
-        elif now.hour > 21:
-            return next_publish((now + timedelta(days=1)).replace(hour=12))
-        else:
-            return now.replace(hour=20)
+def next_publish(now: Optional[datetime] = None) -> datetime:
+    """Gets when the contents may next change due to an announcement.
 
-    if now.weekday() == 4:
-        return (now + timedelta(days=2)).replace(hour=20)
-    if now.weekday() == 5:
-        return (now + timedelta(days=2)).replace(hour=20)
+    If this is used for Expires headers it should never cache past
+    when the contents were updated due to publish. It knows about the
+    holidays in the schedule of `calendar`.
+
+    Returns a timezone aware datetime. A naive `now` is taken to be in
+    the calendar's timezone, US/Eastern by default.
+    """
+    return calendar.next_publish(now)
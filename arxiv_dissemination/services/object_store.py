@@ -1,7 +1,7 @@
 """ABC of the object store service."""
 
 from abc import ABC, abstractmethod
-from typing import IO, Iterable, Tuple, Literal
+from typing import IO, Iterable, Optional, Tuple, Literal
 from datetime import datetime
 
 
@@ -34,6 +34,14 @@ class FileObj(ABC):
         """Opens the object similar to the normal Python `open()`"""
         pass
 
+    @abstractmethod
+    def download_as_bytes(self, client=None, start: Optional[int] = None,
+                          end: Optional[int] = None) -> bytes:
+        """Gets the bytes from `start` to `end`, inclusive, in one request.
+
+        Pass `start` and `end` as keywords since `Blob` takes a client first."""
+        pass
+
     @property
     @abstractmethod
     def etag(self) -> str:
@@ -79,6 +87,22 @@ class ObjectStore(ABC):
         """
         pass
 
+def content_key(item: FileObj) -> Tuple[str, str]:
+    """Key of the content of `item` for in-process caches.
+
+    This is the full key and the `generation` of a GS `Blob`, which
+    changes on every write, or the etag for other `FileObj`."""
+    generation = getattr(item, 'generation', None)
+    return (item.name, str(generation) if generation else item.etag)
+
+
+def read_range(fh: IO, start: Optional[int] = None, end: Optional[int] = None) -> bytes:
+    """Reads from `start` to `end`, inclusive, of a seekable `fh` like `Blob.download_as_bytes()`."""
+    start = start or 0
+    fh.seek(start)
+    return fh.read() if end is None else fh.read(end - start + 1)
+
+
 class FileDoesNotExist(FileObj):
     """Represents a file that does not exist"""
 
@@ -95,6 +119,9 @@ class FileDoesNotExist(FileObj):
     def open(self, *args, **kwargs) -> IO:
         raise Exception("File does not exist")
 
+    def download_as_bytes(self, client=None, start=None, end=None) -> bytes:
+        raise Exception("File does not exist")
+
     @property
     def etag(self) -> str:
         raise Exception("File does not exist")
@@ -0,0 +1,198 @@
+"""ObjectStore that counts the storage calls, latency and bytes read per request.
+
+Wrap any `ObjectStore` in `AccountingObjectStore` and call
+`start_request()` at the start of each request. The `StorageStats`
+for the request are then available from `current_stats()`.
+"""
+
+from contextvars import ContextVar
+from datetime import datetime
+from threading import Lock
+from time import perf_counter
+from typing import IO, Dict, Iterator, Optional
+
+from arxiv_dissemination.metrics import storage_call_duration
+
+from .object_store import ObjectStore, FileObj, FileDoesNotExist
+
+
+class StorageStats():
+    """Counts of the storage calls made during one request.
+
+    Bytes may be added after the request while the body is streamed,
+    so the counts are guarded by a lock."""
+
+    def __init__(self):
+        self.calls: Dict[str, int] = {}
+        self.ms = 0.0
+        self.bytes = 0
+        self._lock = Lock()
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def add_call(self, op: str, ms: float):
+        with self._lock:
+            self.calls[op] = self.calls.get(op, 0) + 1
+            self.ms += ms
+
+    def add_bytes(self, count: int):
+        with self._lock:
+            self.bytes += count
+
+    def __str__(self):
+        calls = ' '.join(f"{op}={count}" for op, count in sorted(self.calls.items()))
+        return f"calls {self.total_calls} ({calls}) in {self.ms:.1f}ms, {self.bytes} bytes"
+
+
+_stats: ContextVar[Optional[StorageStats]] = ContextVar('storage_stats', default=None)
+
+
+def start_request() -> StorageStats:
+    """Starts a new `StorageStats` for the current request and returns it."""
+    stats = StorageStats()
+    _stats.set(stats)
+    return stats
+
+
+def current_stats() -> Optional[StorageStats]:
+    """Gets the `StorageStats` for the current request or None if not started."""
+    return _stats.get()
+
+
+def _record(op: str, start: float, stats: Optional[StorageStats]):
+    ms = (perf_counter() - start) * 1000
+    storage_call_duration.record(ms, {"op": op})
+    if stats is not None:
+        stats.add_call(op, ms)
+
+
+class AccountingObjectStore(ObjectStore):
+    """Wraps an `ObjectStore` to account for every call made to it."""
+
+    def __init__(self, store: ObjectStore):
+        self.store = store
+
+    def to_obj(self, key: str) -> FileObj:
+        stats = current_stats()
+        start = perf_counter()
+        obj = self.store.to_obj(key)
+        _record('to_obj', start, stats)
+        if isinstance(obj, FileDoesNotExist):
+            return obj
+        return AccountingFileObj(obj, stats)
+
+    def list(self, prefix: str) -> Iterator[FileObj]:
+        stats = current_stats()
+        start = perf_counter()
+        items = [AccountingFileObj(item, stats) for item in self.store.list(prefix)]
+        _record('list', start, stats)
+        return iter(items)
+
+    def status(self):
+        return self.store.status()
+
+    def __str__(self):
+        return f"<AccountingObjectStore {self.store}>"
+
+
+class AccountingFileObj(FileObj):
+    """Wraps a `FileObj` to count the calls to it and the bytes read from it.
+
+    Calls are counted against the `StorageStats` of the current request,
+    or the request the object was gotten in if there is none, since the
+    object may be cached and used by later requests. Bytes are counted
+    against the request that opened the object since the body may be
+    read after that request's context is gone."""
+
+    def __init__(self, obj: FileObj, stats: Optional[StorageStats]):
+        self.obj = obj
+        self.stats = stats
+
+    @property
+    def name(self) -> str:
+        return self.obj.name
+
+    def exists(self) -> bool:
+        """Counted as a call since for a GS `Blob` this is a request."""
+        start = perf_counter()
+        exists = self.obj.exists()
+        _record('exists', start, self._stats())
+        return exists
+
+    def open(self, *args, **kwargs) -> IO:
+        start = perf_counter()
+        stats = self._stats()
+        fh = self.obj.open(*args, **kwargs)
+        _record('open', start, stats)
+        return _CountingReader(fh, stats)
+
+    def download_as_bytes(self, client=None, start=None, end=None) -> bytes:
+        start_time = perf_counter()
+        stats = self._stats()
+        data = self.obj.download_as_bytes(start=start, end=end)
+        _record('download', start_time, stats)
+        if stats is not None:
+            stats.add_bytes(len(data))
+        return data
+
+    def _stats(self) -> Optional[StorageStats]:
+        stats = current_stats()
+        return stats if stats is not None else self.stats
+
+    @property
+    def etag(self) -> str:
+        return self.obj.etag
+
+    @property
+    def size(self) -> int:
+        return self.obj.size
+
+    @property
+    def updated(self) -> datetime:
+        return self.obj.updated
+
+    def __getattr__(self, name):
+        return getattr(self.obj, name)
+
+    def __repr__(self):
+        return f"<AccountingFileObj {self.obj!r}>"
+
+
+class _CountingReader():
+    """File handle that counts what is read through it."""
+
+    def __init__(self, fh: IO, stats: Optional[StorageStats]):
+        self.fh = fh
+        self.stats = stats
+
+    def _count(self, data):
+        if self.stats is not None and data:
+            self.stats.add_bytes(len(data))
+        return data
+
+    def read(self, *args):
+        return self._count(self.fh.read(*args))
+
+    def readline(self, *args):
+        return self._count(self.fh.readline(*args))
+
+    def readlines(self, *args):
+        lines = self.fh.readlines(*args)
+        if self.stats is not None:
+            self.stats.add_bytes(sum(map(len, lines)))
+        return lines
+
+    def __iter__(self):
+        for line in self.fh:
+            yield self._count(line)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fh.close()
+
+    def __getattr__(self, name):
+        return getattr(self.fh, name)
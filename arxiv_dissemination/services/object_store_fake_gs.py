@@ -0,0 +1,197 @@
+"""ObjectStore that acts like `GsObjectStore` but is backed by a local directory.
+
+For benchmarks and load tests without a bucket or network. It follows
+the calls `GsObjectStore` makes to GCS:
+
+- `to_obj()` is a get of the object metadata
+- `list()` is a list of objects with a prefix
+- `FakeBlob.exists()` is a get of the object metadata, as `Blob.exists()` is
+- `FakeBlob.open()` starts a media download
+- `FakeBlob.download_as_bytes()` is one ranged media download
+
+Each of these calls sleeps for a time from a `Latency` distribution,
+may be throttled with a `TooManyRequests` (429) and may fail with a
+`ServiceUnavailable` (503) like the google-cloud-storage client would
+raise.
+"""
+
+import glob
+import hashlib
+import random
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from threading import Lock
+from typing import IO, Dict, Iterator, Optional
+
+from google.api_core.exceptions import ServiceUnavailable, TooManyRequests
+
+from .object_store import ObjectStore, FileObj, FileDoesNotExist, read_range
+
+
+class Latency():
+    """A distribution of latency in ms.
+
+    Made from a spec like:
+
+    - `fixed:20` always 20ms
+    - `uniform:5:50` between 5 and 50ms
+    - `exp:20` exponential with a mean of 20ms
+    - `lognormal:20:0.6` lognormal with a median of 20ms and sigma of 0.6,
+      the long tail is most like GCS
+    - `0` or empty for no latency
+    """
+
+    def __init__(self, spec: str):
+        self.spec = spec or '0'
+        parts = self.spec.split(':')
+        self.kind, self.args = parts[0], [float(arg) for arg in parts[1:]]
+        if self.kind == '0':
+            self.kind = 'fixed'
+            self.args = [0.0]
+        nargs = {'fixed': 1, 'uniform': 2, 'exp': 1, 'lognormal': 2}
+        if self.kind not in nargs or len(self.args) != nargs[self.kind]:
+            raise ValueError(f"Bad latency spec {spec}")
+
+    def sample(self, rnd: random.Random) -> float:
+        """A latency in ms."""
+        if self.kind == 'fixed':
+            return self.args[0]
+        elif self.kind == 'uniform':
+            return rnd.uniform(*self.args)
+        elif self.kind == 'exp':
+            return rnd.expovariate(1 / self.args[0]) if self.args[0] else 0.0
+        else:
+            median, sigma = self.args
+            return rnd.lognormvariate(0, sigma) * median
+
+    def __str__(self):
+        return self.spec
+
+
+class FakeGsObjectStore(ObjectStore):
+    """Fake of `GsObjectStore` backed by the files under `root`.
+
+    `latency` is a dict of op to `Latency` for the ops `get`, `list`
+    and `download`, missing ops have no latency.
+
+    Calls over `max_qps` in a second raise `TooManyRequests`, 0 is no
+    limit. Each call raises `ServiceUnavailable` with probability
+    `error_rate`.
+    """
+
+    def __init__(self, root: str, latency: Optional[Dict[str, Latency]] = None,
+                 max_qps: float = 0, error_rate: float = 0.0,
+                 seed: Optional[int] = None, bucket_name: str = 'fake-bucket'):
+        self.root = Path(root)
+        self.latency = latency or {}
+        self.max_qps = max_qps
+        self.error_rate = error_rate
+        self.bucket_name = bucket_name
+        self.calls: Dict[str, int] = {}
+        self._rnd = random.Random(seed)
+        self._lock = Lock()
+        self._window = 0
+        self._window_calls = 0
+
+    def call(self, op: str):
+        """Simulates one request to GCS for `op`."""
+        with self._lock:
+            self.calls[op] = self.calls.get(op, 0) + 1
+            delay = self.latency[op].sample(self._rnd) if op in self.latency else 0.0
+            error = self.error_rate and self._rnd.random() < self.error_rate
+            throttled = False
+            if self.max_qps:
+                window = int(time.monotonic())
+                if window != self._window:
+                    self._window, self._window_calls = window, 0
+                self._window_calls += 1
+                throttled = self._window_calls > self.max_qps
+        if delay:
+            time.sleep(delay / 1000)
+        if throttled:
+            raise TooManyRequests(f"Fake rate limit of {self.max_qps} qps exceeded for {op}")
+        if error:
+            raise ServiceUnavailable(f"Fake error for {op}")
+
+    def to_obj(self, key: str) -> FileObj:
+        """Gets a `FakeBlob` like `Bucket.get_blob()`.
+
+        Returns `FileDoesNotExist` if there is no object at the key."""
+        self.call('get')
+        path = self.root / key
+        if not path.is_file():
+            return FileDoesNotExist(f"gs://{self.bucket_name}/{key}")
+        return FakeBlob(self, key, path)
+
+    def list(self, prefix: str) -> Iterator[FileObj]:
+        """Gets the objects with keys that start with `prefix`.
+
+        Like `GsObjectStore.list()` the listing is not limited to a directory."""
+        self.call('list')
+        parent, name = self.root / prefix, ''
+        if not prefix.endswith('/'):
+            parent, name = parent.parent, parent.name
+        if not parent.is_dir():
+            return iter([])
+        paths = []
+        for path in sorted(parent.glob(f"{glob.escape(name)}*")):
+            if path.is_dir():
+                paths.extend(sorted(sub for sub in path.rglob('*') if sub.is_file()))
+            else:
+                paths.append(path)
+        return iter([FakeBlob(self, str(path.relative_to(self.root)), path) for path in paths])
+
+    def status(self):
+        if self.root.exists():
+            return ("GOOD", '')
+        else:
+            return ("BAD", "fake bucket directory does not exist")
+
+    def __str__(self):
+        return f"<FakeGsObjectStore {self.root} latency {dict((k, str(v)) for k, v in self.latency.items())}>"
+
+
+class FakeBlob(FileObj):
+    """Fake of a GS `Blob`, `name` is the key as it is on a `Blob`."""
+
+    def __init__(self, store: FakeGsObjectStore, key: str, path: Path):
+        self.store = store
+        self.key = key
+        self.path = path
+        stat = path.stat()
+        self._size = stat.st_size
+        self._updated = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+        self._etag = hashlib.md5(f"{key}{stat.st_mtime_ns}{stat.st_size}".encode()).hexdigest()
+
+    @property
+    def name(self) -> str:
+        return self.key
+
+    def exists(self) -> bool:
+        self.store.call('get')
+        return self.path.is_file()
+
+    def open(self, mode='rb', *args, **kwargs) -> IO:
+        self.store.call('download')
+        return self.path.open(mode, *args, **kwargs)
+
+    def download_as_bytes(self, client=None, start=None, end=None) -> bytes:
+        self.store.call('download')
+        with self.path.open('rb') as fh:
+            return read_range(fh, start, end)
+
+    @property
+    def etag(self) -> str:
+        return self._etag
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def updated(self) -> datetime:
+        return self._updated
+
+    def __repr__(self):
+        return f"<FakeBlob gs://{self.store.bucket_name}/{self.key}>"
@@ -1,11 +1,12 @@
 """ObjectStore that uses local FS and Path"""
 
+import hashlib
 from typing import IO, Iterator
 from datetime import datetime, timezone
 from pathlib import Path
 
 
-from .object_store import ObjectStore, FileObj, FileDoesNotExist
+from .object_store import ObjectStore, FileObj, FileDoesNotExist, read_range
 
 class LocalObjectStore(ObjectStore):
     """ObjectStore that uses local FS and Path"""
@@ -23,7 +24,7 @@ class LocalObjectStore(ObjectStore):
         if not item or not item.exists():
             return FileDoesNotExist(self.prefix + key)
         else:
-            return LocalFileObj(Path(item))
+            return LocalFileObj(Path(item), key)
 
 
     def list(self, key: str) -> Iterator[FileObj]:
@@ -36,7 +37,9 @@ class LocalObjectStore(ObjectStore):
         'ftp/cs/papers/0012/0012007'.
         """
         parent, file = Path(self.prefix+key).parent, Path(self.prefix+key).name
-        return (LocalFileObj(item) for item in Path(parent).glob(f"{file}*"))
+        root = Path(self.prefix)
+        return (LocalFileObj(item, item.relative_to(root).as_posix())
+                for item in Path(parent).glob(f"{file}*"))
 
     def status(self):
         if Path(self.prefix).exists():
@@ -55,14 +58,17 @@ class LocalFileObj(FileObj):
     """File object backed by local files.
 
     The goal here is to have LocalFileObj mimic `Blob` in the
-    methods and properties that are used.
+    methods and properties that are used. Like a `Blob` the `name` is
+    the key relative to the store's prefix and the etag changes when
+    the file is changed.
     """
-    def __init__(self, item: Path):
+    def __init__(self, item: Path, key: str = ''):
         self.item = item
+        self.key = key or item.name
 
     @property
     def name(self) -> str:
-        return self.item.name
+        return self.key
 
     def exists(self) -> bool:
         return self.item.exists()
@@ -70,9 +76,14 @@ class LocalFileObj(FileObj):
     def open(self, *args, **kwargs) -> IO:
         return self.item.open(*args, **kwargs)
 
+    def download_as_bytes(self, client=None, start=None, end=None) -> bytes:
+        with self.item.open('rb') as fh:
+            return read_range(fh, start, end)
+
     @property
     def etag(self) -> str:
-        return "FAKE_ETAG"
+        stat = self.item.stat()
+        return hashlib.md5(f"{self.key}{stat.st_mtime_ns}{stat.st_size}".encode()).hexdigest()
 
     @property
     def size(self) -> int:
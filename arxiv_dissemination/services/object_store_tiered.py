@@ -0,0 +1,232 @@
+"""ObjectStores that layer a local mirror or a disk cache in front of GS.
+
+`TieredObjectStore` tries a list of stores in order, for example a
+`LocalObjectStore` of the NFS mirror and then a `GsObjectStore`.
+
+`DiskCacheObjectStore` is a read-through cache of the bytes of another
+store on local disk. The object metadata still comes from the wrapped
+store so the cache is keyed on key and etag and is never stale.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import IO, Iterator, List, Optional, Set
+
+from .object_store import ObjectStore, FileObj, FileDoesNotExist, read_range
+
+logger = logging.getLogger(__file__)
+
+
+class TieredObjectStore(ObjectStore):
+    """Gets objects from the first of `stores` that has them."""
+
+    def __init__(self, stores: List[ObjectStore]):
+        if not stores:
+            raise ValueError("Must have at least one store")
+        self.stores = stores
+
+    def to_obj(self, key: str) -> FileObj:
+        """Gets the obj from the first store that has it.
+
+        Returns the `FileDoesNotExist` of the last store if none have it."""
+        for store in self.stores:
+            obj = store.to_obj(key)
+            if not isinstance(obj, FileDoesNotExist):
+                return obj
+        return obj
+
+    def list(self, prefix: str) -> Iterator[FileObj]:
+        """Gets the listing from the first store that has any objects with `prefix`."""
+        for store in self.stores:
+            items = list(store.list(prefix))
+            if items:
+                return iter(items)
+        return iter([])
+
+    def status(self):
+        stats = [store.status() for store in self.stores]
+        if all(stat == 'GOOD' for stat, _ in stats):
+            return ('GOOD', '')
+        return ('BAD', ' and '.join(msg for stat, msg in stats if stat != 'GOOD'))
+
+    def __str__(self):
+        return f"<TieredObjectStore {' '.join(map(str, self.stores))}>"
+
+
+class DiskCacheObjectStore(ObjectStore):
+    """Read-through cache on local disk of the bytes of `store`.
+
+    A cache miss copies the obj from `store` to disk in the background,
+    or before returning if `populate_async` is False. The returned
+    `CachedFileObj` reads from disk once the copy is done, so an obj
+    kept by a caller, such as in a `ResolutionCache`, starts using the
+    disk when it can.
+    The least recently used files are removed to keep the cache under
+    `max_bytes`. Objects bigger than `max_object_bytes` are not cached.
+
+    Safe to use from multiple threads. Files are written to a temp
+    file and renamed so a partial file is never served. Multiple
+    processes may share `cache_dir` but each keeps its own size
+    accounting."""
+
+    def __init__(self, store: ObjectStore, cache_dir: str, max_bytes: int,
+                 max_object_bytes: Optional[int] = None,
+                 populate_async: bool = True, populate_threads: int = 2):
+        self.store = store
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_object_bytes = max_object_bytes or max_bytes // 8
+        self.populate_async = populate_async
+        self._executor = ThreadPoolExecutor(max_workers=populate_threads,
+                                            thread_name_prefix='disk-cache')
+        self._lock = Lock()
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._size = 0
+        self._in_flight: Set[str] = set()
+        self._load_index()
+
+    def _load_index(self):
+        """Indexes the files already in `cache_dir`, oldest access first."""
+        files = [(entry.stat().st_atime, entry.name, entry.stat().st_size)
+                 for entry in os.scandir(self.cache_dir)
+                 if entry.is_file() and not entry.name.startswith('.')]
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._size += size
+        self._evict()
+
+    @staticmethod
+    def _cache_name(key: str, etag: str) -> str:
+        return hashlib.sha256(f"{key}\0{etag}".encode('utf-8')).hexdigest()
+
+    def to_obj(self, key: str) -> FileObj:
+        obj = self.store.to_obj(key)
+        if isinstance(obj, FileDoesNotExist) or obj.size > self.max_object_bytes:
+            return obj
+
+        name = self._cache_name(key, obj.etag)
+        with self._lock:
+            populate = name not in self._entries and name not in self._in_flight
+            if populate:
+                self._in_flight.add(name)
+
+        if populate and self.populate_async:
+            self._executor.submit(self._populate, obj, name)
+        elif populate:
+            self._populate(obj, name)
+        return CachedFileObj(obj, self, name)
+
+    def _touch(self, name: str):
+        """Marks the file `name` as recently used."""
+        with self._lock:
+            if name in self._entries:
+                self._entries.move_to_end(name)
+
+    def _populate(self, obj: FileObj, name: str) -> bool:
+        """Copies `obj` to the cache, returns True if it was cached."""
+        tmp = None
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, prefix='.')
+            with os.fdopen(fd, 'wb') as out, obj.open('rb') as fh:
+                while True:
+                    chunk = fh.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+            size = os.path.getsize(tmp)
+            os.replace(tmp, self.cache_dir / name)
+            tmp = None
+            with self._lock:
+                self._entries[name] = size
+                self._size += size
+                self._evict()
+            return True
+        except Exception as ex:
+            logger.warning("Could not cache %s: %s", obj.name, ex)
+            return False
+        finally:
+            if tmp:
+                Path(tmp).unlink(missing_ok=True)
+            with self._lock:
+                self._in_flight.discard(name)
+
+    def _evict(self):
+        """Removes least recently used files, must hold `_lock`."""
+        while self._size > self.max_bytes and self._entries:
+            name, size = self._entries.popitem(last=False)
+            self._size -= size
+            try:
+                (self.cache_dir / name).unlink()
+            except FileNotFoundError:
+                pass
+
+    def list(self, prefix: str) -> Iterator[FileObj]:
+        return self.store.list(prefix)
+
+    def status(self):
+        if not self.cache_dir.exists():
+            return ('BAD', "Disk cache directory doesn't exist")
+        return self.store.status()
+
+    def __str__(self):
+        return f"<DiskCacheObjectStore {self.cache_dir} {self._size}/{self.max_bytes} bytes {self.store}>"
+
+
+class CachedFileObj(FileObj):
+    """An obj from another store whose bytes are read from the disk
+    cache if they are there and from the original obj if not.
+
+    Metadata such as etag and size come from the original obj."""
+
+    def __init__(self, obj: FileObj, cache: DiskCacheObjectStore, cache_name: str):
+        self.obj = obj
+        self.cache = cache
+        self.cache_name = cache_name
+        self.path = cache.cache_dir / cache_name
+
+    @property
+    def name(self) -> str:
+        return self.obj.name
+
+    def exists(self) -> bool:
+        return True
+
+    def open(self, mode='rb', *args, **kwargs) -> IO:
+        try:
+            fh = self.path.open(mode, *args, **kwargs)
+            self.cache._touch(self.cache_name)
+            return fh
+        except FileNotFoundError:
+            # not copied yet or evicted
+            return self.obj.open(mode, *args, **kwargs)
+
+    def download_as_bytes(self, client=None, start=None, end=None) -> bytes:
+        try:
+            with self.path.open('rb') as fh:
+                self.cache._touch(self.cache_name)
+                return read_range(fh, start, end)
+        except FileNotFoundError:
+            return self.obj.download_as_bytes(start=start, end=end)
+
+    @property
+    def etag(self) -> str:
+        return self.obj.etag
+
+    @property
+    def size(self) -> int:
+        return self.obj.size
+
+    @property
+    def updated(self) -> datetime:
+        return self.obj.updated
+
+    def __repr__(self):
+        return f"<CachedFileObj {self.path} of {self.obj!r}>"
@@ -0,0 +1,59 @@
+"""In-process cache of the results of `ArticleStore.dissemination_for_id`.
+
+Entries expire at the next announcement since that is when files in
+the bucket change. Any change outside of an announcement, such as a
+PDF rebuild, is only seen once its entry expires, so results that
+such a change would alter are saved with a short `ttl`.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from time import time
+from typing import Any, Hashable, Optional, Tuple
+
+from .next_published import next_publish
+
+
+class ResolutionCache():
+    """LRU cache of up to `max_size` resolutions, safe to use from multiple threads."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._lock = Lock()
+        self._entries: OrderedDict[Hashable, Tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Gets the value for `key` or None if missing or expired."""
+        now = time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Saves `value` for `key` until the next announcement.
+
+        With a `ttl` in seconds it expires then if that is sooner."""
+        expires = next_publish().timestamp()
+        if ttl is not None:
+            expires = min(expires, time() + ttl)
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,59 @@
+"""Resolves ids in the background so the caches are warm before they are requested.
+
+Used at announcement time with the ids that were just published. The
+ids are resolved with `ArticleStore.dissemination_for_id` from storage,
+not the `ResolutionCache`, which replaces any stale entries in it and,
+if there is a `DiskCacheObjectStore`, copies the PDFs to the disk cache.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import List
+
+from arxiv.identifier import Identifier
+
+from .article_store import ArticleStore
+
+logger = logging.getLogger(__file__)
+
+
+class Warmer():
+    """Pool of `threads` that resolve ids with `article_store`.
+
+    At most `max_pending` ids are queued, more are not accepted."""
+
+    def __init__(self, article_store: ArticleStore, threads: int = 4, max_pending: int = 20000):
+        self.article_store = article_store
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='warm')
+        self._lock = Lock()
+        self.pending = 0
+        self.warmed = 0
+        self.failed = 0
+
+    def warm(self, ids: List[Identifier]) -> int:
+        """Queues `ids` to be resolved, returns how many were accepted."""
+        with self._lock:
+            accepted = ids[:max(0, self.max_pending - self.pending)]
+            self.pending += len(accepted)
+        for arxiv_id in accepted:
+            self._executor.submit(self._warm_one, arxiv_id)
+        if len(accepted) < len(ids):
+            logger.warning("Warm queue full, dropped %d ids", len(ids) - len(accepted))
+        return len(accepted)
+
+    def _warm_one(self, arxiv_id: Identifier):
+        ok = False
+        try:
+            self.article_store.dissemination_for_id('pdf', arxiv_id, refresh=True)
+            ok = True
+        except Exception:
+            logger.exception("Could not warm %s", arxiv_id.idv)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                if ok:
+                    self.warmed += 1
+                else:
+                    self.failed += 1
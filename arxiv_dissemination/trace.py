@@ -22,4 +22,24 @@ def setup_trace(name, app):
     trace.set_tracer_provider(tracer_provider)
     tracer = trace.get_tracer(name)
     FlaskInstrumentor().instrument_app(app)
+    setup_metrics(app)
     return tracer
+
+
+def setup_metrics(app):
+    """Setup export of the histograms in `arxiv_dissemination.metrics` to GCP.
+
+    This needs opentelemetry-exporter-gcp-monitoring, a dependency, if
+    that is not importable the histograms stay no-ops."""
+    from opentelemetry import metrics
+    from opentelemetry.sdk.metrics import MeterProvider
+    from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+    try:
+        from opentelemetry.exporter.cloud_monitoring import CloudMonitoringMetricsExporter
+    except ImportError:
+        app.logger.info("opentelemetry-exporter-gcp-monitoring not installed, no metrics")
+        return
+
+    reader = PeriodicExportingMetricReader(CloudMonitoringMetricsExporter(),
+                                           export_interval_millis=60000)
+    metrics.set_meter_provider(MeterProvider(metric_readers=[reader]))
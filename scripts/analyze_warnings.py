@@ -3,7 +3,7 @@ GCP log explorer.
 
 Run as
 
-   python scripts/analyze_warnings.py 404_log_export_from_GCP.json
+   python scripts/analyze_warnings.py 404_log_export_from_GCP.json --workers 8 --rate 4
 
 If you take the GCP log explorer and get all the WARNING log lines from the
 cloud run service, you can run them though this script.
@@ -15,17 +15,38 @@ export.arxiv.org. The response from GCP will be compared with the ones
 from export to let you know if they are real 404s, missing from the
 sync, withdrawn (aka no_author_source) or unavailable.
 
+The checks against export run on a pool of `--workers` threads limited
+to `--rate` requests/sec. They use a HEAD and only read the first part
+of the body if the response is not a PDF. Each result is appended to
+`--results` (default 404_analysis.jsonl) as soon as it is done. URLs
+already in that file are not checked again, so rerunning on a bigger
+export only checks the new URLs.
 """
 
-import sys
-import re
+import argparse
 import json
+import threading
+import time
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
 
-print(f"* Analysis of {sys.argv[1]}")
-with open(sys.argv[1]) as fh:
+ENSURE_UA = 'periodic-rebuild'
+
+SNIFF_BYTES = 16 * 1024
+"""Bytes of a non-PDF response to read to look for the unavailable and no source messages."""
+
+ap = argparse.ArgumentParser(description="Compare the warnings in a GCP log export to legacy")
+ap.add_argument('log_export', help="JSON file downloaded from GCP log explorer")
+ap.add_argument('--workers', type=int, default=8, help="Concurrent requests to export")
+ap.add_argument('--rate', type=float, default=4.0, help="Max requests/sec to export")
+ap.add_argument('--results', default='404_analysis.jsonl',
+                help="JSONL file of the results, also used as a cache of URLs already checked")
+args = ap.parse_args()
+
+print(f"* Analysis of {args.log_export}")
+with open(args.log_export) as fh:
     data = json.load(fh)
 
 print(f"Number of rows: {len(data)}")
@@ -42,41 +63,100 @@ for key in bystatus:
     for row in bystatus[key][0:3]:
         print(" - "+ row['httpRequest']['requestUrl'])
 
-ENSURE_UA = 'periodic-rebuild'
-
-print("Checking if 404s exist on legacy")
-session = requests.Session()
-session.headers = headers = {
-    'User-Agent': ENSURE_UA,
-    'Accept': '*/*'
-}
 
+class RateLimit():
+    """Spaces out calls to `wait()` across threads to at most `rate` per second."""
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate else 0
+        self.next = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            at = max(now, self.next)
+            self.next = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+
+thread_local = threading.local()
+
+def get_session() -> requests.Session:
+    """A pooled `Session` per thread since they are not thread safe."""
+    if not hasattr(thread_local, 'session'):
+        thread_local.session = requests.Session()
+        thread_local.session.headers.update({'User-Agent': ENSURE_UA, 'Accept': '*/*'})
+    return thread_local.session
+
+
+def check(url: str, limit: RateLimit) -> dict:
+    """Checks `url` on legacy with a HEAD and, if not a PDF, a partial GET."""
+    session = get_session()
+    limit.wait()
+    resp = session.head(url, allow_redirects=True, timeout=60)
+    content_type = resp.headers.get('content-type', '')
+    is_pdf = bool('pdf' in content_type)
+    text = ''
+    if not is_pdf and resp.status_code != 404:
+        limit.wait()
+        with session.get(url, allow_redirects=True, stream=True, timeout=60,
+                         headers={'Range': f"bytes=0-{SNIFF_BYTES - 1}"}) as get:
+            resp = get
+            content_type = get.headers.get('content-type', '')
+            is_pdf = bool('pdf' in content_type)
+            if not is_pdf:
+                chunk = next(get.iter_content(chunk_size=SNIFF_BYTES), b'')
+                text = chunk.decode(get.encoding or 'utf-8', errors='replace')
+    status_code = int(resp.status_code)
+    if status_code == 206:
+        status_code = 200
+    return dict(url=url,
+                status_code=status_code,
+                content_type=content_type,
+                is_pdf=is_pdf,
+                unavailable=bool('PDF unavailable for' in text),
+                no_author_source=bool('The author has provided no source' in text),
+                )
+
+
+results_file = Path(args.results)
 responses = {}
-for row in bystatus[404]:
-    url = row['httpRequest']['requestUrl'].replace('download.', 'export.')
-    resp = session.get(url, allow_redirects=True)
-    is_pdf = bool('pdf' in resp.headers['content-type'])
-    unavailable = bool('PDF unavailable for' in resp.text)
-    no_author_source = bool('The author has provided no source' in resp.text)
-    print(f"{url}: {resp.status_code} is_pdf: {is_pdf} content-type: {resp.headers['content-type']} unavailable: {unavailable}")
-
-    responses[url] = dict(status_code = int(resp.status_code),
-                          is_pdf = is_pdf,
-                          unavailable = unavailable,
-                          no_author_source= no_author_source,
-                          )
-
-
-
-with open(Path('404_analysis.json'),'w') as fh:
-    json.dump(responses, fh, indent=2)
-
-
-non200 = [item for item in responses.values() if item['status_code'] != 200]
-unavailable = [item for item in responses.values() if item['status_code'] == 200 and item['unavailable']]
+if results_file.exists():
+    with open(results_file) as fh:
+        for line in fh:
+            if line.strip():
+                row = json.loads(line)
+                responses[row['url']] = row
+
+urls = list(dict.fromkeys(row['httpRequest']['requestUrl'].replace('download.', 'export.')
+                          for row in bystatus[404]))
+todo = [url for url in urls if url not in responses]
+print(f"Checking if 404s exist on legacy: {len(urls)} urls, {len(urls) - len(todo)} already in {results_file}")
+
+limit = RateLimit(args.rate)
+with open(results_file, 'a') as out, ThreadPoolExecutor(max_workers=args.workers) as pool:
+    futures = {pool.submit(check, url, limit): url for url in todo}
+    for future in as_completed(futures):
+        url = futures[future]
+        try:
+            row = future.result()
+        except requests.RequestException as ex:
+            print(f"{url}: failed due to {ex}, will retry on next run")
+            continue
+        print(f"{url}: {row['status_code']} is_pdf: {row['is_pdf']} content-type: {row['content_type']} unavailable: {row['unavailable']}")
+        responses[url] = row
+        out.write(json.dumps(row) + '\n')
+        out.flush()
+
+checked = [responses[url] for url in urls if url in responses]
+non200 = [item for item in checked if item['status_code'] != 200]
+unavailable = [item for item in checked if item['status_code'] == 200 and item['unavailable']]
+no_source = [item for item in checked if item['status_code'] == 200 and item['no_author_source']]
 
 print(f"resonse from legacy was non-200: {len(non200)}")
 print(f"resonse from legacy was 200 but pdf was unavailable: {len(unavailable)}")
+print(f"resonse from legacy was 200 but there was no author source: {len(no_source)}")
 
 
 print("DONE\n")
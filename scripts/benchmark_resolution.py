@@ -0,0 +1,265 @@
+"""Benchmark of `ArticleStore.dissemination_for_id` against a synthetic archive.
+
+Make a synthetic archive of ftp/, orig/ and ps_cache/ with papers of
+realistic shapes: multi-version TeX, PDF only, withdrawn, TeX without
+a built PDF, HTML and old style ids:
+
+    python scripts/benchmark_resolution.py generate /tmp/synth --papers 200000
+
+Then resolve a random mix of versioned, unversioned and missing ids
+against it, either directly on the local files or through
+`FakeGsObjectStore` with latency, throttling and errors like GCS:
+
+    python scripts/benchmark_resolution.py run /tmp/synth --requests 20000
+    python scripts/benchmark_resolution.py run /tmp/synth --fake-gs --get-latency lognormal:20:0.6 --threads 8
+
+The report has, for each branch the resolver ended in, the number of
+requests, the storage calls per request and the p50/p99 latency. Use
+`--json` to save the results to compare before and after a change.
+"""
+
+import argparse
+import json
+import logging
+import random
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from statistics import mean, quantiles
+from typing import List, Tuple
+
+from arxiv.identifier import Identifier
+
+from arxiv_dissemination.services.article_store import ArticleStore, Deleted, CannotBuildPdf
+from arxiv_dissemination.services.key_patterns import paper_keys
+from arxiv_dissemination.services.object_store import ObjectStore
+from arxiv_dissemination.services.object_store_local import LocalObjectStore
+from arxiv_dissemination.services.object_store_fake_gs import FakeGsObjectStore, Latency
+from arxiv_dissemination.services.object_store_accounting import AccountingObjectStore, AccountingFileObj, start_request
+
+OLD_ARCHIVES = ['hep-th', 'hep-ph', 'astro-ph', 'cond-mat', 'math', 'cs', 'quant-ph', 'gr-qc']
+
+KINDS = [  # kind, weight
+    ('tex', 0.60),
+    ('pdf_only', 0.20),
+    ('tex_unbuilt', 0.06),
+    ('withdrawn', 0.08),
+    ('html', 0.06),
+]
+
+SOURCE_TYPE = {'tex': '', 'pdf_only': 'D', 'tex_unbuilt': '', 'withdrawn': '', 'html': 'H'}
+
+ABS = """------------------------------------------------------------------------------
+\\\\
+arXiv:{id}
+From: Synthetic Author <example@example.com>
+{dates}
+
+Title: A synthetic paper of kind {kind}
+Authors: Synthetic Author
+Categories: {category}
+\\\\
+  This is a synthetic abstract.
+\\\\
+"""
+
+
+def random_id(rnd: random.Random, old_style: bool) -> str:
+    if old_style:
+        year = rnd.randint(1992, 2006)
+        month = rnd.randint(1, 12)
+        return f"{rnd.choice(OLD_ARCHIVES)}/{year % 100:02d}{month:02d}{rnd.randint(1, 999):03d}"
+    year = rnd.randint(2008, 2023)
+    month = rnd.randint(1, 12)
+    if year < 2015:
+        return f"{year % 100:02d}{month:02d}.{rnd.randint(1, 9999):04d}"
+    return f"{year % 100:02d}{month:02d}.{rnd.randint(1, 29999):05d}"
+
+
+def write(root: Path, key: str, content: str = ''):
+    path = root / key
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+
+def generate_paper(root: Path, arxiv_id: Identifier, kind: str, versions: int):
+    keys = paper_keys(arxiv_id)
+    src_type = SOURCE_TYPE[kind]
+    last_src_type = 'I' if kind == 'withdrawn' else src_type
+    dates = []
+    for version in range(1, versions + 1):
+        stype = last_src_type if version == versions else src_type
+        size = f"({version * 10}kb,{stype})" if stype else f"({version * 10}kb)"
+        if version == 1:
+            dates.append(f"Date: Thu, 30 Aug 2012 23:00:00 GMT   {size}")
+        else:
+            dates.append(f"Date (revised v{version}): Thu, 30 Aug 2012 23:00:00 GMT   {size}")
+    abs = ABS.format(id=arxiv_id.id, dates='\n'.join(dates), kind=kind,
+                     category=arxiv_id.archive if arxiv_id.is_old_id else 'cs.DL')
+    write(root, keys.abs_current, abs)
+
+    ext = {'tex': '.tar.gz', 'tex_unbuilt': '.tar.gz', 'withdrawn': '.tar.gz',
+           'pdf_only': '.pdf', 'html': '.html.gz'}[kind]
+    for version in range(1, versions + 1):
+        current = version == versions
+        if not current:
+            write(root, keys.abs_orig(version), abs)
+        if kind == 'withdrawn' and current:
+            continue
+        if current:
+            write(root, f"{keys.current_listing_prefix}{ext}")
+        else:
+            write(root, f"{keys.orig_listing_prefix}v{version}{ext}")
+        if kind in ('tex', 'withdrawn') or (kind == 'tex_unbuilt' and not current):
+            write(root, keys.ps_cache_pdf('pdf', version))
+
+
+def generate(root: Path, papers: int, seed: int, old_fraction: float):
+    """Writes `papers` synthetic papers to `root` and an index of them."""
+    rnd = random.Random(seed)
+    kinds, weights = zip(*KINDS)
+    index = {}
+    while len(index) < papers:
+        arxiv_id = Identifier(random_id(rnd, rnd.random() < old_fraction))
+        if arxiv_id.id in index:
+            continue
+        kind = rnd.choices(kinds, weights)[0]
+        versions = min(1 + int(rnd.expovariate(1.2)), 12)
+        generate_paper(root, arxiv_id, kind, versions)
+        index[arxiv_id.id] = [kind, versions]
+        if len(index) % 10000 == 0:
+            print(f"{len(index)} papers", file=sys.stderr)
+    (root / 'index.json').write_text(json.dumps(index))
+    print(f"Wrote {papers} papers to {root}")
+
+
+def request_mix(index: dict, count: int, rnd: random.Random) -> List[str]:
+    """Mostly versioned ids with some current, bad versions and missing papers."""
+    ids = list(index)
+    requests = []
+    for _ in range(count):
+        id = rnd.choice(ids)
+        versions = index[id][1]
+        pick = rnd.random()
+        if pick < 0.80:
+            requests.append(f"{id}v{rnd.randint(1, versions)}")
+        elif pick < 0.95:
+            requests.append(id)
+        elif pick < 0.97:
+            requests.append(f"{id}v{versions + 1}")
+        else:
+            requests.append(random_id(rnd, '/' in id) + 'v1')
+    return requests
+
+
+def branch_of(item, arxiv_id: Identifier) -> str:
+    """Names the branch `dissemination_for_id` ended in from its result."""
+    if isinstance(item, str):
+        return item
+    if isinstance(item, Deleted):
+        return 'DELETED'
+    if isinstance(item, CannotBuildPdf):
+        return 'CANNOT_BUILD_PDF'
+    if isinstance(item, AccountingFileObj):
+        item = item.obj
+    key = item.name
+    if key.startswith('ps_cache/'):
+        return 'ps_cache'
+    if key == paper_keys(arxiv_id).current_pdf:
+        return 'ftp_pdf'
+    return 'orig_pdf'
+
+
+def resolve(store: ArticleStore, id: str) -> Tuple[str, int, float]:
+    arxiv_id = Identifier(id)
+    stats = start_request()
+    start = time.perf_counter()
+    try:
+        branch = branch_of(store.dissemination_for_id('pdf', arxiv_id), arxiv_id)
+    except Exception as ex:
+        branch = f"ERROR {type(ex).__name__}"
+    ms = (time.perf_counter() - start) * 1000
+    return branch, stats.total_calls, ms
+
+
+def report(results: List[Tuple[str, int, float]], elapsed: float) -> dict:
+    by_branch = defaultdict(list)
+    for branch, calls, ms in results:
+        by_branch[branch].append((calls, ms))
+        by_branch['ALL'].append((calls, ms))
+
+    summary = {}
+    for branch, rows in sorted(by_branch.items(), key=lambda kv: -len(kv[1])):
+        times = [ms for _, ms in rows]
+        cuts = quantiles(times, n=100) if len(times) > 1 else times * 99
+        summary[branch] = dict(requests=len(rows),
+                               calls_mean=mean(calls for calls, _ in rows),
+                               calls_max=max(calls for calls, _ in rows),
+                               p50_ms=cuts[49], p99_ms=cuts[98])
+    summary['ALL']['per_sec'] = len(results) / elapsed
+
+    print(f"{'branch':<24} {'requests':>9} {'calls':>6} {'max':>4} {'p50 ms':>9} {'p99 ms':>9}")
+    for branch, row in summary.items():
+        print(f"{branch:<24} {row['requests']:>9} {row['calls_mean']:>6.2f} {row['calls_max']:>4}"
+              f" {row['p50_ms']:>9.3f} {row['p99_ms']:>9.3f}")
+    print(f"{len(results)} requests in {elapsed:.1f}s, {summary['ALL']['per_sec']:.0f}/s")
+    return summary
+
+
+def run(root: Path, requests: int, seed: int, objstore: ObjectStore, threads: int, json_out: str):
+    index = json.loads((root / 'index.json').read_text())
+    rnd = random.Random(seed)
+    store = ArticleStore(AccountingObjectStore(objstore), lambda id, format: None, lambda id: None)
+    ids = request_mix(index, requests, rnd)
+
+    start = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(lambda id: resolve(store, id), ids))
+    else:
+        results = [resolve(store, id) for id in ids]
+    summary = report(results, time.perf_counter() - start)
+
+    if json_out:
+        Path(json_out).write_text(json.dumps(dict(root=str(root), requests=requests, seed=seed,
+                                                  store=str(objstore), threads=threads,
+                                                  branches=summary), indent=2))
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    gen = sub.add_parser('generate', help="Make a synthetic archive")
+    gen.add_argument('root', help="Directory to write the archive to")
+    gen.add_argument('--papers', type=int, default=100000)
+    gen.add_argument('--old-fraction', type=float, default=0.2, help="Fraction of old style ids")
+    gen.add_argument('--seed', type=int, default=1)
+    bench = sub.add_parser('run', help="Resolve ids against a synthetic archive")
+    bench.add_argument('root', help="Directory made by generate")
+    bench.add_argument('--requests', type=int, default=10000)
+    bench.add_argument('--fake-gs', action='store_true',
+                       help="Use FakeGsObjectStore instead of LocalObjectStore")
+    bench.add_argument('--get-latency', default='0', help="Latency spec of metadata gets, ex lognormal:20:0.6")
+    bench.add_argument('--list-latency', default='0', help="Latency spec of lists")
+    bench.add_argument('--download-latency', default='0', help="Latency spec of starting a download")
+    bench.add_argument('--max-qps', type=float, default=0, help="Calls/sec before 429s, 0 for no limit")
+    bench.add_argument('--error-rate', type=float, default=0, help="Fraction of calls that get a 503")
+    bench.add_argument('--threads', type=int, default=1)
+    bench.add_argument('--seed', type=int, default=1)
+    bench.add_argument('--json', help="Write the results as JSON to this file")
+    args = ap.parse_args()
+    logging.disable(logging.INFO)  # ArticleStore logs each miss at DEBUG
+
+    if args.cmd == 'generate':
+        generate(Path(args.root), args.papers, args.seed, args.old_fraction)
+    else:
+        if args.fake_gs:
+            latency = {'get': Latency(args.get_latency), 'list': Latency(args.list_latency),
+                       'download': Latency(args.download_latency)}
+            objstore = FakeGsObjectStore(args.root, latency, max_qps=args.max_qps,
+                                         error_rate=args.error_rate, seed=args.seed)
+        else:
+            objstore = LocalObjectStore(f"{args.root}/")
+        run(Path(args.root), args.requests, args.seed, objstore, args.threads, args.json)
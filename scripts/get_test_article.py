@@ -20,16 +20,17 @@ from arxiv_dissemination.services import key_patterns
 def get_article_for_test(bucket, save_base_dir: str, arxiv_id: Identifier):
     """Gets from the production bucket all the files related to an arxiv_id,
     sanitizes them of email addresses, saves them in the test directoires"""
-    abs_current = key_patterns.abs_path_current(arxiv_id)
+    keys = key_patterns.paper_keys(arxiv_id)
+    abs_current = keys.abs_current
     get_object_for_test(bucket, save_base_dir, abs_current)
 
-    other_current = f"{key_patterns.abs_path_current_parent(arxiv_id)}/{arxiv_id.filename}"
+    other_current = keys.current_listing_prefix
     get_objs_matching_keyprefix(bucket, save_base_dir,other_current)
 
-    abs_orig = f"{key_patterns.abs_path_orig_parent(arxiv_id)}/{arxiv_id.filename}"
+    abs_orig = keys.orig_listing_prefix
     get_objs_matching_keyprefix(bucket, save_base_dir, abs_orig)
 
-    ps_cache = f"{key_patterns._ps_cache_part('pdf',arxiv_id)}/{arxiv_id.filename}"
+    ps_cache = keys.ps_cache_listing_prefix("pdf")
     get_objs_matching_keyprefix(bucket, save_base_dir, ps_cache)
 
 
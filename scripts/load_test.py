@@ -0,0 +1,257 @@
+"""Load test a running dissemination service by replaying requests.
+
+The requests come from a GCP log explorer JSON export, the same format
+`analyze_warnings.py` reads, or from a Zipf distributed mix of ids so
+a few papers are very popular like in production:
+
+    python scripts/load_test.py run --log log_export_from_GCP.json --host http://localhost:8080 \\
+        --rate 50 --concurrency 16 --out before.json
+
+    python scripts/load_test.py run --zipf ids.txt --count 5000 --concurrency 32 --out after.json
+
+`ids.txt` has one id per line, or use the `index.json` of an archive
+from `benchmark_resolution.py generate`.
+
+With `--rate` the requests are sent on a fixed schedule, open loop, so
+a slow service builds up a backlog like it would in production. The
+latency is then measured from when each request was scheduled to be
+sent, so time spent waiting for one of the `--concurrency` workers is
+included, and that wait is also reported on its own as the queue time.
+Without it each of the workers sends its next request as soon as its
+last one is done.
+
+The report has the throughput, bytes/sec and the latency, time to
+first byte and queue time percentiles by status and by kind of id. Compare two runs,
+exiting with 1 if the p99 got worse by more than 10%:
+
+    python scripts/load_test.py compare before.json after.json --max-regression 0.10
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
+from pathlib import Path
+from statistics import quantiles
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+
+LOAD_TEST_UA = 'dissemination-load-test'
+
+thread_local = threading.local()
+
+
+def session() -> requests.Session:
+    """A `Session` per thread since they are not thread safe."""
+    if not hasattr(thread_local, 'session'):
+        thread_local.session = requests.Session()
+        thread_local.session.headers.update({'User-Agent': LOAD_TEST_UA})
+    return thread_local.session
+
+
+def paths_from_log(log_file: str) -> List[str]:
+    """Paths of the requests in a GCP log explorer JSON export."""
+    with open(log_file) as fh:
+        rows = json.load(fh)
+    paths = []
+    for row in rows:
+        url = row.get('httpRequest', {}).get('requestUrl')
+        if url:
+            parsed = urlparse(url)
+            paths.append(parsed.path + (f"?{parsed.query}" if parsed.query else ''))
+    return paths
+
+
+def load_ids(ids_file: str) -> List[str]:
+    """Ids from a file with one per line or an `index.json` from `benchmark_resolution.py`."""
+    if ids_file.endswith('.json'):
+        index = json.loads(Path(ids_file).read_text())
+        return [f"{id}v{versions}" for id, (_, versions) in index.items()]
+    return [line.strip() for line in Path(ids_file).read_text().splitlines()
+            if line.strip() and not line.startswith('#')]
+
+
+def zipf_paths(ids: List[str], count: int, s: float, rnd: random.Random) -> List[str]:
+    """`count` PDF paths with ids picked with Zipf exponent `s`."""
+    ids = list(ids)
+    rnd.shuffle(ids)  # so popularity is not by order in the file
+    cum_weights = list(accumulate(1 / rank ** s for rank in range(1, len(ids) + 1)))
+    return [f"/pdf/{id}.pdf" for id in rnd.choices(ids, cum_weights=cum_weights, k=count)]
+
+
+def id_kind(path: str) -> str:
+    """Kind of id in a path, ex new_versioned or old_current."""
+    parts = path.split('?')[0].split('/')
+    if len(parts) < 3 or parts[1] != 'pdf':
+        return 'other'
+    id = '/'.join(parts[2:]).removesuffix('.pdf')
+    style = 'old' if '/' in id else 'new'
+    versioned = 'versioned' if 'v' in id.split('/')[-1] else 'current'
+    return f"{style}_{versioned}"
+
+
+def fetch(host: str, path: str, scheduled: Optional[float] = None) -> dict:
+    """Gets `path`, timed from `scheduled`, a `perf_counter()` time, if it is set."""
+    sent = time.perf_counter()
+    start = scheduled if scheduled is not None else sent
+    ttfb, size, status, calls = None, 0, 0, None
+    try:
+        with session().get(host + path, stream=True, allow_redirects=False, timeout=60) as resp:
+            status = resp.status_code
+            calls = resp.headers.get('X-Storage-Calls')
+            for chunk in resp.iter_content(chunk_size=64 * 1024):
+                if ttfb is None:
+                    ttfb = time.perf_counter() - start
+                size += len(chunk)
+    except requests.RequestException as ex:
+        status = type(ex).__name__
+    ms = (time.perf_counter() - start) * 1000
+    return dict(path=path, status=str(status), kind=id_kind(path), ms=ms,
+                ttfb_ms=(ttfb * 1000 if ttfb is not None else ms),
+                queue_ms=max(0.0, sent - start) * 1000, bytes=size,
+                storage_calls=int(calls) if calls else None)
+
+
+def run(host: str, paths: List[str], rate: float, concurrency: int) -> List[dict]:
+    results = []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        if rate:
+            futures = []
+            start = time.perf_counter()
+            for n, path in enumerate(paths):
+                scheduled = start + n / rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(pool.submit(fetch, host, path, scheduled))
+            results = [future.result() for future in futures]
+        else:
+            results = list(pool.map(lambda path: fetch(host, path), paths))
+    return results
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if len(values) > 1:
+        cuts = quantiles(values, n=100)
+    else:
+        cuts = values * 99
+    return dict(p50=cuts[49], p90=cuts[89], p99=cuts[98])
+
+
+def summarize(results: List[dict], elapsed: float) -> dict:
+    summary = dict(requests=len(results), elapsed_s=elapsed,
+                   per_sec=len(results) / elapsed,
+                   bytes_per_sec=sum(row['bytes'] for row in results) / elapsed,
+                   all=dict(count=len(results), ms=percentiles([row['ms'] for row in results]),
+                            ttfb_ms=percentiles([row['ttfb_ms'] for row in results]),
+                            queue_ms=percentiles([row['queue_ms'] for row in results])))
+    for group in ['status', 'kind']:
+        rows_by = defaultdict(list)
+        for row in results:
+            rows_by[row[group]].append(row)
+        summary[f"by_{group}"] = {
+            key: dict(count=len(rows),
+                      ms=percentiles([row['ms'] for row in rows]),
+                      ttfb_ms=percentiles([row['ttfb_ms'] for row in rows]),
+                      queue_ms=percentiles([row['queue_ms'] for row in rows]),
+                      storage_calls=_mean([row['storage_calls'] for row in rows
+                                           if row['storage_calls'] is not None]))
+            for key, rows in sorted(rows_by.items())}
+    return summary
+
+
+def _mean(values: List[int]):
+    return sum(values) / len(values) if values else None
+
+
+def print_summary(summary: dict):
+    print(f"{summary['requests']} requests in {summary['elapsed_s']:.1f}s, "
+          f"{summary['per_sec']:.1f}/s, {summary['bytes_per_sec'] / 1e6:.2f} MB/s")
+    print(f"{'':<22} {'count':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'ttfb p50':>9} "
+          f"{'queue p99':>9} {'calls':>6}")
+    rows = [('all', summary['all'])]
+    rows += [(f"status {key}", val) for key, val in summary['by_status'].items()]
+    rows += [(f"kind {key}", val) for key, val in summary['by_kind'].items()]
+    for name, row in rows:
+        calls = row.get('storage_calls')
+        print(f"{name:<22} {row['count']:>7} {row['ms']['p50']:>9.1f} {row['ms']['p90']:>9.1f} "
+              f"{row['ms']['p99']:>9.1f} {row['ttfb_ms']['p50']:>9.1f} {row['queue_ms']['p99']:>9.1f} "
+              f"{calls if calls is None else round(calls, 2)!s:>6}")
+
+
+def compare(before_file: str, after_file: str, max_regression: float) -> int:
+    """Prints the change between two runs, returns 1 if a p99 got worse by more than `max_regression`."""
+    before = json.loads(Path(before_file).read_text())['summary']
+    after = json.loads(Path(after_file).read_text())['summary']
+
+    def change(old, new):
+        return (new - old) / old if old else 0.0
+
+    print(f"throughput {before['per_sec']:.1f}/s -> {after['per_sec']:.1f}/s "
+          f"({change(before['per_sec'], after['per_sec']):+.1%})")
+    rows = [('all', before['all'], after['all'])]
+    for group in ['by_status', 'by_kind']:
+        for key in sorted(set(before[group]) & set(after[group])):
+            rows.append((f"{group[3:]} {key}", before[group][key], after[group][key]))
+
+    failed = False
+    print(f"{'':<22} {'p50 ms':>18} {'p99 ms':>18} {'p99 change':>11}")
+    for name, old, new in rows:
+        p99_change = change(old['ms']['p99'], new['ms']['p99'])
+        flag = ''
+        if p99_change > max_regression:
+            failed, flag = True, ' REGRESSION'
+        print(f"{name:<22} {old['ms']['p50']:>8.1f} -> {new['ms']['p50']:>6.1f} "
+              f"{old['ms']['p99']:>8.1f} -> {new['ms']['p99']:>6.1f} {p99_change:>+10.1%}{flag}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    runp = sub.add_parser('run', help="Send requests to a running service")
+    source = runp.add_mutually_exclusive_group(required=True)
+    source.add_argument('--log', help="GCP log explorer JSON export to replay")
+    source.add_argument('--zipf', help="File of ids, or index.json, for a Zipf mix")
+    runp.add_argument('--host', default='http://localhost:8080')
+    runp.add_argument('--count', type=int, default=0,
+                      help="Number of requests, defaults to all the log or 1000 for --zipf")
+    runp.add_argument('--zipf-s', type=float, default=1.1, help="Zipf exponent")
+    runp.add_argument('--rate', type=float, default=0, help="Requests/sec, 0 for as fast as possible")
+    runp.add_argument('--concurrency', type=int, default=8)
+    runp.add_argument('--seed', type=int, default=1)
+    runp.add_argument('--out', help="Write the results as JSON to this file")
+    cmp = sub.add_parser('compare', help="Compare the JSON results of two runs")
+    cmp.add_argument('before')
+    cmp.add_argument('after')
+    cmp.add_argument('--max-regression', type=float, default=0.10,
+                     help="Fraction a p99 can get worse before exiting with 1")
+    args = ap.parse_args()
+
+    if args.cmd == 'compare':
+        sys.exit(compare(args.before, args.after, args.max_regression))
+
+    rnd = random.Random(args.seed)
+    if args.log:
+        paths = paths_from_log(args.log)
+        if args.count:
+            paths = (paths * (args.count // len(paths) + 1))[:args.count]
+    else:
+        paths = zipf_paths(load_ids(args.zipf), args.count or 1000, args.zipf_s, rnd)
+
+    print(f"Sending {len(paths)} requests to {args.host} with concurrency {args.concurrency}"
+          + (f" at {args.rate}/s" if args.rate else ''), file=sys.stderr)
+    start = time.perf_counter()
+    results = run(args.host, paths, args.rate, args.concurrency)
+    summary = summarize(results, time.perf_counter() - start)
+    print_summary(summary)
+    if args.out:
+        Path(args.out).write_text(json.dumps(dict(host=args.host, args=vars(args),
+                                                  summary=summary, results=results), indent=1))
@@ -3,12 +3,13 @@
 
 import json
 from re import RegexFlag
-from typing import Match, Optional, Union, Tuple, Callable, List
+from functools import lru_cache, total_ordering
+from typing import Match, Optional, Union, Tuple, Callable, List, Dict, Pattern, Iterable
 import re
 
 from arxiv import taxonomy
 
-__all__ = ('parse_arxiv_id', )
+__all__ = ('parse_arxiv_id', 'cached_identifier', 'parse_many')
 
 _archive = '|'.join([re.escape(key) for key in taxonomy.ARCHIVES.keys()])
 """string for use in Regex for all arXiv archives"""
@@ -28,21 +29,41 @@ ARXIV_REGEX = (
     "\\d{4,5}(?:[vV]\\d+)?)))$" % _category
 )
 
-OLD_STYLE_WITH_ARCHIVE = re.compile(
-    r'(?:%s)?(?P<arxiv_id>(%s)\/\d{2}[01]\d{4}(v\d*)?)' % (_prefix, _archive),
-    re.I
-)
-
-OLD_STYLE_WITH_CATEGORY = re.compile(
-    r'(?:%s)?(?P<arxiv_id>(%s)\/\d{2}[01]\d{4}(v\d*)?)' % (_prefix, _category),
-    re.I
-)
+_LAZY_PATTERNS: Dict[str, Callable[[], Pattern[str]]] = {
+    'OLD_STYLE_WITH_ARCHIVE': lambda: re.compile(
+        r'(?:%s)?(?P<arxiv_id>(%s)\/\d{2}[01]\d{4}(v\d*)?)' % (_prefix, _archive),
+        re.I
+    ),
+    'OLD_STYLE_WITH_CATEGORY': lambda: re.compile(
+        r'(?:%s)?(?P<arxiv_id>(%s)\/\d{2}[01]\d{4}(v\d*)?)' % (_prefix, _category),
+        re.I
+    ),
+    'OLD_STYLE': lambda: re.compile(
+        r'(?:%s)?(?P<arxiv_id>(%s)\/\d{2}[01]\d{4}(v\d*)?)'
+        % (_prefix, f'{_archive}|{_category}'),
+        re.I
+    ),
+}
+"""The regexes with alternations of all the archives and categories.
+
+These are compiled on first use as `OLD_STYLE_WITH_ARCHIVE`,
+`OLD_STYLE_WITH_CATEGORY` and `OLD_STYLE` and not at import since
+`Identifier` doesn't use them."""
+
+
+def __getattr__(name: str) -> Pattern[str]:
+    """Compiles the patterns in `_LAZY_PATTERNS` on first use."""
+    if name in _LAZY_PATTERNS:
+        pattern = _LAZY_PATTERNS[name]()
+        globals()[name] = pattern
+        return pattern
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _pattern(name: str) -> Pattern[str]:
+    """Gets a pattern from `_LAZY_PATTERNS` from within this module."""
+    return globals().get(name) or __getattr__(name)
 
-OLD_STYLE = re.compile(
-    r'(?:%s)?(?P<arxiv_id>(%s)\/\d{2}[01]\d{4}(v\d*)?)'
-    % (_prefix, f'{_archive}|{_category}'),
-    re.I
-)
 
 STANDARD = re.compile(
     r'(?<![\d=\.])(?:%s)?(?P<arxiv_id>\d{4}\.\d{4,5}(v\d*)?)'
@@ -57,10 +78,10 @@ def parse_arxiv_id(value: str) -> str:
 
     Raises `ValidationError` if no arXiv ID.
     """
-    m = re.search(STANDARD, value)
+    m = STANDARD.search(value)
     if m:
         return m.group('arxiv_id')
-    m = re.search(OLD_STYLE, value)
+    m = _pattern('OLD_STYLE').search(value)
     if m:
         return m.group('arxiv_id')
     raise ValueError('Not a valid arXiv ID')
@@ -108,51 +129,71 @@ SUBSTITUTIONS: Sub_type = [
     (r'([^a\-])(ph|ex|th|qc|mat|lat|sci)(\/|$)', r'\g<1>-\g<2>\g<3>', 1, 0)
 ]
 
+_COMPILED_SUBSTITUTIONS = [(re.compile(pattern, flags), repl, count)
+                           for pattern, repl, count, flags in SUBSTITUTIONS]
+"""`SUBSTITUTIONS` compiled once"""
+
+_set = object.__setattr__
+"""Sets attributes of an `Identifier` during `__init__`"""
+
+RE_NORMALIZED_NEW_ID = re.compile(r'^\d{4}\.\d{4,5}(v[1-9]\d*)?$')
+"""A new ID that none of the `SUBSTITUTIONS` would change, ex. 2101.04792v3"""
+
+@total_ordering
 class Identifier:
-    """Class for arXiv identifiers of published papers."""
+    """Class for arXiv identifiers of published papers.
+
+    Instances are immutable, hashable and ordered by date, archive,
+    number and version. They use `__slots__` to keep them small since
+    the sync can hold many of them at once.
+    """
+
+    __slots__ = ('ids', 'id', 'archive', 'filename', 'year', 'month',
+                 'is_old_id', 'version', 'num', 'has_version', 'idv',
+                 'squashed', 'squashedv', 'yymm')
 
     def __init__(self, arxiv_id: str) -> None:
         """Attempt to validate the provided arXiv ID.
 
         Parse constituent parts.
         """
-        self.ids = arxiv_id
+        _set(self, 'ids', arxiv_id)
         """The ID as specified."""
-        self.id: str = arxiv_id
-        self.archive: Optional[str] = None
-        self.filename: Optional[str] = None
-        self.year: Optional[int] = None
-        self.month: Optional[int] = None
-        self.is_old_id: Optional[bool] = None
+        _set(self, 'id', arxiv_id)
+        _set(self, 'archive', None)
+        _set(self, 'filename', None)
+        _set(self, 'year', None)
+        _set(self, 'month', None)
+        _set(self, 'is_old_id', None)
 
         if self.ids in taxonomy.definitions.ARCHIVES:
             raise IdentifierIsArchiveException(
                 taxonomy.definitions.ARCHIVES[self.ids]['name'])
 
-        for subtup in SUBSTITUTIONS:
-            arxiv_id = re.sub(subtup[0],
-                              subtup[1],
-                              arxiv_id,
-                              count=subtup[2],
-                              flags=subtup[3])
-
-        self.version = 0
-        parse_actions = ((RE_ARXIV_OLD_ID, self._parse_old_id),
-                         (RE_ARXIV_NEW_ID, self._parse_new_id))
-
+        _set(self, 'version', 0)
         id_match = None
-        for regex, parse_action in parse_actions:
-            id_match = re.match(regex, arxiv_id)
-            if id_match:
-                parse_action(id_match)
-                break
+        if RE_NORMALIZED_NEW_ID.match(arxiv_id):
+            # Fast path, skips the substitutions and the old ID regex
+            id_match = RE_ARXIV_NEW_ID.match(arxiv_id)
+            self._parse_new_id(id_match)
+        else:
+            for pattern, repl, count in _COMPILED_SUBSTITUTIONS:
+                arxiv_id = pattern.sub(repl, arxiv_id, count=count)
+
+            parse_actions = ((RE_ARXIV_OLD_ID, self._parse_old_id),
+                             (RE_ARXIV_NEW_ID, self._parse_new_id))
+            for regex, parse_action in parse_actions:
+                id_match = regex.match(arxiv_id)
+                if id_match:
+                    parse_action(id_match)
+                    break
 
         if not id_match:
             raise IdentifierException(
                 f'invalid arXiv identifier {self.ids}'
             )
 
-        self.num: Optional[int] = int(id_match.group('num'))
+        _set(self, 'num', int(id_match.group('num')))
         if self.num is None:
             raise IdentifierException('arXiv identifier is empty')
         if self.year is None:
@@ -165,16 +206,16 @@ class Identifier:
                 raise IdentifierException(
                     'invalid arXiv identifier {}'.format(self.ids)
                 )
-        self.has_version: bool = False
-        self.idv: str = self.id
+        _set(self, 'has_version', False)
+        _set(self, 'idv', self.id)
         if id_match.group('version'):
-            self.version = int(id_match.group('version'))
-            self.idv = f'{self.id}v{self.version}'
-            self.has_version = True
-        self.squashed = self.id.replace('/', '')
-        self.squashedv = self.idv.replace('/', '')
-        self.yymm: str = id_match.group('yymm')
-        self.month = int(id_match.group('mm'))
+            _set(self, 'version', int(id_match.group('version')))
+            _set(self, 'idv', f'{self.id}v{self.version}')
+            _set(self, 'has_version', True)
+        _set(self, 'squashed', self.id.replace('/', ''))
+        _set(self, 'squashedv', self.idv.replace('/', ''))
+        _set(self, 'yymm', id_match.group('yymm'))
+        _set(self, 'month', int(id_match.group('mm')))
         if self.month > 12 or self.month < 1:
             raise IdentifierException(
                 f'invalid arXiv identifier {self.ids}'
@@ -191,6 +232,15 @@ class Identifier:
                     f'invalid arXiv identifier {self.ids}'
                 )
 
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError(f"Identifier is immutable, cannot set {name}")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"Identifier is immutable, cannot delete {name}")
+
+    def __reduce__(self):
+        return (Identifier, (self.ids,))
+
     def _parse_old_id(self, match_obj: Match[str]) -> None:
         """
         Populate instance attributes parsed from old arXiv identifier.
@@ -207,17 +257,17 @@ class Identifier:
         None
 
         """
-        self.is_old_id = True
-        self.archive = match_obj.group('archive')
-        self.year = int(match_obj.group('yy')) + 1900
-        self.year += 100 if int(match_obj.group('yy')) < 91 else 0
+        _set(self, 'is_old_id', True)
+        _set(self, 'archive', match_obj.group('archive'))
+        year = int(match_obj.group('yy')) + 1900
+        _set(self, 'year', year + (100 if int(match_obj.group('yy')) < 91 else 0))
 
         if match_obj.group('version'):
-            self.version = int(match_obj.group('version'))
-        self.filename = '{}{:03d}'.format(
+            _set(self, 'version', int(match_obj.group('version')))
+        _set(self, 'filename', '{}{:03d}'.format(
             match_obj.group('yymm'),
-            int(match_obj.group('num')))
-        self.id = f'{self.archive}/{self.filename}'
+            int(match_obj.group('num'))))
+        _set(self, 'id', f'{self.archive}/{self.filename}')
 
     def _parse_new_id(self, match_obj: Match[str]) -> None:
         """
@@ -240,24 +290,33 @@ class Identifier:
         None
 
         """
-        self.is_old_id = False
-        self.archive = 'arxiv'
+        _set(self, 'is_old_id', False)
+        _set(self, 'archive', 'arxiv')
         # NB: this works only until 2099
-        self.year = int(match_obj.group('yy')) + 2000
+        _set(self, 'year', int(match_obj.group('yy')) + 2000)
         if self.year >= 2015:
-            self.id = '{:04d}.{:05d}'.format(
+            _set(self, 'id', '{:04d}.{:05d}'.format(
                 int(match_obj.group('yymm')),
-                int(match_obj.group('num')))
+                int(match_obj.group('num'))))
         else:
-            self.id = '{:04d}.{:04d}'.format(
+            _set(self, 'id', '{:04d}.{:04d}'.format(
                 int(match_obj.group('yymm')),
-                int(match_obj.group('num')))
-        self.filename = self.id
+                int(match_obj.group('num'))))
+        _set(self, 'filename', self.id)
+
+    def _asdict(self) -> Dict[str, object]:
+        """Return the attributes as a dict."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def _key(self) -> Tuple[object, ...]:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def _sort_key(self) -> Tuple[object, ...]:
+        return (self.year, self.month, self.archive, self.num, self.version, self.ids)
 
     def __str__(self) -> str:
         """Return the string representation of the instance in json."""
-        return json.dumps(self, default=lambda o: o.__dict__,
-                          sort_keys=True, indent=True)
+        return json.dumps(self._asdict(), sort_keys=True, indent=True)
 
     def __repr__(self) -> str:
         """Return the instance representation."""
@@ -271,7 +330,41 @@ class Identifier:
         by design: https://stackoverflow.com/a/37557540/3096687
 
         """
-        try:
-            return self.__dict__ == other.__dict__
-        except AttributeError:
+        if not isinstance(other, Identifier):
             return False
+        return self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def __lt__(self, other: object) -> bool:
+        if not isinstance(other, Identifier):
+            return NotImplemented
+        return self._sort_key() < other._sort_key()
+
+
+@lru_cache(maxsize=65536)
+def cached_identifier(arxiv_id: str) -> Identifier:
+    """Memoized `Identifier(arxiv_id)`."""
+    return Identifier(arxiv_id)
+
+
+def parse_many(arxiv_ids: Iterable[str]) -> List[Union[Identifier, IdentifierException]]:
+    """Parses many IDs at once, such as a column of a manifest.
+
+    Returns a list in the same order as `arxiv_ids` with either the
+    `Identifier` or the `IdentifierException` for each ID. An ID that
+    is repeated is only parsed once and gets the same `Identifier`.
+    """
+    parsed: Dict[str, Union[Identifier, IdentifierException]] = {}
+    results: List[Union[Identifier, IdentifierException]] = []
+    for arxiv_id in arxiv_ids:
+        result = parsed.get(arxiv_id)
+        if result is None:
+            try:
+                result = Identifier(arxiv_id)
+            except IdentifierException as ex:
+                result = ex
+            parsed[arxiv_id] = result
+        results.append(result)
+    return results
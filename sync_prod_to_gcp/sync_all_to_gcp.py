@@ -1,56 +1,539 @@
-import subprocess
-from datetime import datetime
+"""Syncs all of /data/ftp, /data/orig and /cache/ps_cache to the GS bucket.
+
+ex.
+```sh
+python sync_all_to_gcp.py
+```
+
+This used to shell out to `rclone sync` for each tree one after another.
+Now the three jobs run at the same time in this process.
+
+For each job, the local tree is walked one directory at a time by a
+pool of `SCAN_THREADS` threads. Each directory is compared with the
+listing of the same prefix in the bucket. A file is uploaded if it is
+missing from the bucket or the size is different. If only the mtime is
+different, the crc32c of the local file is compared with the object and
+only the mtime of the object is updated if they match. With
+`--checksum` the crc32c is always compared. Uploads are done by a pool
+of `UPLOAD_THREADS` threads. Objects with no local file are deleted,
+as are all the objects under a directory that no longer exists
+locally, as `rclone sync` does.
+
+The mtime is kept in the object metadata the same way rclone does so
+objects uploaded by rclone are not uploaded again.
+
+A snapshot of each tree is saved in `snapshot_dir` after each sync so
+the next sync only looks at directories that changed, see `Snapshot`.
+Run with `--full` from time to time to compare every directory with
+the bucket.
+
+The stats for each job are written as JSON to `logs_dir`.
+"""
+
+# pylint: disable=locally-disabled, line-too-long, logging-fstring-interpolation
+
+import os
+import sys
+import argparse
+import base64
+import json
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timezone
+from fnmatch import fnmatch
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+import google_crc32c
+from google.api_core.exceptions import NotFound
+from google.cloud import storage
+
+import logging
+logging.basicConfig(level=logging.WARNING, format='%(message)s (%(threadName)s)')
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.WARNING)
 
 logs_dir = '/opt_arxiv/e-prints/sync_to_arxiv_production/logs'
 
-remote = 'remote:' #name configured with rclone
-bucket = 'arxiv-production-data'
-
-excludes = "--exclude 'lost+found/**' --exclude '.snapshot/**' --exclude '.htaccess'  "
-"--exclude '.nfs*'  --exclude '.cit_nfs_mount_test'  --exclude 'arxiv-sync.txt'"
-
-args = "--modify-window 1100ms"
-
-template = f'/usr/bin/rclone sync {excludes} {args} {{0}} remote:{{1}}'
-
-rclone_exit_codes ={
-    0: "Success",
-    1: "Syntax or usage error",
-    2: "Error not otherwise categorised",
-    3: "Directory not found",
-    4: "File not found",
-    5: "Temporary error (one that more retries might fix) (Retry errors)",
-    6: "Less serious errors (like 461 errors from dropbox) (NoRetry errors)",
-    7: "Fatal error (one that more retries won't fix, like account suspended) (Fatal errors)",
-    8: "Transfer exceeded - limit set by --max-transfer reached",
-    9: "Operation successful, but no files transferred",
-}
-
-#        from          to              logname
-jobs = [['/data/ftp', f'{bucket}/ftp/', 'ftp'],
-        ['/data/orig', f'{bucket}/orig', 'orig'],
-        ['/cache/ps_cache', f'{bucket}/ps_cache', 'ps-cache'],
+snapshot_dir = '/opt_arxiv/e-prints/sync_to_arxiv_production/snapshots'
+"""Directory for the sqlite `Snapshot` of each job"""
+
+bucket_name = 'arxiv-production-data'
+
+EXCLUDE_DIRS = ['lost+found', '.snapshot']
+"""Directories that are not synced"""
+
+EXCLUDE_FILES = ['.htaccess', '.nfs*', '.cit_nfs_mount_test', 'arxiv-sync.txt']
+"""fnmatch patterns of file names that are not synced"""
+
+MODIFY_WINDOW = 1.1
+"""Max sec of difference for mtimes to be considered the same"""
+
+SCAN_THREADS = 8
+"""Threads per job to scan local directories and list the bucket"""
+
+UPLOAD_THREADS = 16
+"""Threads per job to upload files"""
+
+MAX_PENDING_UPLOADS = 1000
+"""Max uploads waiting for an upload thread, limits memory use"""
+
+MAX_ERROR_SAMPLES = 100
+
+#        from               to (key prefix)  logname
+jobs = [['/data/ftp',       'ftp/',          'ftp'],
+        ['/data/orig',      'orig/',         'orig'],
+        ['/cache/ps_cache', 'ps_cache/',     'ps-cache'],
         ]
 
-timestamp = datetime.now().strftime("%Y-%m-%d-%H%M")
+RCLONE_MTIME = 'mtime'
+"""Object metadata key rclone uses for the mtime, RFC3339 format"""
 
-def dosync(frm, to, logname, timestamp):
-    command = template.format(frm, to)
-    logfilename = 'logs/{logname}-{timestamp}.log'
-    with open(logfilename, 'w') as outfh:
-        process = subprocess.run(command.split(), stdout=outfh, stderr=subprocess.STDOUT)
-        if process.returncode in [0, 9]:
-            log('INFO', rclone_exit_codes[process.returncode])
-        elif process.returncode in rclone_exit_codes:
-            log('ERROR', rclone_exit_codes[process.returncode])
-            send_logs(frm, to, logfilename)
+GSUTIL_MTIME = 'goog-reserved-file-mtime'
+"""Object metadata key gsutil uses for the mtime, sec since epoch"""
+
+
+@dataclass
+class JobStats:
+    """Stats of a sync job"""
+    name: str
+    local_dir: str
+    prefix: str
+    dirs: int = 0
+    dirs_unchanged: int = 0
+    files: int = 0
+    bytes: int = 0
+    uploaded: int = 0
+    uploaded_bytes: int = 0
+    mtime_updated: int = 0
+    deleted: int = 0
+    errors: int = 0
+    error_samples: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+
+    def add(self, **counts: int) -> None:
+        with self._lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+
+    def error(self, msg: str) -> None:
+        logger.error(msg)
+        with self._lock:
+            self.errors += 1
+            if len(self.error_samples) < MAX_ERROR_SAMPLES:
+                self.error_samples.append(msg)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return asdict(self)
+
+
+_tl_data = threading.local()
+
+def thread_bucket():
+    """Gets a `Bucket` with a `storage.Client` for the current thread."""
+    if not hasattr(_tl_data, 'bucket'):
+        _tl_data.bucket = storage.Client().bucket(bucket_name)
+    return _tl_data.bucket
+
+
+def is_excluded(name: str) -> bool:
+    """If a file `name` matches `EXCLUDE_FILES`."""
+    return any(fnmatch(name, pat) for pat in EXCLUDE_FILES)
+
+
+def scan_dir(local_dir: str) -> Tuple[Dict[str, Tuple[int, float]], List[str]]:
+    """Gets the files and subdirectories of `local_dir`.
+
+    Returns a dict of file name to (size, mtime) and a list of
+    subdirectory names."""
+    files, subdirs = {}, []
+    with os.scandir(local_dir) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in EXCLUDE_DIRS:
+                    subdirs.append(entry.name)
+            elif entry.is_file(follow_symlinks=False):
+                if not is_excluded(entry.name):
+                    stat = entry.stat(follow_symlinks=False)
+                    files[entry.name] = (stat.st_size, stat.st_mtime)
+    return files, subdirs
+
+
+def list_prefix(prefix: str) -> Tuple[Dict[str, storage.Blob], List[str]]:
+    """Gets the objects and subdirectories directly under `prefix` in the bucket.
+
+    Returns a dict of object name relative to `prefix` to `Blob` and a
+    list of subdirectory names. Objects matching `EXCLUDE_FILES` and
+    `EXCLUDE_DIRS` are left out so they are never deleted."""
+    bucket = thread_bucket()
+    blobs = bucket.client.list_blobs(bucket, prefix=prefix, delimiter='/')
+    objects = {name: blob for name, blob in ((blob.name[len(prefix):], blob) for blob in blobs)
+               if not is_excluded(name)}
+    # prefixes is only filled in once the listing has been iterated
+    subdirs = [sub[len(prefix):].rstrip('/') for sub in blobs.prefixes]
+    return objects, [sub for sub in subdirs if sub not in EXCLUDE_DIRS]
+
+
+def blob_mtime(blob) -> Optional[float]:
+    """Gets the mtime of the file the object was uploaded from, as sec since epoch."""
+    meta = blob.metadata or {}
+    try:
+        if RCLONE_MTIME in meta:
+            return datetime.fromisoformat(_trim_rfc3339(meta[RCLONE_MTIME])).timestamp()
+        if GSUTIL_MTIME in meta:
+            return float(meta[GSUTIL_MTIME])
+    except ValueError:
+        pass
+    return blob.updated.timestamp() if blob.updated else None
+
+
+def _trim_rfc3339(value: str) -> str:
+    """Makes an RFC3339 time with nanoseconds parsable by `datetime.fromisoformat`"""
+    value = value.replace('Z', '+00:00')
+    if '.' in value:
+        head, rest = value.split('.', 1)
+        digits = ''.join(c for c in rest if c.isdigit())
+        value = f"{head}.{digits[:6].ljust(6, '0')}{rest[len(digits):]}"
+    return value
+
+
+def mtime_meta(mtime: float) -> Dict[str, str]:
+    """Object metadata for `mtime` in the format rclone uses."""
+    return {RCLONE_MTIME: datetime.fromtimestamp(mtime, tz=timezone.utc).isoformat().replace('+00:00', 'Z')}
+
+
+def file_crc32c(localpath: str) -> str:
+    """Gets the CRC32C of a file in the same base64 format as `Blob.crc32c`"""
+    crc = google_crc32c.Checksum()
+    with open(localpath, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b''):
+            crc.update(chunk)
+    return base64.b64encode(crc.digest()).decode('utf-8')
+
+
+class Snapshot:
+    """Snapshot of a local tree as of the last sync, saved in sqlite.
+
+    For each directory it has the mtime of the directory and its parent.
+    For each file it has the size and mtime.
+
+    A directory is only saved with its mtime once all of its files were
+    synced without errors. One with errors is kept dirty, without an
+    mtime, so the next sync compares it with the bucket again; it is
+    still a subdirectory of its parent so it is found even if the parent
+    has not changed. A directory with the same mtime as in the snapshot
+    has had no files added, removed or renamed since then so it is not
+    scanned again. Files changed in place without a rename don't change
+    the mtime of the directory; use `--full` to find those.
+    """
+
+    def __init__(self, path: Path):
+        self.lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS dirs "
+                              "(rel TEXT PRIMARY KEY, parent TEXT, mtime REAL)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS files "
+                              "(rel TEXT, name TEXT, size INTEGER, mtime REAL, PRIMARY KEY (rel, name))")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent)")
+
+    def dir_mtime(self, rel: str) -> Optional[float]:
+        """Gets the mtime of the directory `rel` or None if it is not in the snapshot or is dirty."""
+        with self.lock:
+            row = self.conn.execute("SELECT mtime FROM dirs WHERE rel = ?", (rel,)).fetchone()
+            return row[0] if row else None
+
+    def subdirs(self, rel: str) -> List[str]:
+        with self.lock:
+            return [row[0] for row in self.conn.execute("SELECT rel FROM dirs WHERE parent = ?", (rel,))]
+
+    def files(self, rel: str) -> Dict[str, Tuple[int, float]]:
+        with self.lock:
+            return {name: (size, mtime) for name, size, mtime in
+                    self.conn.execute("SELECT name, size, mtime FROM files WHERE rel = ?", (rel,))}
+
+    def set_dir(self, rel: str, parent: Optional[str], mtime: float,
+                files: Dict[str, Tuple[int, float]], subdirs: List[str]) -> None:
+        """Saves the directory `rel` with its `files`.
+
+        Directories under `rel` that are not in `subdirs` are removed and
+        those in `subdirs` that are not in the snapshot yet are added
+        dirty, so they are synced even if this sync stops before it gets
+        to them."""
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?)", (rel, parent, mtime))
+            self.conn.execute("DELETE FROM files WHERE rel = ?", (rel,))
+            self.conn.executemany("INSERT INTO files VALUES (?, ?, ?, ?)",
+                                  [(rel, name, size, fmtime) for name, (size, fmtime) in files.items()])
+            known = [row[0] for row in self.conn.execute("SELECT rel FROM dirs WHERE parent = ?", (rel,))]
+            for sub in set(known) - set(subdirs):
+                under = (sub, len(sub) + 1, sub + '/')
+                self.conn.execute("DELETE FROM dirs WHERE rel = ? OR substr(rel, 1, ?) = ?", under)
+                self.conn.execute("DELETE FROM files WHERE rel = ? OR substr(rel, 1, ?) = ?", under)
+            self.conn.executemany("INSERT OR IGNORE INTO dirs VALUES (?, ?, NULL)",
+                                  [(sub, rel) for sub in subdirs])
+
+    def set_dirty(self, rel: str, parent: Optional[str]) -> None:
+        """Marks the directory `rel` dirty so it is compared with the bucket by the next sync."""
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?, NULL)", (rel, parent))
+            self.conn.execute("DELETE FROM files WHERE rel = ?", (rel,))
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+
+class DirSync:
+    """The uploads and deletes of one directory.
+
+    Once the last one is done the directory is saved to the `snapshot`,
+    or marked dirty if any failed."""
+
+    def __init__(self, snapshot: Optional[Snapshot], rel: str, parent: Optional[str], mtime: float,
+                 files: Dict[str, Tuple[int, float]], subdirs: List[str]):
+        self.snapshot = snapshot
+        self.rel = rel
+        self.parent = parent
+        self.mtime = mtime
+        self.files = files
+        self.subdirs = subdirs
+        self.lock = threading.Lock()
+        self.pending = 1  # held by `sync_dir` until everything is submitted
+        self.failed = False
+
+    def add(self) -> None:
+        with self.lock:
+            self.pending += 1
+
+    def fail(self) -> None:
+        with self.lock:
+            self.failed = True
+
+    def done(self) -> None:
+        with self.lock:
+            self.pending -= 1
+            if self.pending:
+                return
+        if not self.snapshot:
+            return
+        if self.failed:
+            self.snapshot.set_dirty(self.rel, self.parent)
+        else:
+            self.snapshot.set_dir(self.rel, self.parent, self.mtime, self.files, self.subdirs)
+
+
+class MirrorJob:
+    """Syncs one local tree to a key prefix in the bucket.
+
+    If there is a `snapshot`, directories that have not changed since
+    the last sync are skipped. Directories that changed are compared to
+    the snapshot and not listed in the bucket. Only directories that
+    are not in the snapshot are compared with a listing of the bucket.
+    With `full` the snapshot is not used for the comparisons but is
+    still saved.
+    """
+
+    def __init__(self, local_dir: str, prefix: str, name: str,
+                 checksum: bool = False, dry_run: bool = False,
+                 snapshot: Optional[Snapshot] = None, full: bool = False):
+        self.local_dir = local_dir.rstrip('/')
+        self.prefix = prefix
+        self.checksum = checksum
+        self.dry_run = dry_run
+        self.snapshot = snapshot
+        self.full = full
+        self.stats = JobStats(name, local_dir, prefix)
+        self.pending = threading.BoundedSemaphore(MAX_PENDING_UPLOADS)
+        self.upload_pool: Optional[ThreadPoolExecutor] = None
+
+    def run(self) -> JobStats:
+        start = perf_counter()
+        if not Path(self.local_dir).is_dir():
+            self.stats.error(f"Directory {self.local_dir} not found")
+            return self.stats
+
+        with ThreadPoolExecutor(max_workers=UPLOAD_THREADS, thread_name_prefix=f"{self.stats.name}-up") as upload_pool, \
+             ThreadPoolExecutor(max_workers=SCAN_THREADS, thread_name_prefix=f"{self.stats.name}-scan") as scan_pool:
+            self.upload_pool = upload_pool
+            level = ['']
+            while level:
+                level = [sub for subs in scan_pool.map(self.sync_dir, level) for sub in subs]
+
+        if self.snapshot:
+            self.snapshot.close()
+        self.stats.seconds = round(perf_counter() - start, 2)
+        return self.stats
+
+    def sync_dir(self, rel: str) -> List[str]:
+        """Syncs the files of one directory. Returns the subdirectories
+        to sync, relative to `local_dir`."""
+        local = f"{self.local_dir}/{rel}" if rel else self.local_dir
+        prefix = f"{self.prefix}{rel}/" if rel else self.prefix
+        parent = rel.rpartition('/')[0] if rel else None
+        try:
+            dir_mtime = os.stat(local).st_mtime
+            known = None
+            if self.snapshot and not self.full:
+                if self.snapshot.dir_mtime(rel) == dir_mtime:
+                    self.stats.add(dirs_unchanged=1)
+                    return self.snapshot.subdirs(rel)
+                if self.snapshot.dir_mtime(rel) is not None:
+                    known = self.snapshot.files(rel)
+            files, subdirs = scan_dir(local)
+            if known is None:
+                remote, remote_subdirs = list_prefix(prefix)
+            else:
+                remote_subdirs = [sub.rpartition('/')[2] for sub in self.snapshot.subdirs(rel)]
+        except Exception as ex:
+            self.stats.error(f"Could not sync directory {local} to {prefix}: {ex}")
+            if self.snapshot:
+                self.snapshot.set_dirty(rel, parent)
+            return []
+
+        self.stats.add(dirs=1, files=len(files), bytes=sum(size for size, _ in files.values()))
+        subdirs = [f"{rel}/{sub}" if rel else sub for sub in subdirs]
+        work = DirSync(self.snapshot, rel, parent, dir_mtime, files, subdirs)
+        if known is not None:
+            for name, (size, mtime) in files.items():
+                if known.pop(name, None) != (size, mtime):
+                    self._submit(work, self.upload, f"{local}/{name}", prefix + name, size, mtime)
+            for name in known:
+                self._submit(work, self.delete, prefix + name)
         else:
-            log('ERROR', f"non-zero unknown exit code by rclone of {process.returncode}")
-            send_logs(frm, to, logfilename)
+            for name, (size, mtime) in files.items():
+                blob = remote.pop(name, None)
+                self._submit(work, self.sync_file, f"{local}/{name}", prefix + name, size, mtime, blob)
+            for name, blob in remote.items():
+                self._submit(work, self.delete, blob.name)
+        for sub in set(remote_subdirs) - set(subdirs):
+            self._submit(work, self.delete_prefix, f"{prefix}{sub}/")
+        work.done()
+
+        return subdirs
+
+    def _submit(self, work: DirSync, fn, *args) -> None:
+        self.pending.acquire()
+        work.add()
+        future = self.upload_pool.submit(fn, work, *args)
+        future.add_done_callback(lambda _: (self.pending.release(), work.done()))
+
+    def _error(self, work: DirSync, msg: str) -> None:
+        self.stats.error(msg)
+        work.fail()
+
+    def sync_file(self, work: DirSync, localpath: str, key: str, size: int, mtime: float, blob) -> None:
+        try:
+            if blob is None or blob.size != size:
+                return self._upload(localpath, key, size, mtime)
+            same_mtime = abs((blob_mtime(blob) or 0) - mtime) <= MODIFY_WINDOW
+            if same_mtime and not self.checksum:
+                return
+            if file_crc32c(localpath) != blob.crc32c:
+                return self._upload(localpath, key, size, mtime)
+            if not same_mtime:
+                logger.info(f"Updating mtime of gs://{bucket_name}/{key}")
+                if not self.dry_run:
+                    blob.metadata = {**(blob.metadata or {}), **mtime_meta(mtime)}
+                    blob.patch()
+                self.stats.add(mtime_updated=1)
+        except Exception as ex:
+            self._error(work, f"Could not sync {localpath} to {key}: {ex}")
+
+    def upload(self, work: DirSync, localpath: str, key: str, size: int, mtime: float) -> None:
+        try:
+            self._upload(localpath, key, size, mtime)
+        except Exception as ex:
+            self._error(work, f"Could not upload {localpath} to {key}: {ex}")
+
+    def _upload(self, localpath: str, key: str, size: int, mtime: float) -> None:
+        logger.info(f"Uploading {localpath} to gs://{bucket_name}/{key}")
+        if not self.dry_run:
+            blob = thread_bucket().blob(key)
+            blob.metadata = mtime_meta(mtime)
+            blob.upload_from_filename(localpath, checksum='crc32c')
+        self.stats.add(uploaded=1, uploaded_bytes=size)
+
+    def delete(self, work: DirSync, key: str) -> None:
+        try:
+            logger.info(f"Deleting gs://{bucket_name}/{key}, no local file")
+            if not self.dry_run:
+                thread_bucket().blob(key).delete()
+            self.stats.add(deleted=1)
+        except NotFound:
+            pass
+        except Exception as ex:
+            self._error(work, f"Could not delete {key}: {ex}")
+
+    def delete_prefix(self, work: DirSync, prefix: str) -> None:
+        """Deletes the objects under `prefix`, a directory that is no longer local."""
+        try:
+            bucket = thread_bucket()
+            for blob in bucket.client.list_blobs(bucket, prefix=prefix):
+                if is_excluded(blob.name.rpartition('/')[2]):
+                    continue
+                logger.info(f"Deleting gs://{bucket_name}/{blob.name}, no local directory")
+                if not self.dry_run:
+                    try:
+                        blob.delete()
+                    except NotFound:
+                        continue
+                self.stats.add(deleted=1)
+        except Exception as ex:
+            self._error(work, f"Could not delete {prefix}: {ex}")
 
 
 def log(severity, msg):
     print(severity + " " + msg)
 
-def send_logs(frm, to, logfilename):
-    pass
+
+def write_stats(stats: JobStats, timestamp: str) -> None:
+    """Writes the stats of a job as JSON to the `logs_dir`."""
+    logfilename = Path(logs_dir) / f"{stats.name}-{timestamp}.json"
+    with open(logfilename, 'w') as outfh:
+        json.dump(stats.to_dict(), outfh, indent=2)
+
+
+def sync_all(checksum: bool = False, dry_run: bool = False, full: bool = False) -> List[JobStats]:
+    """Runs all the `jobs` at the same time.
+
+    The snapshots are not used or saved for a dry run."""
+    mirrors = [MirrorJob(frm, to, logname, checksum, dry_run,
+                         None if dry_run else Snapshot(Path(snapshot_dir) / f"{logname}.sqlite"),
+                         full)
+               for frm, to, logname in jobs]
+    with ThreadPoolExecutor(max_workers=len(mirrors)) as pool:
+        return list(pool.map(lambda mirror: mirror.run(), mirrors))
+
+
+if __name__ == "__main__":
+    ad = argparse.ArgumentParser(epilog=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ad.add_argument('-v', help='verbse', action='store_true')
+    ad.add_argument('-d', help="Dry run, no uploads or deletes", action='store_true')
+    ad.add_argument('--checksum', help="Compare crc32c of all files, reads every file", action='store_true')
+    ad.add_argument('--full', help="Compare every directory with the bucket, not just the ones changed since the last sync",
+                    action='store_true')
+    args = ad.parse_args()
+
+    if args.v:
+        logger.setLevel(logging.INFO)
+
+    timestamp = datetime.now().strftime("%Y-%m-%d-%H%M")
+    all_stats = sync_all(args.checksum, args.d, args.full or args.checksum)
+    for stats in all_stats:
+        write_stats(stats, timestamp)
+        if stats.errors:
+            log('ERROR', f"{stats.name}: {stats.errors} errors, see {logs_dir}/{stats.name}-{timestamp}.json")
+        else:
+            log('INFO', f"{stats.name}: Success")
+        log('INFO', json.dumps({k: v for k, v in stats.to_dict().items() if k != 'error_samples'}))
+
+    sys.exit(1 if any(stats.errors for stats in all_stats) else 0)
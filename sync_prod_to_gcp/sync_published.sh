@@ -19,7 +19,7 @@ fi
 
 . venv/bin/activate
 export GOOGLE_APPLICATION_CREDENTIALS=~/arxiv-production-cred.json
-python sync_published_to_gcp.py /data/new/logs/publish_$DATE.log > sync_published_$DATE.report 2> sync_published_$DATE.err
+python sync_published_to_gcp.py --journal sync_published_$DATE.journal /data/new/logs/publish_$DATE.log > sync_published_$DATE.report 2> sync_published_$DATE.err
 deactivate
 
 if [ -s sync_published_$DATE.report ]
@@ -8,16 +8,41 @@ python sync_to_arxiv_produciton.py /data/new/logs/publish_221101.log
 The PUBLISHLOG fiels can be found on the legacy FS at
 /data/new/logs/publish_YYMMDD.log
 
-This works by parsing the PUBLISHLOG file for new and rep entries,
-those are put in the `todo_q` queue.
-
-Then for each of these `arxiv_id`s it will check that the PDF file for
-the `arxiv_id` exists in the `/data/ps_cache`. If it does not it will
-request the `arxiv_id` via HTTP from the arxiv.org site and wait until
-the `/data/ps_cache` file exists.
+This works by parsing the PUBLISHLOG file for new and rep entries.
+The actions for each entry are split in two: actions that only upload
+files are put in the `upload_q` queue and actions that need a PDF built
+are put in the `build_q` queue.
+
+Jobs on the `upload_q` are done by a pool of `UPLOAD_THREADS` threads
+that are not limited by the web hosts.
+
+Jobs on the `build_q` are done by threads for each of the
+`ENSURE_HOSTS`. For each of these `arxiv_id`s it will check that the
+PDF file for the `arxiv_id` exists in the `/data/ps_cache`. If it does
+not it will request the `arxiv_id` via HTTP from the arxiv.org site
+and wait until the `/data/ps_cache` file exists. All the host threads
+take jobs from the same queue so a fast host will take more jobs than
+a slow one. The number of concurrent builds on each host is adjusted
+based on the build latency and errors seen for that host, see
+`HostLimit`.
 
 Once that returns the PDF will be uploaded to the GS bucket.
 
+With `--progress` a line with the progress and throughput is printed
+to stderr during the sync. Don't use it from `sync_published.sh`, it
+treats any stderr as an error. With `--prom-textfile` the same metrics
+are written in the Prometheus text format, see `SyncMetrics`.
+
+With `--journal` each completed action is appended to a JSON lines
+file as it happens. If the sync is stopped, running it again with the
+same journal skips the files that are already uploaded, see `Journal`.
+
+With `--warm-list` the ids of the new, replaced and withdrawn papers
+are written to a file, one per line. With `--warm-url` they are POSTed
+to the `/pdf/warm` endpoint of the dissemination service after the
+sync so it resolves them before they are requested. The token for the
+endpoint is read from the `WARM_TOKEN` env var.
+
 # Alternative
 
 This uses the SFS but there is a technique to get the files in a
@@ -27,26 +52,33 @@ publish file to GS and then kick off a CloudRun job to do the sync.
 
 # pylint: disable=locally-disabled, line-too-long, logging-fstring-interpolation, global-statement
 
+import os
 import sys
 import argparse
+import asyncio
+import base64
 import re
 import threading
 from threading import Thread
 from queue import Queue, Empty
+from concurrent.futures import ThreadPoolExecutor
 import requests
 from time import sleep, perf_counter
 from datetime import datetime
 import signal
 import json
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
+from collections import defaultdict
+from urllib.parse import urlparse
 from pathlib import Path
 
-from identifier import Identifier
+from identifier import cached_identifier
 
 overall_start = perf_counter()
 
 from google.cloud import storage
+import google_crc32c
 
 import logging
 logging.basicConfig(level=logging.WARNING, format='%(message)s (%(threadName)s)')
@@ -72,19 +104,33 @@ ENSURE_HOSTS = [
     ('web8.arxiv.org', 8),
     ('web9.arxiv.org', 8),
 ]
-"""Tuples of form HOST, THREADS_FOR_HOST"""
+"""Tuples of form HOST, THREADS_FOR_HOST
+
+THREADS_FOR_HOST is the maximum number of concurrent builds for the
+host. The actual number is adjusted by `HostLimit`."""
+
+UPLOAD_THREADS = 16
+"""Threads for jobs that only upload files, these don't use the web hosts"""
+
+ENSURE_SLOW_MS = 60 * 1000
+"""Build latency above which the number of concurrent builds for a host is reduced"""
 
 ENSURE_CERT_VERIFY=False
 
 PDF_WAIT_SEC = 60 * 3
 """Maximum sec to wait for a PDF to be created"""
 
-todo_q: Queue = Queue()
+upload_q: Queue = Queue()
+build_q: Queue = Queue()
 uploaded_q: Queue = Queue() # number of files uploaded
 summary_q: Queue = Queue()
 
+JOURNAL: Optional['Journal'] = None
+"""Journal of completed actions, set with --journal"""
+
 RUN = True
 DONE = False
+"""Set once all the jobs are on the queues"""
 
 def handler_stop_signals(signum, frame):
     """Stop threads on ctrl-c, mostly useful during testing"""
@@ -126,7 +172,7 @@ def make_todos(filename) -> List[dict]:
 
     def upload_abs_acts(rawid):
         """Makes upload actions for abs when only an id is available, ex cross or jref"""
-        arxiv_id = Identifier(rawid)
+        arxiv_id = cached_identifier(rawid)
         archive = ('arxiv' if not arxiv_id.is_old_id else arxiv_id.archive)
         return [ ('upload', f"{FTP_PREFIX}/{archive}/papers/{arxiv_id.yymm}/{arxiv_id.filename}.abs")]
 
@@ -183,22 +229,24 @@ def make_todos(filename) -> List[dict]:
              continue
         m = new_r.search(txt)
         if m:
-            arxiv_id = Identifier(f"{m.group(1)}v1")
-            todo.append({'submission_id': subid, 'paper_id': m.group(1), 'type': 'new',
+            arxiv_id = cached_identifier(f"{m.group(1)}v1")
+            todo.append({'submission_id': subid, 'paper_id': m.group(1), 'type': 'new', 'version': 1,
                         'actions': upload_abs_src_acts(arxiv_id, txt)})
             continue
         m = rep_r.search(txt)
         if m:
-            arxiv_id = Identifier(f"{m.group(1)}v{m.group(3)}")
+            arxiv_id = cached_identifier(f"{m.group(1)}v{m.group(3)}")
             todo.append({'submission_id': subid, 'paper_id': m.group(1), 'type': 'rep',
+                         'version': int(m.group(3)),
                         'actions': rep_version_acts(txt) + upload_abs_src_acts(arxiv_id, txt)})
             continue
         m = wdr_r.search(txt)
         if m:
-            arxiv_id = Identifier(f"{m.group(1)}v{m.group(3)}")
+            arxiv_id = cached_identifier(f"{m.group(1)}v{m.group(3)}")
             # withdrawls don't need the pdf synced since they should lack source
             actions = list(filter(lambda tt: tt[0] != 'build+upload', rep_version_acts(txt) + upload_abs_src_acts(arxiv_id, txt)))
             todo.append({'submission_id': subid, 'paper_id': m.group(1), 'type': 'wdr',
+                         'version': int(m.group(3)),
                         'actions': actions})
             continue
         m = cross_r.search(txt)
@@ -216,6 +264,32 @@ def make_todos(filename) -> List[dict]:
 
 
 
+def published_ids(todos: List[dict]) -> List[str]:
+    """Ids whose PDF changed in this publish, both versioned and current.
+
+    Crosses and jrefs only change the abs so they are not included."""
+    ids: Dict[str, None] = {}
+    for job in todos:
+        if job['type'] in ('new', 'rep', 'wdr'):
+            ids[f"{job['paper_id']}v{job['version']}"] = None
+            ids[job['paper_id']] = None
+    return list(ids)
+
+
+def warm_service(url: str, token: str, ids: List[str]) -> None:
+    """POSTs `ids` to the warm endpoint of the dissemination service.
+
+    This is only to speed up the first requests so a failure is logged
+    at INFO and does not fail the sync."""
+    try:
+        resp = requests.post(url, json={'ids': ids}, timeout=30,
+                             headers={'Authorization': f"Bearer {token}"})
+        print(f"Warm of {len(ids)} ids at {url} was {resp.status_code} {resp.text.strip()}")
+    except requests.RequestException as ex:
+        logger.info(f"Warm of {len(ids)} ids at {url} failed: {ex}")
+        print(f"Warm of {len(ids)} ids at {url} failed")
+
+
 def path_to_bucket_key(pdf) -> str:
     """Handels both source and cache files. Should handle pdfs, abs, txt
     and other types of files under these directories. Bucket key should
@@ -228,6 +302,17 @@ def path_to_bucket_key(pdf) -> str:
         raise ValueError(f"Cannot convert PDF path {pdf} to a GS key")
 
 
+def pdf_cache_path(arxiv_id) -> Path:
+    """Gets the PDF file in the ps_cache. Returns Path object."""
+    archive = ('arxiv' if not arxiv_id.is_old_id else arxiv_id.archive)
+    return Path(f"{PS_CACHE_PREFIX}/{archive}/pdf/{arxiv_id.yymm}/{arxiv_id.filename}v{arxiv_id.version}.pdf")
+
+
+def arxiv_pdf_url(host, arxiv_id) -> str:
+    """Gets the URL that would be used to request the pdf for the arxiv_id"""
+    return f"https://{host}/pdf/{arxiv_id.filename}v{arxiv_id.version}.pdf"
+
+
 def ensure_pdf(session, host, arxiv_id):
     """Ensures PDF exits for arxiv_id.
 
@@ -243,15 +328,6 @@ def ensure_pdf(session, host, arxiv_id):
 
     This does not check if the arxiv_id is PDF source.
     """
-    def pdf_cache_path(arxiv_id) -> Path:
-        """Gets the PDF file in the ps_cache. Returns Path object."""
-        archive = ('arxiv' if not arxiv_id.is_old_id else arxiv_id.archive)
-        return Path(f"{PS_CACHE_PREFIX}/{archive}/pdf/{arxiv_id.yymm}/{arxiv_id.filename}v{arxiv_id.version}.pdf")
-
-    def arxiv_pdf_url(host, arxiv_id) -> str:
-        """Gets the URL that would be used to request the pdf for the arxiv_id"""
-        return f"https://{host}/pdf/{arxiv_id.filename}v{arxiv_id.version}.pdf"
-
     pdf_file, url = pdf_cache_path(arxiv_id), arxiv_pdf_url(host, arxiv_id)
 
     start = perf_counter()
@@ -285,8 +361,176 @@ def upload_pdf(gs_client, ensure_tuple):
     return upload(gs_client, ensure_tuple[0], path_to_bucket_key(ensure_tuple[0])) + ensure_tuple
 
 
+class Journal:
+    """Append only journal of the sync in JSON lines.
+
+    There are two types of lines. Lines with `"type": "upload"` record a
+    file that is on GS_BUCKET with its key, size and crc32c. Lines with
+    `"type": "summary"` have a row of the summary as soon as the action
+    is done, so the journal is also a summary of a sync that was
+    stopped.
+
+    When a sync is rerun with the same journal, `upload()` skips any
+    key that is in the journal with the same size and crc32c as the
+    local file without checking GS_BUCKET.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.uploaded: Dict[str, Tuple[int, Optional[str]]] = {}
+        partial = False
+        if path.exists():
+            with open(path) as fh:
+                for line in fh:
+                    partial = not line.endswith("\n")
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        continue  # partial line from a sync that was killed
+                    if row.get('type') == 'upload':
+                        self.uploaded[row['key']] = (row['size'], row['crc32c'])
+        self.fh = open(path, 'a')
+        if partial:
+            self.fh.write("\n")  # or the next line would be appended to it and lost
+
+    def is_uploaded(self, key: str, localpath: Path, size: int) -> bool:
+        """Is `key` in the journal with the `size` and crc32c of `localpath`?
+
+        The crc32c is only computed if the size matches."""
+        with self.lock:
+            journal_size, journal_crc32c = self.uploaded.get(key, (None, None))
+        return journal_size == size and journal_crc32c is not None \
+            and journal_crc32c == file_crc32c(localpath)
+
+    def record_upload(self, key: str, size: int, crc32c: Optional[str]) -> None:
+        """Records that `key` is on GS_BUCKET"""
+        with self.lock:
+            self.uploaded[key] = (size, crc32c)
+            self._write({'type': 'upload', 'key': key, 'size': size, 'crc32c': crc32c})
+
+    def record_summary(self, row: tuple) -> None:
+        """Records a row of the summary"""
+        with self.lock:
+            self._write({'type': 'summary', 'time': datetime.now().isoformat(), 'row': row})
+
+    def _write(self, data: dict) -> None:
+        self.fh.write(json.dumps(data, default=str) + "\n")
+        self.fh.flush()
+
+    def close(self) -> None:
+        with self.lock:
+            self.fh.close()
+
+
+class SyncMetrics:
+    """Counts of the progress and throughput of the sync.
+
+    These are updated from each row of the summary as it is added. Use
+    `progress_line()` for a human readable line and `prometheus_text()`
+    for the Prometheus text exposition format, such as for a
+    node_exporter textfile collector.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.start = perf_counter()
+        self.actions_total = 0
+        self.actions_done = 0
+        self.uploaded = 0
+        self.uploaded_bytes = 0
+        self.skipped = 0
+        self.failed = 0
+        self.ensure_ms: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        """Host to [count, total ms] of PDF builds"""
+
+    def add(self, row: tuple) -> None:
+        """Updates the counts from a row of the summary"""
+        with self.lock:
+            self.actions_done += 1
+            if row[2] == 'failed':
+                self.failed += 1
+                return
+            if row[5] == 'uploaded':
+                self.uploaded += 1
+                self.uploaded_bytes += row[7]
+            else:
+                self.skipped += 1
+            if len(row) > 8 and row[10] != 'already exists':  # build+upload row with ensure_pdf tuple
+                host = urlparse(row[9]).netloc
+                self.ensure_ms[host][0] += 1
+                self.ensure_ms[host][1] += row[11]
+
+    def progress_line(self) -> str:
+        with self.lock:
+            sec = max(perf_counter() - self.start, 0.001)
+            hosts = ' '.join(f"{host}:{total // count}ms/{count}"
+                             for host, (count, total) in sorted(self.ensure_ms.items()))
+            return (f"progress: {self.actions_done}/{self.actions_total} actions done "
+                    f"uploaded {self.uploaded} ({self.uploaded / sec:.1f}/s) "
+                    f"{self.uploaded_bytes / 1e6:.1f} MB ({self.uploaded_bytes / 1e6 / sec:.2f} MB/s) "
+                    f"skipped {self.skipped} failed {self.failed} "
+                    f"ensure_pdf avg {hosts or 'none'}")
+
+    def prometheus_text(self) -> str:
+        with self.lock:
+            lines = [
+                "# TYPE arxiv_sync_actions_left gauge",
+                f"arxiv_sync_actions_left {self.actions_total - self.actions_done}",
+                "# TYPE arxiv_sync_uploads_total counter",
+                f"arxiv_sync_uploads_total {self.uploaded}",
+                "# TYPE arxiv_sync_upload_bytes_total counter",
+                f"arxiv_sync_upload_bytes_total {self.uploaded_bytes}",
+                "# TYPE arxiv_sync_skipped_total counter",
+                f"arxiv_sync_skipped_total {self.skipped}",
+                "# TYPE arxiv_sync_failures_total counter",
+                f"arxiv_sync_failures_total {self.failed}",
+                "# TYPE arxiv_sync_ensure_pdf_seconds summary",
+            ]
+            for host, (count, total) in sorted(self.ensure_ms.items()):
+                lines.append(f'arxiv_sync_ensure_pdf_seconds_sum{{host="{host}"}} {total / 1000}')
+                lines.append(f'arxiv_sync_ensure_pdf_seconds_count{{host="{host}"}} {count}')
+            return "\n".join(lines) + "\n"
+
+
+METRICS = SyncMetrics()
+
+
+def report_progress(interval: int, print_line: bool, textfile: Optional[Path]) -> None:
+    """Target for a thread that reports `METRICS` every `interval` sec.
+
+    If `print_line` is set, the progress line goes to stderr. If
+    `textfile` is set, the Prometheus metrics are written to it."""
+    while RUN:
+        sleep(interval)
+        if print_line:
+            print(METRICS.progress_line(), file=sys.stderr, flush=True)
+        if textfile:
+            write_prometheus_textfile(textfile)
+
+
+def write_prometheus_textfile(textfile: Path) -> None:
+    """Writes `METRICS` to `textfile`, replaces it so it is never partly written."""
+    tmp = textfile.with_name(textfile.name + '.tmp')
+    tmp.write_text(METRICS.prometheus_text())
+    tmp.replace(textfile)
+
+
+def add_summary(row: tuple) -> None:
+    """Adds a row to the summary, the journal and the metrics"""
+    summary_q.put(row)
+    METRICS.add(row)
+    if JOURNAL:
+        JOURNAL.record_summary(row)
+
+
 def upload(gs_client, localpath, key):
-    """Upload a file to GS_BUCKET"""
+    """Upload a file to GS_BUCKET
+
+    The file is not uploaded if there is already an object at `key`
+    with the same size and crc32c. The local crc32c is only computed
+    when the sizes match. Uploads are checked against the crc32c
+    computed by GS."""
 
     def mime_from_fname(filepath):
         if filepath.suffix == '.pdf':
@@ -300,51 +544,275 @@ def upload(gs_client, localpath, key):
 
     start = perf_counter()
 
+    size = localpath.stat().st_size
+    if JOURNAL and JOURNAL.is_uploaded(key, localpath, size):
+        logger.debug(f"upload: Not uploading {localpath}, gs://{GS_BUCKET}/{key} already in journal")
+        return ("upload", localpath, key, "already_in_journal", ms_since(start), 0)
+
     bucket = gs_client.bucket(GS_BUCKET)
     blob = bucket.get_blob(key)
-    if blob is None or blob.size != localpath.stat().st_size:
-        with open(localpath, 'rb') as fh:
-            bucket.blob(key).upload_from_file(fh, content_type=mime_from_fname(localpath))
-            logger.debug(f"upload: completed upload of {localpath} to gs://{GS_BUCKET}/{key} of size {localpath.stat().st_size}")
-        return ("upload", localpath, key, "uploaded", ms_since(start), localpath.stat().st_size)
+    if blob is not None and blob.size == size:
+        crc32c = file_crc32c(localpath)
+        if blob.crc32c == crc32c:
+            logger.debug(f"upload: Not uploading {localpath}, gs://{GS_BUCKET}/{key} already on gs")
+            if JOURNAL:
+                JOURNAL.record_upload(key, size, crc32c)
+            return ("upload", localpath, key, "already_on_gs", ms_since(start), 0)
+        logger.info(f"upload: {localpath} has same size but different crc32c than gs://{GS_BUCKET}/{key}")
+        # Sent with the upload so GS rejects it if the data does not match
+        blob = bucket.blob(key)
+        blob.crc32c = crc32c
+        checksum = None
     else:
-        logger.debug(f"upload: Not uploading {localpath}, gs://{GS_BUCKET}/{key} already on gs")
-        return ("upload", localpath, key, "already_on_gs", ms_since(start), 0)
+        # crc32c is computed as the file is read for the upload and checked against GS
+        blob = bucket.blob(key)
+        checksum = 'crc32c'
+
+    with open(localpath, 'rb') as fh:
+        blob.upload_from_file(fh, content_type=mime_from_fname(localpath), checksum=checksum)
+        logger.debug(f"upload: completed upload of {localpath} to gs://{GS_BUCKET}/{key} of size {size}")
+    if JOURNAL:
+        JOURNAL.record_upload(key, size, blob.crc32c)
+    return ("upload", localpath, key, "uploaded", ms_since(start), size)
+
+
+def file_crc32c(localpath: Path) -> str:
+    """Gets the CRC32C of a file in the same base64 format as `Blob.crc32c`"""
+    crc = google_crc32c.Checksum()
+    with open(localpath, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b''):
+            crc.update(chunk)
+    return base64.b64encode(crc.digest()).decode('utf-8')
+
+
+class HostLimit:
+    """Adaptive limit of the concurrent PDF builds on a web host.
+
+    The limit starts at `max_limit`. It is halved after an error or
+    when the moving average of the build latency goes over
+    `ENSURE_SLOW_MS`. Each build that is fast and without error raises
+    it by one, up to `max_limit`.
+    """
+
+    def __init__(self, host: str, max_limit: int):
+        self.host = host
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self.active = 0
+        self.avg_ms = 0.0
+        self.cond = threading.Condition()
+
+    def acquire(self) -> bool:
+        """Waits for a build slot on the host. Returns False if the sync is stopping."""
+        with self.cond:
+            while RUN and self.active >= self.limit:
+                self.cond.wait(timeout=0.5)
+            if not RUN:
+                return False
+            self.active += 1
+            return True
+
+    def release(self, ms: Optional[int] = None, ok: bool = True) -> None:
+        """Releases a build slot. `ms` is None if the slot was not used for a build."""
+        with self.cond:
+            self.active -= 1
+            if ms is not None:
+                self.avg_ms = ms if not self.avg_ms else 0.8 * self.avg_ms + 0.2 * ms
+                if not ok or self.avg_ms > ENSURE_SLOW_MS:
+                    self.limit = max(1, self.limit // 2)
+                elif self.limit < self.max_limit:
+                    self.limit += 1
+            self.cond.notify_all()
+
+    def __str__(self):
+        return f"{self.host} limit {self.limit}/{self.max_limit} avg build {self.avg_ms:.0f} ms"
+
+
+def split_todos(todos: List[dict]) -> Tuple[List[dict], List[dict]]:
+    """Splits jobs from `make_todos` into upload only jobs and build+upload jobs.
+
+    A job with both kinds of actions ends up as two jobs with the same
+    `paper_id`."""
+    uploads, builds = [], []
+    for job in todos:
+        upload_acts = [act for act in job['actions'] if act[0] != 'build+upload']
+        build_acts = [act for act in job['actions'] if act[0] == 'build+upload']
+        if upload_acts:
+            uploads.append({**job, 'actions': upload_acts})
+        if build_acts:
+            builds.append({**job, 'actions': build_acts})
+    return uploads, builds
+
+
+def do_job(job, session, gs_client, host) -> bool:
+    """Does the actions of a job and adds the results to the summary.
+
+    Returns False if any action failed."""
+    start = perf_counter()
+    ok = True
+    logger.debug("doing %s", job['paper_id'])
+    for action, item in job['actions']:
+        try:
+            res = ()
+            if action == 'build+upload':
+                res = upload_pdf(gs_client, ensure_pdf(session, host, cached_identifier(item)))
+            if action == 'upload':
+                res = upload(gs_client, Path(item), path_to_bucket_key(item))
+
+            add_summary((job['paper_id'], ms_since(start)) + res)
+        except Exception as ex:
+            ok = False
+            logger.exception(f"Problem during {job['paper_id']} {action} {item}")
+            add_summary((job['paper_id'], ms_since(start), "failed", str(ex)))
+    return ok
+
+
+def next_job(queue):
+    """Gets the next job from `queue`.
+
+    Returns None if there is no job right now and the `queue` may
+    still get more jobs. Raises `Empty` when the `queue` is done."""
+    try:
+        job = queue.get(timeout=0.5)
+    except Empty:
+        if DONE:
+            raise
+        return None
+    if not job or not job.get('paper_id', None):
+        logger.error(f"queue.get() returned a job lacking paper_id, skipping: {job}")
+        queue.task_done()
+        return None
+    return job
+
+
+def upload_to_gcp(upload_q):
+    """Target for threads that get upload only jobs off of the `upload_q`."""
+    tl_data=threading.local()
+    tl_data.session,tl_data.gs_client = requests.Session(), storage.Client()
+
+    while RUN:
+        try:
+            job = next_job(upload_q)
+        except Empty:  # queue is empty and thread is done
+            break
+        if job:
+            do_job(job, tl_data.session, tl_data.gs_client, None)
+            upload_q.task_done()
 
 
+def build_and_upload_to_gcp(build_q, host_limit: HostLimit):
+    """Target for threads that get build+upload jobs off of the `build_q`.
 
-def sync_to_gcp(todo_q, host):
-    """Target for theads that gets jobs off of the todo queue and does job actions."""
+    Each thread uses the web host of `host_limit` to build PDFs. The
+    thread only takes a job when the host has a free build slot, so
+    jobs go to the threads of the hosts that are keeping up."""
     tl_data=threading.local()
     tl_data.session,tl_data.gs_client = requests.Session(), storage.Client()
 
     while RUN:
-        start = perf_counter()
+        if not host_limit.acquire():
+            break
         try:
-            job = todo_q.get(block=False)
-            if not job:
-                logger.error("todo_q.get() returned {job}")
-                continue
-            if not job.get('paper_id',None):
-                logger.error("todo_q.get() job lacked paper_id, skipping")
-                continue
+            job = next_job(build_q)
         except Empty:  # queue is empty and thread is done
+            host_limit.release()
             break
+        if not job:
+            host_limit.release()
+            continue
+        start = perf_counter()
+        ok = do_job(job, tl_data.session, tl_data.gs_client, host_limit.host)
+        host_limit.release(ms_since(start), ok)
+        build_q.task_done()
+
+
+# #################### asyncio engine #################### #
 
-        logger.debug("doing %s", job['paper_id'])
-        for action, item in job['actions']:
-            try:
-                res = ()
-                if action == 'build+upload':
-                    res = upload_pdf(tl_data.gs_client, ensure_pdf(tl_data.session, host, Identifier(item)))
-                if action == 'upload':
-                    res = upload(tl_data.gs_client, Path(item), path_to_bucket_key(item))
+ASYNC_UPLOADS = 32
+"""Concurrent uploads for the asyncio engine"""
 
-                summary_q.put((job['paper_id'], ms_since(start)) + res)
-            except Exception as ex:
-                logger.exception(f"Problem during {job['paper_id']} {action} {item}")
-                summary_q.put((job['paper_id'], ms_since(start), "failed", str(ex)))
-        todo_q.task_done()
+_tl_data = threading.local()
+
+def thread_gs_client():
+    """Gets a `storage.Client` for the current thread."""
+    if not hasattr(_tl_data, 'gs_client'):
+        _tl_data.gs_client = storage.Client()
+    return _tl_data.gs_client
+
+
+async def ensure_pdf_async(http, host, arxiv_id):
+    """Same as `ensure_pdf` but uses an aiohttp `ClientSession` and
+    does not take up a thread while waiting for the PDF to be built."""
+    pdf_file, url = pdf_cache_path(arxiv_id), arxiv_pdf_url(host, arxiv_id)
+    start = perf_counter()
+    if pdf_file.exists():
+        logger.debug(f"ensure_pdf_async: {str(pdf_file)} already exists")
+        return (pdf_file, url, "already exists", ms_since(start))
+
+    headers = { 'User-Agent': ENSURE_UA }
+    logger.debug("Getting %s", url)
+    async with http.get(url, headers=headers, ssl=None if ENSURE_CERT_VERIFY else False) as resp:
+        await resp.read()  # Consume resp in hopes of keeping alive connection
+        if resp.status != 200:
+            raise(Exception(f"ensure_pdf_async: GET status {resp.status} {url}"))
+    start_wait = perf_counter()
+    while RUN and not pdf_file.exists():
+        if perf_counter() - start_wait > PDF_WAIT_SEC:
+            raise(Exception(f"No PDF, waited longer than {PDF_WAIT_SEC} sec {url}"))
+        await asyncio.sleep(0.2)
+    if not pdf_file.exists():
+        raise(Exception(f"ensure_pdf_async: Could not create {pdf_file}. {url} {ms_since(start)} ms"))
+    logger.debug(f"ensure_pdf_async: {str(pdf_file)} requested {url} {ms_since(start)} ms")
+    return (pdf_file, url, None, ms_since(start))
+
+
+async def do_job_async(job, http, hosts, executor):
+    """Same as `do_job` for the asyncio engine.
+
+    `hosts` is an `asyncio.Queue` with a token for each build slot of
+    each of the `ENSURE_HOSTS`. Uploads are done with the
+    google-cloud-storage client in `executor`."""
+    loop = asyncio.get_event_loop()
+    start = perf_counter()
+    logger.debug("doing %s", job['paper_id'])
+    for action, item in job['actions']:
+        if not RUN:
+            break
+        try:
+            res = ()
+            if action == 'build+upload':
+                host = await hosts.get()
+                try:
+                    ensured = await ensure_pdf_async(http, host, cached_identifier(item))
+                finally:
+                    hosts.put_nowait(host)
+                res = await loop.run_in_executor(
+                    executor, lambda: upload_pdf(thread_gs_client(), ensured))
+            if action == 'upload':
+                res = await loop.run_in_executor(
+                    executor, lambda: upload(thread_gs_client(), Path(item), path_to_bucket_key(item)))
+
+            add_summary((job['paper_id'], ms_since(start)) + res)
+        except Exception as ex:
+            logger.exception(f"Problem during {job['paper_id']} {action} {item}")
+            add_summary((job['paper_id'], ms_since(start), "failed", str(ex)))
+
+
+async def sync_async(todos: List[dict]):
+    """Does all the jobs from `make_todos` with asyncio.
+
+    Each job is a coroutine so the number of jobs in flight is not
+    limited by the number of threads. Builds are limited per host by
+    the `hosts` queue of tokens and uploads are limited by the size of
+    the upload executor."""
+    import aiohttp
+    hosts: asyncio.Queue = asyncio.Queue()
+    for i in range(max(n_th for _, n_th in ENSURE_HOSTS)):
+        [hosts.put_nowait(host) for host, n_th in ENSURE_HOSTS if i < n_th]
+
+    with ThreadPoolExecutor(max_workers=ASYNC_UPLOADS, thread_name_prefix='upload') as executor:
+        async with aiohttp.ClientSession() as http:
+            await asyncio.gather(*[do_job_async(job, http, hosts, executor) for job in todos])
 
 
 # #################### MAIN #################### #
@@ -352,6 +820,18 @@ if __name__ == "__main__":
     ad = argparse.ArgumentParser(epilog=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
     ad.add_argument('-v', help='verbse', action='store_true')
     ad.add_argument('-d', help="Dry run no action", action='store_true')
+    ad.add_argument('--async', dest='use_async', action='store_true',
+                    help="Use the asyncio engine instead of threads, needs aiohttp")
+    ad.add_argument('--progress', type=int, default=0, metavar='SEC',
+                    help="Print a progress line to stderr every SEC seconds")
+    ad.add_argument('--prom-textfile', type=Path,
+                    help="Write Prometheus metrics of the sync to this file during the sync")
+    ad.add_argument('--journal', type=Path,
+                    help="JSON lines journal of the sync, a rerun with the same journal skips files already uploaded")
+    ad.add_argument('--warm-list', type=Path,
+                    help="Write the ids published to this file, one per line")
+    ad.add_argument('--warm-url',
+                    help="POST the ids published to this dissemination /pdf/warm URL after the sync, token from WARM_TOKEN")
     ad.add_argument('filename')
     args = ad.parse_args()
 
@@ -362,37 +842,65 @@ if __name__ == "__main__":
 
     logger.info(f"Starting at {datetime.now().isoformat()}")
 
-    [todo_q.put(item) for item in make_todos(args.filename)]
+    todos = make_todos(args.filename)
 
     if args.d:
-        todo =  list(todo_q.queue)
-        print(json.dumps(todo, indent=2))
-        print(f"{len(todo)} submissions (some may be test submissions)")
+        print(json.dumps(todos, indent=2))
+        print(f"{len(todos)} submissions (some may be test submissions)")
         logger.info("Dry run no changes made")
         sys.exit(1)
 
-    logger.debug("made todo_q, getting size")
-    overall_size = todo_q.qsize()
-    logger.debug('Made %d todos', overall_size)
+    if args.journal:
+        JOURNAL = Journal(args.journal)
+        logger.info(f"Using journal {args.journal} with {len(JOURNAL.uploaded)} uploads already done")
 
-    threads = []
-    for host, n_th in ENSURE_HOSTS:
-        ths = [Thread(target=sync_to_gcp, args=(todo_q, host)) for _ in range(0, n_th)]
-        threads.extend(ths)
-        [t.start() for t in ths]
+    overall_size = len(todos)
+    METRICS.actions_total = sum(len(job['actions']) for job in todos)
+    if args.progress or args.prom_textfile:
+        Thread(target=report_progress, daemon=True,
+               args=(args.progress or 15, bool(args.progress), args.prom_textfile)).start()
 
-    logger.debug("started %d threads", len(threads))
-
-    while RUN and not todo_q.empty():
-        sleep(0.2)
-
-    logger.debug("todo_q is now empty")
-
-    DONE=True
-    RUN=False
-    logger.debug("wating to join threads")
-    [th.join() for th in threads]
-    logger.debug("Threads done joining")
+    if args.use_async:
+        DONE = True
+        asyncio.run(sync_async(todos))
+    else:
+        uploads, builds = split_todos(todos)
+        [upload_q.put(item) for item in uploads]
+        [build_q.put(item) for item in builds]
+        DONE = True
+        logger.debug('Made %d todos, %d upload jobs and %d build jobs', overall_size, len(uploads), len(builds))
+
+        threads = [Thread(target=upload_to_gcp, args=(upload_q,)) for _ in range(0, UPLOAD_THREADS)]
+        host_limits = [HostLimit(host, n_th) for host, n_th in ENSURE_HOSTS]
+        for host_limit in host_limits:
+            threads.extend([Thread(target=build_and_upload_to_gcp, args=(build_q, host_limit))
+                            for _ in range(0, host_limit.max_limit)])
+        [t.start() for t in threads]
+
+        logger.debug("started %d threads", len(threads))
+
+        while RUN and any(th.is_alive() for th in threads):
+            sleep(0.2)
+
+        logger.debug("jobs done or stopped")
+
+        RUN=False
+        logger.debug("wating to join threads")
+        [th.join() for th in threads]
+        logger.debug("Threads done joining")
+        [logger.info(str(host_limit)) for host_limit in host_limits]
+
+    if JOURNAL:
+        JOURNAL.close()
+
+    if args.warm_list or args.warm_url:
+        warm_ids = published_ids(todos)
+        if args.warm_list:
+            args.warm_list.write_text(''.join(f"{id}\n" for id in warm_ids))
+        if args.warm_url:
+            warm_service(args.warm_url, os.environ.get('WARM_TOKEN', ''), warm_ids)
+    if args.prom_textfile:
+        write_prometheus_textfile(args.prom_textfile)
 
     for row in sorted(list(summary_q.queue), key=lambda tup: tup[0]):
         print(','.join(map(str, row)))
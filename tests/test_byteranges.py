@@ -0,0 +1,46 @@
+from pathlib import Path
+
+PDF = Path('./tests/data/ps_cache/cs/pdf/0011/0011004v1.pdf').read_bytes()
+
+
+def test_single_range(client):
+    resp = client.get("/pdf/cs/0011004v1.pdf", headers={'Range': 'bytes=0-7'})
+    assert resp.status_code == 206
+    assert resp.data == PDF[0:8]
+    assert resp.headers['Content-Range'] == f"bytes 0-7/{len(PDF)}"
+    assert resp.headers['Content-Type'] == 'application/pdf'
+
+
+def test_multiple_ranges(client):
+    resp = client.get("/pdf/cs/0011004v1.pdf", headers={'Range': 'bytes=0-7,20-24,-4'})
+    assert resp.status_code == 206
+    assert resp.mimetype == 'multipart/byteranges'
+    assert int(resp.headers['Content-Length']) == len(resp.data)
+    boundary = resp.mimetype_params['boundary'].encode()
+    parts = resp.data.split(b"--" + boundary)
+    assert parts[0] == b''
+    assert parts[-1] == b"--\r\n"
+    bodies = []
+    for part in parts[1:-1]:
+        head, body = part.split(b"\r\n\r\n", 1)
+        assert b"Content-Type: application/pdf" in head
+        bodies.append(body.removesuffix(b"\r\n"))
+    assert bodies == [PDF[0:8], PDF[20:25], PDF[-4:]]
+    assert f"Content-Range: bytes 20-24/{len(PDF)}".encode() in resp.data
+
+
+def test_overlapping_ranges_merged(client):
+    resp = client.get("/pdf/cs/0011004v1.pdf", headers={'Range': 'bytes=0-7,4-9'})
+    assert resp.status_code == 206
+    assert resp.data == PDF[0:10]
+
+
+def test_if_range_mismatch_is_whole(client):
+    resp = client.get("/pdf/cs/0011004v1.pdf", headers={'Range': 'bytes=0-7,20-24', 'If-Range': 'other'})
+    assert resp.status_code == 200
+    assert resp.data == PDF
+
+
+def test_unsatisfiable(client):
+    resp = client.get("/pdf/cs/0011004v1.pdf", headers={'Range': f'bytes={len(PDF) + 10}-'})
+    assert resp.status_code == 416
@@ -0,0 +1,65 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from arxiv_dissemination.cache_policy import YEAR, CachePolicy, policies_from_json
+
+
+def test_versioned_pdf_headers(client):
+    resp = client.get("/pdf/cs/0011004v1.pdf")
+    assert resp.status_code == 200
+    cc = resp.headers['Cache-Control']
+    assert 'immutable' in cc
+    assert 's-maxage=' in cc
+    assert 'stale-if-error=' in cc
+
+
+def test_current_pdf_headers(client):
+    resp = client.get("/pdf/cs/0011004.pdf")
+    assert resp.status_code == 200
+    assert resp.headers['Expires'].endswith(' GMT')
+    assert 'immutable' not in resp.headers['Cache-Control']
+
+
+def test_not_found_headers(client):
+    resp = client.get("/pdf/2201.99999v1.pdf")
+    assert resp.status_code == 404
+    assert 'Expires' in resp.headers
+    assert 'max-age=' in resp.headers['Cache-Control']
+
+
+def test_until_next_publish():
+    # Monday 10:00, next publish at 20:00
+    headers = CachePolicy(until_next_publish=True, max_age=3600).headers(
+        now=datetime(2023, 1, 2, 10, 0, tzinfo=ZoneInfo('America/New_York')))
+    assert headers['Cache-Control'] == 'public, max-age=3600, s-maxage=36000'
+    assert headers['Expires'] == 'Tue, 03 Jan 2023 01:00:00 GMT'
+
+
+def test_no_store():
+    assert CachePolicy(max_age=10, no_store=True).headers() == {'Cache-Control': 'no-store'}
+
+
+def test_policies_from_json():
+    policies = policies_from_json('{"pdf_versioned": {"max_age": 10}}')
+    assert policies['pdf_versioned'].max_age == 10
+    assert policies['pdf_versioned'].immutable
+    with pytest.raises(ValueError):
+        policies_from_json('{"bogus": {}}')
+    with pytest.raises(ValueError):
+        policies_from_json('{"pdf_versioned": {"max_agee": 10}}')
+
+
+def test_withdrawn_headers(app_local_fs, monkeypatch):
+    monkeypatch.setattr(app_local_fs.article_store, 'dissemination_for_id', lambda format, id: "WITHDRAWN")
+    client = app_local_fs.test_client()
+    resp = client.get("/pdf/2201.00001v1.pdf")
+    assert resp.status_code == 200
+    assert f"max-age={YEAR}" in resp.headers['Cache-Control']
+    assert 'Expires' not in resp.headers
+
+    resp = client.get("/pdf/2201.00001.pdf")
+    assert resp.status_code == 200
+    assert 'Expires' in resp.headers
+    assert f"max-age={YEAR}" not in resp.headers['Cache-Control']
@@ -0,0 +1,64 @@
+import gzip
+
+import pytest
+
+from arxiv_dissemination.compression import EncodedCache, compress
+from arxiv_dissemination.services.object_store_fake_gs import FakeGsObjectStore
+from arxiv_dissemination.services.object_store_local import LocalObjectStore
+
+
+def test_gzip_abs(app_local_fs):
+    client = app_local_fs.test_client()
+    plain = client.get("/abs/cs/0011004v2")
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+
+    resp = client.get("/abs/cs/0011004v2", headers={'Accept-Encoding': 'gzip, deflate'})
+    assert resp.status_code == 200
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in resp.headers['Vary']
+    assert resp.headers['ETag'] != plain.headers['ETag']
+    assert gzip.decompress(resp.data) == plain.data
+
+    again = client.get("/abs/cs/0011004v2", headers={'Accept-Encoding': 'gzip'})
+    assert again.data == resp.data
+    assert app_local_fs.encoded_cache.hits == 1
+
+
+def test_not_compressed(client):
+    resp = client.get("/abs/cs/0011004v2", headers={'Accept-Encoding': 'gzip', 'Range': 'bytes=0-9'})
+    assert resp.status_code == 206
+    assert 'Content-Encoding' not in resp.headers
+
+    resp = client.get("/abs/cs/0011004v2", headers={'Accept-Encoding': 'gzip;q=0'})
+    assert 'Content-Encoding' not in resp.headers
+
+    resp = client.get("/pdf/cs/0011004v1.pdf", headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in resp.headers
+
+
+def test_encoded_cache_compresses_once(storage_prefix):
+    store = FakeGsObjectStore(storage_prefix)
+    cache = EncodedCache(1024 * 1024)
+    obj = store.to_obj('ftp/cs/papers/0011/0011004.abs')
+    for _ in range(3):
+        assert gzip.decompress(cache.get(obj, 'gzip')) == obj.download_as_bytes()
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_brotli():
+    brotli = pytest.importorskip('brotli')
+    assert brotli.decompress(compress(b'abc' * 100, 'br')) == b'abc' * 100
+
+
+def test_encoded_cache_key(tmp_path):
+    for archive in ['cs', 'math']:
+        (tmp_path / archive).mkdir()
+        (tmp_path / archive / '0011004.abs').write_text(f"{archive} " * 100)
+    store = LocalObjectStore(f"{tmp_path}/")
+    cache = EncodedCache(1024 * 1024)
+    assert gzip.decompress(cache.get(store.to_obj('cs/0011004.abs'), 'gzip')).startswith(b'cs ')
+    assert gzip.decompress(cache.get(store.to_obj('math/0011004.abs'), 'gzip')).startswith(b'math ')
+
+    (tmp_path / 'cs/0011004.abs').write_text("cs v2 " * 100)
+    assert gzip.decompress(cache.get(store.to_obj('cs/0011004.abs'), 'gzip')).startswith(b'cs v2 ')
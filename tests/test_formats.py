@@ -0,0 +1,60 @@
+import gzip
+
+
+def test_abs(client):
+    resp = client.get("/abs/cs/0011004v1")
+    assert resp.status_code == 200
+    assert resp.headers['Content-Type'].startswith('text/plain')
+    assert "revised v2" not in resp.text
+
+    resp = client.get("/abs/cs/0011004v2")
+    assert resp.status_code == 200
+    assert "revised v2" in resp.text
+    assert client.get("/abs/cs/0011004").text == resp.text
+
+    assert client.get("/abs/cs/0011004v3").status_code == 404
+    assert client.get("/abs/2201.99999v1").status_code == 404
+
+
+def test_source(client):
+    resp = client.get("/e-print/cs/0011004v2")
+    assert resp.status_code == 200
+    assert resp.headers['Content-Type'] == 'application/gzip'
+    assert resp.headers['Content-Disposition'] == 'attachment; filename="0011004v2.gz"'
+    assert b"0011004.gz" in resp.data
+
+    resp = client.get("/e-print/cs/0011004v1")
+    assert resp.status_code == 200
+    assert b"0011004v1.gz" in resp.data
+
+    resp = client.get("/e-print/cs/0212040")
+    assert resp.status_code == 200
+    assert resp.headers['Content-Type'] == 'application/pdf'
+
+    assert client.get("/e-print/cs/0011004v3").status_code == 404
+
+
+def test_source_ranges(client):
+    whole = client.get("/e-print/cs/0011004v2").data
+    resp = client.get("/e-print/cs/0011004v2", headers={'Range': 'bytes=0-3'})
+    assert resp.status_code == 206
+    assert resp.data == whole[0:4]
+
+
+def test_ps(client):
+    resp = client.get("/ps/cs/0011004v2")
+    assert resp.status_code == 200
+    assert resp.headers['Content-Disposition'] == 'attachment; filename="0011004v2.ps.gz"'
+    assert gzip.decompress(resp.data).startswith(b"%!PS")
+    assert client.get("/ps/cs/0011004").data == resp.data
+
+    assert client.get("/ps/cs/0011004v1").status_code == 500  # has source but ps is not built
+    assert client.get("/ps/2201.99999v1").status_code == 404
+
+
+def test_resolve_format(app_local_fs):
+    app_local_fs.config['warm_token'] = 'secret'
+    client, auth = app_local_fs.test_client(), {'Authorization': 'Bearer secret'}
+    resp = client.post("/pdf/resolve", json={"format": "e-print", "ids": ["cs/0011004v1"]}, headers=auth)
+    assert resp.json['results']["cs/0011004v1"]["key"] == "orig/cs/papers/0011/0011004v1.gz"
+    assert client.post("/pdf/resolve", json={"format": "dvi", "ids": []}, headers=auth).status_code == 400
@@ -0,0 +1,42 @@
+from arxiv_dissemination.services.head_tail_cache import HeadTailCache
+from arxiv_dissemination.services.object_store_fake_gs import FakeGsObjectStore
+from arxiv_dissemination.services.object_store_local import LocalObjectStore
+
+
+def test_head_tail_cache(storage_prefix):
+    store = FakeGsObjectStore(storage_prefix)
+    obj = store.to_obj('ps_cache/cs/pdf/0011/0011004v1.pdf')
+    data = obj.download_as_bytes()
+    cache = HeadTailCache(max_bytes=1024, span=10, min_size=20)
+
+    assert cache.read(obj, 0, 3) == data[0:4]
+    assert cache.read(obj, 5, 9) == data[5:10]
+    assert cache.read(obj, obj.size - 4, obj.size - 1) == data[-4:]
+    assert cache.read(obj, obj.size - 10, obj.size - 10) == data[-10:-9]
+    assert (cache.hits, cache.misses) == (2, 2)
+    assert store.calls['download'] == 3  # one for data, one each for head and tail
+
+    assert cache.read(obj, 5, 15) is None  # crosses out of the head
+    assert HeadTailCache(1024, span=10, min_size=obj.size + 1).read(obj, 0, 3) is None
+
+
+def test_head_tail_cache_eviction(storage_prefix):
+    store = FakeGsObjectStore(storage_prefix)
+    cache = HeadTailCache(max_bytes=15, span=10, min_size=20)
+    obj = store.to_obj('ps_cache/cs/pdf/0011/0011004v1.pdf')
+    cache.read(obj, 0, 1)
+    cache.read(obj, obj.size - 1, obj.size - 1)
+    assert len(cache) == 1
+
+
+def test_head_tail_cache_key(tmp_path):
+    for archive in ['cs', 'math']:
+        (tmp_path / archive).mkdir()
+        (tmp_path / archive / '0011004v1.pdf').write_bytes(archive.encode() * 20)
+    store = LocalObjectStore(f"{tmp_path}/")
+    cache = HeadTailCache(max_bytes=1024, span=10, min_size=20)
+    assert cache.read(store.to_obj('cs/0011004v1.pdf'), 0, 1) == b'cs'
+    assert cache.read(store.to_obj('math/0011004v1.pdf'), 0, 1) == b'ma'
+
+    (tmp_path / 'cs/0011004v1.pdf').write_bytes(b'CS' * 21)
+    assert cache.read(store.to_obj('cs/0011004v1.pdf'), 0, 1) == b'CS'
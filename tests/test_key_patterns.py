@@ -0,0 +1,40 @@
+from arxiv.identifier import Identifier
+
+from arxiv_dissemination.services import key_patterns
+from arxiv_dissemination.services.key_patterns import paper_keys
+
+
+def test_paper_keys_new_id():
+    keys = paper_keys(Identifier('2201.00001v2'))
+    assert keys.abs_current == 'ftp/arxiv/papers/2201/2201.00001.abs'
+    assert keys.current_pdf == 'ftp/arxiv/papers/2201/2201.00001.pdf'
+    assert keys.previous_pdf == 'orig/arxiv/papers/2201/2201.00001v2.pdf'
+    assert keys.abs_orig() == 'orig/arxiv/papers/2201/2201.00001v2.abs'
+    assert keys.abs_orig(1) == 'orig/arxiv/papers/2201/2201.00001v1.abs'
+    assert keys.ps_cache_pdf() == 'ps_cache/arxiv/pdf/2201/2201.00001v2.pdf'
+    assert keys.ps_cache_pdf('pdf', 3) == 'ps_cache/arxiv/pdf/2201/2201.00001v3.pdf'
+    assert keys.orig_listing_prefix == 'orig/arxiv/papers/2201/2201.00001'
+    assert keys.current_listing_prefix == 'ftp/arxiv/papers/2201/2201.00001'
+    assert keys.ps_cache_ps() == 'ps_cache/arxiv/ps/2201/2201.00001v2.ps.gz'
+    assert keys.source_stem(2, current=True) == 'ftp/arxiv/papers/2201/2201.00001'
+    assert keys.source_stem(1, current=False) == 'orig/arxiv/papers/2201/2201.00001v1'
+
+
+def test_paper_keys_old_id():
+    keys = paper_keys(Identifier('cond-mat/9805021v1'))
+    assert keys.abs_current == 'ftp/cond-mat/papers/9805/9805021.abs'
+    assert keys.ps_cache_pdf() == 'ps_cache/cond-mat/pdf/9805/9805021v1.pdf'
+    assert keys.orig_parent == 'orig/cond-mat/papers/9805'
+
+
+def test_paper_keys_memoized():
+    assert paper_keys(Identifier('2201.00001v2')) is paper_keys(Identifier('2201.00001v2'))
+    assert paper_keys(Identifier('2201.00001v2')).current_parent \
+        is paper_keys(Identifier('2201.00002')).current_parent
+
+
+def test_functions_match_paper_keys():
+    arxiv_id = Identifier('2201.00001v2')
+    assert key_patterns.abs_path_current(arxiv_id) == paper_keys(arxiv_id).abs_current
+    assert key_patterns.abs_path_orig(arxiv_id, version=1) == 'orig/arxiv/papers/2201/2201.00001v1.abs'
+    assert key_patterns.ps_cache_pdf_path('pdf', arxiv_id) == 'ps_cache/arxiv/pdf/2201/2201.00001v2.pdf'
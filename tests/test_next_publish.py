@@ -0,0 +1,51 @@
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from arxiv_dissemination.services.announcement_calendar import AnnouncementCalendar
+from arxiv_dissemination.services.next_published import next_publish
+
+ET = ZoneInfo('America/New_York')
+
+
+def test_weekdays():
+    cal = AnnouncementCalendar()
+    # Monday morning
+    assert cal.next_publish(datetime(2023, 1, 2, 10, 0, tzinfo=ET)) == datetime(2023, 1, 2, 20, 0, tzinfo=ET)
+    # Thursday night
+    assert cal.next_publish(datetime(2023, 1, 5, 22, 0, tzinfo=ET)) == datetime(2023, 1, 8, 20, 0, tzinfo=ET)
+    # Friday and Saturday
+    assert cal.next_publish(datetime(2023, 1, 6, 12, 0, tzinfo=ET)) == datetime(2023, 1, 8, 20, 0, tzinfo=ET)
+    assert cal.next_publish(datetime(2023, 1, 7, 23, 0, tzinfo=ET)) == datetime(2023, 1, 8, 20, 0, tzinfo=ET)
+
+
+def test_settling():
+    cal = AnnouncementCalendar()
+    now = datetime(2023, 1, 2, 20, 57, tzinfo=ET)
+    assert cal.next_publish(now) == datetime(2023, 1, 2, 21, 0, tzinfo=ET)
+    now = datetime(2023, 1, 2, 20, 10, tzinfo=ET)
+    assert cal.next_publish(now) == now + timedelta(minutes=5)
+    assert cal.next_publish(datetime(2023, 1, 2, 21, 0, tzinfo=ET)) == datetime(2023, 1, 3, 20, 0, tzinfo=ET)
+
+
+def test_holidays():
+    cal = AnnouncementCalendar(holidays=[date(2023, 12, 25), date(2023, 12, 26)])
+    assert cal.next_publish(datetime(2023, 12, 25, 10, 0, tzinfo=ET)) == datetime(2023, 12, 27, 20, 0, tzinfo=ET)
+
+
+def test_timezones():
+    cal = AnnouncementCalendar()
+    utc = datetime(2023, 7, 4, 1, 30, tzinfo=ZoneInfo('UTC'))  # 21:30 EDT on the 3rd
+    assert cal.next_publish(utc) == datetime(2023, 7, 4, 20, 0, tzinfo=ET)
+    # naive is taken as US/Eastern
+    assert cal.next_publish(datetime(2023, 1, 2, 10, 0)) == datetime(2023, 1, 2, 20, 0, tzinfo=ET)
+
+
+def test_from_file(tmp_path):
+    sched = tmp_path / 'sched.json'
+    sched.write_text('{"weekdays": ["Mon"], "time": "14:00", "holidays": ["2023-01-09"]}')
+    cal = AnnouncementCalendar.from_file(sched)
+    assert cal.next_publish(datetime(2023, 1, 3, tzinfo=ET)) == datetime(2023, 1, 16, 14, 0, tzinfo=ET)
+
+
+def test_next_publish_default():
+    assert next_publish() > datetime.now(ET)
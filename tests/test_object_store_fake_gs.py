@@ -0,0 +1,41 @@
+import random
+
+import pytest
+from google.api_core.exceptions import ServiceUnavailable, TooManyRequests
+
+from arxiv_dissemination.services.object_store import FileDoesNotExist
+from arxiv_dissemination.services.object_store_fake_gs import FakeGsObjectStore, Latency
+
+
+def test_fake_gs(storage_prefix):
+    store = FakeGsObjectStore(storage_prefix)
+    obj = store.to_obj('ps_cache/cs/pdf/0011/0011004v1.pdf')
+    assert obj.name == 'ps_cache/cs/pdf/0011/0011004v1.pdf'
+    assert obj.exists()
+    assert obj.size > 0 and obj.etag
+    with obj.open('rb') as fh:
+        assert len(fh.read()) == obj.size
+    assert isinstance(store.to_obj('ps_cache/cs/pdf/0011/0011004v9.pdf'), FileDoesNotExist)
+    assert [item.name for item in store.list('orig/arxiv/papers/2101/2101.04792')] == \
+        [f'orig/arxiv/papers/2101/2101.04792v{v}.pdf' for v in [1, 2, 3]]
+    assert list(store.list('orig/arxiv/papers/2101/2101.99999')) == []
+    assert store.calls == {'get': 3, 'download': 1, 'list': 2}
+
+
+def test_errors(storage_prefix):
+    with pytest.raises(ServiceUnavailable):
+        FakeGsObjectStore(storage_prefix, error_rate=1.0).to_obj('ftp/cs/papers/0011/0011004.abs')
+    store = FakeGsObjectStore(storage_prefix, max_qps=1)
+    with pytest.raises(TooManyRequests):
+        for _ in range(3):
+            store.to_obj('ftp/cs/papers/0011/0011004.abs')
+
+
+def test_latency():
+    rnd = random.Random(1)
+    assert Latency('fixed:20').sample(rnd) == 20
+    assert Latency('').sample(rnd) == 0
+    assert 5 <= Latency('uniform:5:50').sample(rnd) <= 50
+    assert Latency('lognormal:20:0.6').sample(rnd) > 0
+    with pytest.raises(ValueError):
+        Latency('normal:20')
@@ -0,0 +1,56 @@
+from arxiv_dissemination.services.object_store import FileDoesNotExist
+from arxiv_dissemination.services.object_store_local import LocalObjectStore
+from arxiv_dissemination.services.object_store_tiered import TieredObjectStore, DiskCacheObjectStore, CachedFileObj
+
+PDF_KEY = 'ps_cache/cs/pdf/0011/0011004v1.pdf'
+
+
+def test_tiered(tmp_path):
+    mirror = tmp_path / 'mirror'
+    (mirror / 'ps_cache/cs/pdf/0011').mkdir(parents=True)
+    (mirror / PDF_KEY).write_bytes(b'from the mirror')
+    store = TieredObjectStore([LocalObjectStore(f"{mirror}/"), LocalObjectStore('./tests/data/')])
+
+    with store.to_obj(PDF_KEY).open('rb') as fh:
+        assert fh.read() == b'from the mirror'
+    assert store.to_obj('ps_cache/cs/pdf/0011/0011004v2.pdf').exists()
+    assert isinstance(store.to_obj('not/a/key.pdf'), FileDoesNotExist)
+    assert [item.name for item in store.list('ps_cache/cs/pdf/0011/0011004')] == [PDF_KEY]
+    assert len(list(store.list('ps_cache/cs/pdf/0012/0012007'))) == 1
+
+
+def test_disk_cache(tmp_path):
+    store = DiskCacheObjectStore(LocalObjectStore('./tests/data/'), str(tmp_path), 10_000,
+                                 populate_async=False)
+    obj = store.to_obj(PDF_KEY)
+    assert isinstance(obj, CachedFileObj)
+    with obj.open('rb') as fh, open(f"./tests/data/{PDF_KEY}", 'rb') as orig:
+        assert fh.read() == orig.read()
+    assert len(list(tmp_path.iterdir())) == 1
+    assert isinstance(store.to_obj('not/a/key.pdf'), FileDoesNotExist)
+
+
+def test_disk_cache_eviction(tmp_path):
+    size = LocalObjectStore('./tests/data/').to_obj(PDF_KEY).size
+    store = DiskCacheObjectStore(LocalObjectStore('./tests/data/'), str(tmp_path), size + 1,
+                                 max_object_bytes=size + 1, populate_async=False)
+    obj = store.to_obj(PDF_KEY)
+    store.to_obj('ps_cache/cs/pdf/0011/0011004v2.pdf')
+    assert len(list(tmp_path.iterdir())) == 1
+    assert store._cache_name(PDF_KEY, obj.etag) not in store._entries
+
+
+def test_local_identity(tmp_path):
+    (tmp_path / 'cs').mkdir()
+    (tmp_path / 'math').mkdir()
+    (tmp_path / 'cs/0011004.abs').write_text('cs')
+    (tmp_path / 'math/0011004.abs').write_text('math')
+    store = LocalObjectStore(f"{tmp_path}/")
+    cs, math = store.to_obj('cs/0011004.abs'), store.to_obj('math/0011004.abs')
+    assert cs.name == 'cs/0011004.abs'
+    assert [item.name for item in store.list('math/0011')] == ['math/0011004.abs']
+    assert cs.etag != math.etag
+
+    etag = cs.etag
+    (tmp_path / 'cs/0011004.abs').write_text('cs v2')
+    assert cs.etag != etag
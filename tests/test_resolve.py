@@ -0,0 +1,39 @@
+import pytest
+
+AUTH = {'Authorization': 'Bearer secret'}
+
+
+@pytest.fixture
+def client(app_local_fs):
+    app_local_fs.config['warm_token'] = 'secret'
+    return app_local_fs.test_client()
+
+
+def test_resolve(client):
+    resp = client.post("/pdf/resolve", json={"ids": ["cs/0011004v1", "cs/0011004v1", "1208.9999v1",
+                                                     "2201.99999v1", "bogus"]},
+                       headers=AUTH)
+    assert resp.status_code == 200
+    results = resp.json['results']
+    assert set(results) == {"cs/0011004v1", "1208.9999v1", "2201.99999v1", "bogus"}
+    assert results["cs/0011004v1"]["status"] == 200
+    assert results["cs/0011004v1"]["key"] == "ps_cache/cs/pdf/0011/0011004v1.pdf"
+    assert results["cs/0011004v1"]["size"] > 0
+    assert results["1208.9999v1"] == {"status": 500, "condition": "UNAVAIABLE"}
+    assert results["2201.99999v1"]["status"] == 404
+    assert results["bogus"]["condition"] == "BAD_ID"
+
+
+def test_resolve_bad_body(client):
+    assert client.post("/pdf/resolve", data="nope", headers=AUTH).status_code == 400
+    assert client.post("/pdf/resolve", json={"ids": [str(n) for n in range(1001)]},
+                       headers=AUTH).status_code == 400
+
+
+def test_resolve_needs_token(app_local_fs):
+    client = app_local_fs.test_client()
+    assert client.post("/pdf/resolve", json={"ids": ["cs/0011004v1"]}).status_code == 404
+    app_local_fs.config['warm_token'] = 'secret'
+    assert client.post("/pdf/resolve", json={"ids": ["cs/0011004v1"]}).status_code == 401
+    assert client.post("/pdf/resolve", json={"ids": ["cs/0011004v1"]},
+                       headers={'Authorization': 'Bearer wrong'}).status_code == 401
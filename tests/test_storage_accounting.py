@@ -0,0 +1,34 @@
+from arxiv_dissemination.services.object_store_accounting import AccountingObjectStore, start_request
+from arxiv_dissemination.services.object_store_local import LocalObjectStore
+
+
+def test_storage_headers(app_local_fs):
+    app_local_fs.config['storage_debug_headers'] = True
+    client = app_local_fs.test_client()
+    resp = client.get("/pdf/cs/0011004v1.pdf")
+    assert resp.status_code == 200
+    assert int(resp.headers['X-Storage-Calls']) > 0
+    assert float(resp.headers['X-Storage-Ms']) >= 0
+
+
+def test_no_storage_headers_by_default(client):
+    resp = client.get("/pdf/cs/0011004v1.pdf")
+    assert resp.status_code == 200
+    assert 'X-Storage-Calls' not in resp.headers
+
+
+def test_over_budget_warning(app_local_fs, caplog):
+    app_local_fs.config['storage_call_budget'] = 0
+    client = app_local_fs.test_client()
+    resp = client.get("/pdf/cs/0011004v1.pdf")
+    resp.close()
+    assert 'over budget' in caplog.text
+
+
+def test_download_as_bytes_counted(storage_prefix):
+    stats = start_request()
+    store = AccountingObjectStore(LocalObjectStore(storage_prefix))
+    obj = store.to_obj('ps_cache/cs/pdf/0011/0011004v1.pdf')
+    assert obj.download_as_bytes(start=0, end=7) == b'contents'
+    assert obj.download_as_bytes(start=9) == obj.open('rb').read()[9:]
+    assert stats.calls == {'to_obj': 1, 'download': 2, 'open': 1}
@@ -0,0 +1,167 @@
+"""Tests of `sync_prod_to_gcp/sync_all_to_gcp.py` with a fake bucket."""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import pytest
+
+from sync_prod_to_gcp import sync_all_to_gcp as sync
+from sync_prod_to_gcp.sync_all_to_gcp import MirrorJob, Snapshot
+
+
+class FakeBlob:
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self.metadata = None
+        self.size = None
+        self.crc32c = None
+        self.updated = None
+
+    def upload_from_filename(self, localpath, checksum=None):
+        if self.name in self.bucket.fail:
+            raise OSError(f"failed upload of {self.name}")
+        with open(localpath, 'rb') as fh:
+            self.size = len(fh.read())
+        self.crc32c = sync.file_crc32c(localpath)
+        self.updated = datetime.now(timezone.utc)
+        self.bucket.objects[self.name] = self
+        self.bucket.uploads.append(self.name)
+
+    def patch(self):
+        pass
+
+    def delete(self):
+        self.bucket.objects.pop(self.name)
+        self.bucket.deletes.append(self.name)
+
+
+class FakeBucket:
+    """Just enough of a `Bucket` for `MirrorJob`."""
+
+    def __init__(self):
+        self.objects = {}
+        self.fail = set()
+        self.uploads = []
+        self.deletes = []
+        self.client = self
+
+    def blob(self, name):
+        return self.objects.get(name) or FakeBlob(self, name)
+
+    def list_blobs(self, bucket, prefix, delimiter=None):
+        listing = FakeListing(blob for name, blob in sorted(self.objects.items())
+                              if name.startswith(prefix) and not (delimiter and '/' in name[len(prefix):]))
+        if delimiter:
+            listing.prefixes = {prefix + name[len(prefix):].partition('/')[0] + '/'
+                                for name in self.objects if name.startswith(prefix) and '/' in name[len(prefix):]}
+        return listing
+
+
+class FakeListing(list):
+    prefixes = set()
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    bucket = FakeBucket()
+    monkeypatch.setattr(sync, 'thread_bucket', lambda: bucket)
+    return bucket
+
+
+def run(tmp_path, bucket, full=False):
+    bucket.uploads, bucket.deletes = [], []
+    return MirrorJob(str(tmp_path / 'ftp'), 'ftp/', 'ftp',
+                     snapshot=Snapshot(tmp_path / 'ftp.sqlite'), full=full).run()
+
+
+def test_mirror(tmp_path, bucket):
+    (tmp_path / 'ftp/cs/papers/0011').mkdir(parents=True)
+    (tmp_path / 'ftp/cs/papers/0011/0011004.abs').write_text('abs')
+    (tmp_path / 'ftp/README').write_text('readme')
+    bucket.objects['ftp/gone'] = FakeBlob(bucket, 'ftp/gone')
+
+    stats = run(tmp_path, bucket)
+    assert stats.errors == 0
+    assert sorted(bucket.uploads) == ['ftp/README', 'ftp/cs/papers/0011/0011004.abs']
+    assert bucket.deletes == ['ftp/gone']
+
+    stats = run(tmp_path, bucket)
+    assert stats.dirs_unchanged == 4 and bucket.uploads == [] and bucket.deletes == []
+
+    (tmp_path / 'ftp/cs/papers/0011/0011004.abs').unlink()
+    stats = run(tmp_path, bucket)
+    assert bucket.deletes == ['ftp/cs/papers/0011/0011004.abs']
+    assert stats.dirs_unchanged == 3
+
+
+def test_retry_failed_upload(tmp_path, bucket):
+    (tmp_path / 'ftp/cs/papers/0011').mkdir(parents=True)
+    (tmp_path / 'ftp/cs/papers/0011/0011004.abs').write_text('abs')
+    (tmp_path / 'ftp/cs/papers/0011/0011005.abs').write_text('abs')
+    bucket.fail.add('ftp/cs/papers/0011/0011004.abs')
+
+    assert run(tmp_path, bucket).errors == 1
+    assert bucket.uploads == ['ftp/cs/papers/0011/0011005.abs']
+    assert Snapshot(tmp_path / 'ftp.sqlite').dir_mtime('cs/papers/0011') is None
+
+    # nothing changed locally, the parents are unchanged but the failed directory is retried
+    bucket.fail.clear()
+    stats = run(tmp_path, bucket)
+    assert stats.errors == 0
+    assert stats.dirs_unchanged == 3
+    assert bucket.uploads == ['ftp/cs/papers/0011/0011004.abs']
+
+    stats = run(tmp_path, bucket)
+    assert stats.dirs_unchanged == 4 and bucket.uploads == []
+
+
+def test_removed_dir(tmp_path, bucket):
+    (tmp_path / 'ftp/a/b').mkdir(parents=True)
+    (tmp_path / 'ftp/a/b/f').write_text('f')
+    run(tmp_path, bucket)
+    (tmp_path / 'ftp/a/b/f').unlink()
+    (tmp_path / 'ftp/a/b').rmdir()
+
+    assert run(tmp_path, bucket).errors == 0
+    assert bucket.deletes == ['ftp/a/b/f'] and 'ftp/a/b/f' not in bucket.objects
+    snapshot = Snapshot(tmp_path / 'ftp.sqlite')
+    assert snapshot.subdirs('a') == [] and snapshot.files('a/b') == {}
+    assert run(tmp_path, bucket).errors == 0
+
+
+def test_removed_dir_full(tmp_path, bucket):
+    (tmp_path / 'ftp/a').mkdir(parents=True)
+    for name in ['ftp/a/b/f', 'ftp/a/b/c/g', 'ftp/a/b/.htaccess', 'ftp/a/lost+found/h', 'ftp/ab']:
+        bucket.objects[name] = FakeBlob(bucket, name)
+
+    assert run(tmp_path, bucket, full=True).errors == 0
+    assert sorted(bucket.deletes) == ['ftp/a/b/c/g', 'ftp/a/b/f', 'ftp/ab']
+    assert sorted(bucket.objects) == ['ftp/a/b/.htaccess', 'ftp/a/lost+found/h']
+
+
+def test_excluded_not_deleted(tmp_path, bucket):
+    (tmp_path / 'ftp').mkdir()
+    (tmp_path / 'ftp/.htaccess').write_text('deny')
+    for name in ['ftp/.htaccess', 'ftp/.nfs0001', 'ftp/old']:
+        bucket.objects[name] = FakeBlob(bucket, name)
+
+    assert run(tmp_path, bucket, full=True).errors == 0
+    assert bucket.uploads == [] and bucket.deletes == ['ftp/old']
+    assert sorted(bucket.objects) == ['ftp/.htaccess', 'ftp/.nfs0001']
+
+
+def test_interrupted(tmp_path, bucket):
+    (tmp_path / 'ftp/a/b').mkdir(parents=True)
+    (tmp_path / 'ftp/top').write_text('top')
+    (tmp_path / 'ftp/a/b/f').write_text('f')
+
+    # a sync that is killed after it saved the top directory but before it got to a/
+    job = MirrorJob(str(tmp_path / 'ftp'), 'ftp/', 'ftp', snapshot=Snapshot(tmp_path / 'ftp.sqlite'))
+    with ThreadPoolExecutor() as job.upload_pool:
+        assert job.sync_dir('') == ['a']
+    assert bucket.uploads == ['ftp/top']
+    assert Snapshot(tmp_path / 'ftp.sqlite').dir_mtime('') is not None
+
+    stats = run(tmp_path, bucket)
+    assert stats.errors == 0 and stats.dirs_unchanged == 1
+    assert bucket.uploads == ['ftp/a/b/f']
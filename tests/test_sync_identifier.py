@@ -0,0 +1,64 @@
+"""Tests of the `Identifier` of `sync_prod_to_gcp/identifier.py`."""
+import pickle
+
+import pytest
+
+from sync_prod_to_gcp.identifier import Identifier, IdentifierException, cached_identifier, parse_many
+
+
+def test_parse():
+    arxiv_id = Identifier('cs/0011004v1')
+    assert (arxiv_id.id, arxiv_id.idv, arxiv_id.archive, arxiv_id.version) == \
+        ('cs/0011004', 'cs/0011004v1', 'cs', 1)
+    assert arxiv_id.is_old_id and arxiv_id.year == 2000 and arxiv_id.month == 11
+    arxiv_id = Identifier('2201.00001v2')
+    assert (arxiv_id.id, arxiv_id.version, arxiv_id.yymm, arxiv_id.has_version) == \
+        ('2201.00001', 2, '2201', True)
+    assert Identifier('arXiv:2201.00001').idv == '2201.00001'
+    assert Identifier('0704.0001').id == '0704.0001'
+    for bad in ['bogus', '2213.00001', '2201.00000', 'cs/0011004v0', 'cs']:
+        with pytest.raises(IdentifierException):
+            Identifier(bad)
+
+
+def test_ordering():
+    ids = ['2201.00001v2', '2201.00001v1', 'cs/0011004v1', '2112.12345', 'math/9901001', '2201.00001']
+    assert [arxiv_id.ids for arxiv_id in sorted(map(Identifier, ids))] == \
+        ['math/9901001', 'cs/0011004v1', '2112.12345', '2201.00001', '2201.00001v1', '2201.00001v2']
+    assert Identifier('2201.00001v1') < Identifier('2201.00001v2')
+    assert Identifier('2201.00002') > Identifier('2201.00001v9')
+    assert Identifier('2201.00001v1') <= Identifier('2201.00001v1')
+
+
+def test_hashing():
+    assert Identifier('2201.00001v1') == Identifier('2201.00001v1')
+    assert Identifier('2201.00001v1') != Identifier('2201.00001v2')
+    assert Identifier('2201.00001v1') != '2201.00001v1'
+    assert len({Identifier('cs/0011004v1'), Identifier('cs/0011004v1'), Identifier('cs/0011004')}) == 2
+    assert {Identifier('2201.00001'): 1}[Identifier('2201.00001')] == 1
+
+
+def test_immutable():
+    arxiv_id = Identifier('2201.00001v1')
+    with pytest.raises(AttributeError):
+        arxiv_id.version = 2
+    with pytest.raises(AttributeError):
+        del arxiv_id.id
+    with pytest.raises(AttributeError):
+        arxiv_id.extra = 1
+    assert not hasattr(arxiv_id, '__dict__')
+
+
+def test_pickle():
+    for ids in ['cs/0011004v1', '2201.00001', 'arXiv:2201.00001v3']:
+        arxiv_id = Identifier(ids)
+        copy = pickle.loads(pickle.dumps(arxiv_id))
+        assert copy == arxiv_id and hash(copy) == hash(arxiv_id)
+        assert copy._asdict() == arxiv_id._asdict()
+
+
+def test_cached_and_many():
+    assert cached_identifier('2201.00001v1') is cached_identifier('2201.00001v1')
+    first, bad, again = parse_many(['2201.00001v1', 'bogus', '2201.00001v1'])
+    assert first is again and first == Identifier('2201.00001v1')
+    assert isinstance(bad, IdentifierException)
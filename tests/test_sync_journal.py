@@ -0,0 +1,50 @@
+"""Tests of the `Journal` of `sync_prod_to_gcp/sync_published_to_gcp.py`."""
+import signal
+import sys
+from pathlib import Path
+
+# the script imports identifier.py as a top level module
+sys.path.append(str(Path(__file__).parent.parent / 'sync_prod_to_gcp'))
+
+handlers = {sig: signal.getsignal(sig) for sig in (signal.SIGINT, signal.SIGTERM)}
+from sync_published_to_gcp import Journal, file_crc32c  # noqa: E402
+for sig, handler in handlers.items():  # importing it sets handlers for the script
+    signal.signal(sig, handler)
+
+
+def test_journal(tmp_path):
+    pdf = tmp_path / '0011004v1.pdf'
+    pdf.write_bytes(b'%PDF-1.4 one')
+    key = 'ps_cache/cs/pdf/0011/0011004v1.pdf'
+    journal = Journal(tmp_path / 'journal.jsonl')
+    journal.record_upload(key, 12, file_crc32c(pdf))
+    journal.record_summary(('upload', 'a', 'b', 'upload', 10, 12))
+    journal.close()
+
+    journal = Journal(tmp_path / 'journal.jsonl')
+    assert journal.is_uploaded(key, pdf, 12)
+    assert not journal.is_uploaded(key, pdf, 13)
+    assert not journal.is_uploaded('ps_cache/cs/pdf/0011/0011005v1.pdf', pdf, 12)
+
+    # rebuilt after the journal was written, same size but different contents
+    pdf.write_bytes(b'%PDF-1.4 two')
+    assert not journal.is_uploaded(key, pdf, 12)
+    journal.close()
+
+
+def test_journal_resume_partial_line(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    journal = Journal(path)
+    journal.record_upload('done', 1, 'AAAAAA==')
+    journal.close()
+    with open(path, 'a') as fh:
+        fh.write('{"type": "upload", "key": "kil')  # killed while writing
+
+    journal = Journal(path)
+    assert journal.uploaded == {'done': (1, 'AAAAAA==')}
+    journal.record_upload('after', 2, 'AAAAAB==')
+    journal.close()
+
+    journal = Journal(path)
+    assert journal.uploaded == {'done': (1, 'AAAAAA=='), 'after': (2, 'AAAAAB==')}
+    journal.close()
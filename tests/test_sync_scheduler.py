@@ -0,0 +1,79 @@
+"""Tests of the upload and build queues of `sync_prod_to_gcp/sync_published_to_gcp.py`."""
+import asyncio
+import signal
+import sys
+from collections import Counter
+from pathlib import Path
+
+# the script imports identifier.py as a top level module
+sys.path.append(str(Path(__file__).parent.parent / 'sync_prod_to_gcp'))
+
+handlers = {sig: signal.getsignal(sig) for sig in (signal.SIGINT, signal.SIGTERM)}
+import sync_published_to_gcp as sync  # noqa: E402
+from sync_published_to_gcp import ENSURE_SLOW_MS, HostLimit, split_todos  # noqa: E402
+for sig, handler in handlers.items():  # importing it sets handlers for the script
+    signal.signal(sig, handler)
+
+
+def test_split_todos():
+    todos = [{'paper_id': '2201.00001v1', 'actions': [('upload', 'a.gz'), ('build+upload', 'a.pdf')]},
+             {'paper_id': '2201.00002v1', 'actions': [('upload', 'b.pdf')]},
+             {'paper_id': '2201.00003v1', 'actions': [('build+upload', 'c.pdf')]}]
+    uploads, builds = split_todos(todos)
+    assert uploads == [{'paper_id': '2201.00001v1', 'actions': [('upload', 'a.gz')]},
+                       {'paper_id': '2201.00002v1', 'actions': [('upload', 'b.pdf')]}]
+    assert builds == [{'paper_id': '2201.00001v1', 'actions': [('build+upload', 'a.pdf')]},
+                      {'paper_id': '2201.00003v1', 'actions': [('build+upload', 'c.pdf')]}]
+
+
+def test_host_limit():
+    limit = HostLimit('web5.arxiv.org', 4)
+    assert all(limit.acquire() for _ in range(4))
+    assert limit.active == 4
+
+    limit.release(1000, ok=False)
+    assert limit.limit == 2
+    limit.release(ENSURE_SLOW_MS * 10)
+    assert limit.limit == 1
+    limit.release()  # not used for a build, the limit is unchanged
+    assert limit.limit == 1 and limit.active == 1
+
+    limit.avg_ms = 0.0
+    for _ in range(5):
+        limit.release(10)
+        limit.acquire()
+    assert limit.limit == 4 and limit.active == 1
+
+
+def test_sync_async(monkeypatch):
+    hosts = {'web5.arxiv.org': 2, 'web6.arxiv.org': 1}
+    active, most, builds, summary = Counter(), Counter(), Counter(), []
+
+    async def ensure_pdf_async(http, host, arxiv_id):
+        active[host] += 1
+        most[host] = max(most[host], active[host])
+        builds[arxiv_id.idv] += 1
+        await asyncio.sleep(0.01)
+        active[host] -= 1
+        if arxiv_id.idv == '2201.00003v1':
+            raise Exception("build failed")
+        return (Path(f"{arxiv_id.idv}.pdf"), host, None, 10)
+
+    monkeypatch.setattr(sync, 'ENSURE_HOSTS', list(hosts.items()))
+    monkeypatch.setattr(sync, 'ensure_pdf_async', ensure_pdf_async)
+    monkeypatch.setattr(sync, 'thread_gs_client', lambda: None)
+    monkeypatch.setattr(sync, 'upload_pdf', lambda gs_client, ensured: ('upload', ensured[0], 'key', 'uploaded', 1, 10))
+    monkeypatch.setattr(sync, 'upload', lambda gs_client, localpath, key: ('upload', localpath, key, 'uploaded', 1, 10))
+    monkeypatch.setattr(sync, 'add_summary', summary.append)
+
+    ids = [f"2201.{n:05d}v1" for n in range(1, 11)]
+    todos = [{'paper_id': id, 'actions': [('build+upload', id)]} for id in ids]
+    todos.append({'paper_id': 'abs', 'actions': [('upload', '/data/ftp/arxiv/papers/2201/2201.00001.abs')]})
+    asyncio.run(sync.sync_async(todos))
+
+    assert builds == Counter(ids)
+    assert all(most[host] <= limit for host, limit in hosts.items())
+    assert sum(most.values()) == 3  # both hosts were used at their limits
+    assert sorted(row[0] for row in summary) == sorted(ids + ['abs'])
+    failed = [row for row in summary if row[2] == 'failed']
+    assert [(row[0], row[3]) for row in failed] == [('2201.00003v1', 'build failed')]
@@ -0,0 +1,84 @@
+"""Tests of `upload` of `sync_prod_to_gcp/sync_published_to_gcp.py` with a fake bucket."""
+import base64
+import signal
+import sys
+from pathlib import Path
+
+import google_crc32c
+import pytest
+
+# the script imports identifier.py as a top level module
+sys.path.append(str(Path(__file__).parent.parent / 'sync_prod_to_gcp'))
+
+handlers = {sig: signal.getsignal(sig) for sig in (signal.SIGINT, signal.SIGTERM)}
+import sync_published_to_gcp as sync  # noqa: E402
+for sig, handler in handlers.items():  # importing it sets handlers for the script
+    signal.signal(sig, handler)
+
+
+def crc32c_of(data: bytes) -> str:
+    return base64.b64encode(google_crc32c.Checksum(data).digest()).decode('utf-8')
+
+
+class FakeBlob:
+    def __init__(self, bucket, name, data=None):
+        self.bucket = bucket
+        self.name = name
+        self.size = len(data) if data is not None else None
+        self.crc32c = crc32c_of(data) if data is not None else None
+
+    def upload_from_file(self, fh, content_type=None, checksum=None):
+        data = fh.read()
+        crc32c = crc32c_of(data)
+        if self.crc32c is not None and self.crc32c != crc32c:
+            raise ValueError("crc32c does not match")  # as GS rejects it
+        self.bucket.uploads.append((self.name, content_type, checksum, self.crc32c))
+        self.size, self.crc32c = len(data), crc32c
+        self.bucket.objects[self.name] = self
+
+
+class FakeBucket:
+    def __init__(self):
+        self.objects = {}
+        self.uploads = []
+
+    def bucket(self, name):
+        return self
+
+    def get_blob(self, key):
+        return self.objects.get(key)
+
+    def blob(self, key):
+        return FakeBlob(self, key)
+
+
+@pytest.fixture
+def pdf(tmp_path, monkeypatch):
+    monkeypatch.setattr(sync, 'JOURNAL', None)
+    pdf = tmp_path / '2201.00001v1.pdf'
+    pdf.write_bytes(b'%PDF-1.4 local')
+    return pdf
+
+
+def test_upload_new(pdf):
+    gs = FakeBucket()
+    assert sync.upload(gs, pdf, 'ps_cache/arxiv/pdf/2201/2201.00001v1.pdf')[3] == 'uploaded'
+    # the crc32c is computed while uploading and checked by GS
+    assert gs.uploads == [('ps_cache/arxiv/pdf/2201/2201.00001v1.pdf', 'application/pdf', 'crc32c', None)]
+    assert gs.objects['ps_cache/arxiv/pdf/2201/2201.00001v1.pdf'].crc32c == sync.file_crc32c(pdf)
+
+
+def test_upload_same(pdf):
+    gs = FakeBucket()
+    gs.objects['key'] = FakeBlob(gs, 'key', b'%PDF-1.4 local')
+    assert sync.upload(gs, pdf, 'key')[3] == 'already_on_gs'
+    assert gs.uploads == []
+
+
+def test_upload_same_size_different_crc32c(pdf):
+    gs = FakeBucket()
+    gs.objects['key'] = FakeBlob(gs, 'key', b'%PDF-1.4 other')
+    assert sync.upload(gs, pdf, 'key')[3] == 'uploaded'
+    # sent with the local crc32c for GS to check
+    assert gs.uploads == [('key', 'application/pdf', None, sync.file_crc32c(pdf))]
+    assert gs.objects['key'].crc32c == sync.file_crc32c(pdf)
@@ -0,0 +1,68 @@
+import time
+
+from arxiv.identifier import Identifier
+
+from arxiv_dissemination.services.article_store import SHORT_RESOLUTION_TTL
+from arxiv_dissemination.services.warmer import Warmer
+
+
+def test_warm_off_without_token(client):
+    resp = client.post("/pdf/warm", json={"ids": ["cs/0011004v1"]})
+    assert resp.status_code == 404
+
+
+def test_warm(app_local_fs):
+    app_local_fs.config['warm_token'] = 'secret'
+    client = app_local_fs.test_client()
+
+    resp = client.post("/pdf/warm", json={"ids": ["cs/0011004v1"]},
+                       headers={'Authorization': 'Bearer wrong'})
+    assert resp.status_code == 401
+
+    resp = client.post("/pdf/warm", json={"ids": ["cs/0011004v1", "cs/0011004", "bogus"]},
+                       headers={'Authorization': 'Bearer secret'})
+    assert resp.status_code == 202
+    assert resp.json == {"accepted": 2, "invalid": ["bogus"]}
+
+    for _ in range(50):
+        if app_local_fs.warmer.warmed == 2:
+            break
+        time.sleep(0.05)
+    assert app_local_fs.warmer.warmed == 2
+    assert len(app_local_fs.article_store.resolution_cache) == 2
+
+    resp = client.post("/pdf/warm", data="not json", headers={'Authorization': 'Bearer secret'})
+    assert resp.status_code == 400
+
+
+def test_resolution_cache(app_local_fs):
+    client = app_local_fs.test_client()
+    cache = app_local_fs.article_store.resolution_cache
+    assert client.get("/pdf/cs/0011004v1.pdf").status_code == 200
+    assert client.get("/pdf/cs/0011004v1.pdf").status_code == 200
+    assert cache.hits == 1
+    assert client.get("/pdf/1208.9999v1.pdf").status_code == 500
+    assert len(cache) == 1  # UNAVAIABLE is not cached
+
+
+def test_resolution_cache_ttl(app_local_fs):
+    client = app_local_fs.test_client()
+    cache = app_local_fs.article_store.resolution_cache
+    assert client.get("/pdf/2201.99999v1.pdf").status_code == 404
+    assert client.get("/pdf/cs/0011004v1.pdf").status_code == 200
+    (expires_cond, _), (expires_found, _) = cache._entries.values()
+    assert expires_cond <= time.time() + SHORT_RESOLUTION_TTL
+    assert expires_found >= expires_cond
+
+    cache.put('gone', 'VALUE', ttl=0)
+    assert cache.get('gone') is None
+
+
+def test_warm_refreshes(app_local_fs):
+    store = app_local_fs.article_store
+    key = ('pdf', 'cs/0011004', 1)
+    store.resolution_cache.put(key, ("UNAVAIABLE", "UNAVAIABLE"))
+    assert store.dissemination_for_id('pdf', Identifier('cs/0011004v1')) == "UNAVAIABLE"
+    Warmer(store, threads=1)._warm_one(Identifier('cs/0011004v1'))
+    item, branch = store.resolution_cache.get(key)
+    assert branch == 'ps_cache' and item.name.endswith('0011004v1.pdf')